@@ -0,0 +1,309 @@
+"""
+分析热路径基准测试
+
+离线运行：HTTP 请求由假的 Session 返回K线 JSON 夹具，不访问 Binance 和 Telegram。
+分别测量K线解析、get_klines、indicators、risk、逐个/批量分析、calculate_probability 和完整的
+monitor_symbols 周期在 10/100/1000 个交易对下的耗时与内存分配，结果写入 JSON。
+
+夹具:
+    benchmarks/fixtures/{symbol}_{interval}.json 为K线接口的原始响应，默认使用仓库中提交的
+    一小组夹具（3 个交易对 × 3 个周期 × 200 根），不同机器和不同提交的结果可以直接对比。
+    可用 --record 重新录制（BINANCE_API_URL 指向 tools/fake_binance.py 时录制模拟服务器的响应）；
+    目录中没有完整夹具时才退回固定种子生成的模拟K线。
+    交易对数量多于夹具数量时循环复用夹具。
+
+运行:
+    python benchmarks/bench_cycle.py
+    python benchmarks/bench_cycle.py --symbols 10 100 --output before.json
+    python benchmarks/bench_cycle.py --compare before.json
+    python benchmarks/bench_cycle.py --record BTCUSDT ETHUSDT BNBUSDT
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+# 基准测试不连接 Telegram，占位 Token 会在创建 TeleBot 时校验失败
+if ":" not in config.TELEGRAM_BOT_TOKEN:
+    config.TELEGRAM_BOT_TOKEN = "0:benchmark"
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from modules import api, signals, indicators, risk  # noqa: E402
+from modules.utils import TokenBucket, interval_to_ms  # noqa: E402
+
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+FIXTURE_ROWS = 1000
+RECORD_ROWS = 200
+SYNTHETIC_FIXTURES = 20
+
+def make_fixture(seed, interval, rows=FIXTURE_ROWS, end=1_700_000_000_000):
+    """生成与 Binance K线接口格式相同的模拟K线"""
+    rng = random.Random(seed)
+    step = interval_to_ms(interval)
+    start = end // step * step - (rows - 1) * step
+    price = rng.uniform(0.1, 50000)
+    data = []
+    for i in range(rows):
+        open_price = price
+        price *= 1 + rng.gauss(0, 0.01)
+        high = max(open_price, price) * (1 + rng.random() * 0.005)
+        low = min(open_price, price) * (1 - rng.random() * 0.005)
+        open_time = start + i * step
+        data.append([
+            open_time, f"{open_price:.8f}", f"{high:.8f}", f"{low:.8f}", f"{price:.8f}",
+            f"{rng.uniform(100, 10000):.8f}", open_time + step - 1,
+            "0", 100, "0", "0", "0"
+        ])
+    return data
+
+def load_fixtures(intervals):
+    """
+    读取K线夹具
+
+    返回:
+    - [{周期: K线列表}, ...]，每个元素对应一个录制或模拟的交易对
+    """
+    fixtures = {}
+    if os.path.isdir(FIXTURE_DIR):
+        for name in sorted(os.listdir(FIXTURE_DIR)):
+            symbol, _, rest = name.rpartition("_")
+            interval = rest.removesuffix(".json")
+            if name.endswith(".json") and interval in intervals:
+                with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+                    fixtures.setdefault(symbol, {})[interval] = api.json_loads(f.read())
+    recorded = [data for data in fixtures.values() if set(data) >= set(intervals)]
+    if recorded:
+        return recorded, "recorded"
+    return [
+        {interval: make_fixture(f"{seed}-{interval}", interval) for interval in intervals}
+        for seed in range(SYNTHETIC_FIXTURES)
+    ], "synthetic"
+
+def record_fixtures(symbols, intervals):
+    """从 BINANCE_API_URL 录制K线夹具"""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for symbol in symbols:
+        for interval in intervals:
+            response = api.binance_client.request("klines", {
+                "symbol": symbol, "interval": interval, "limit": RECORD_ROWS
+            })
+            with open(os.path.join(FIXTURE_DIR, f"{symbol}_{interval}.json"), "wb") as f:
+                f.write(response.content)
+            print(f"已录制 {symbol} {interval}")
+
+class FakeResponse:
+    def __init__(self, content, weight):
+        self.status_code = 200
+        self.headers = {"X-MBX-USED-WEIGHT-1M": str(weight)}
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+class FakeSession:
+    """按交易对返回夹具数据的假 Session，响应按 (交易对, 周期, 参数) 预先序列化"""
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self.symbols = {}
+        self.responses = {}
+        self.requests = 0
+
+    def assign(self, symbols):
+        self.symbols = {symbol: self.fixtures[i % len(self.fixtures)] for i, symbol in enumerate(symbols)}
+
+    def get(self, url, params=None, timeout=None):
+        self.requests += 1
+        key = (params["symbol"], params["interval"], params.get("limit"), params.get("startTime"))
+        content = self.responses.get(key)
+        if content is None:
+            rows = self.symbols[params["symbol"]][params["interval"]]
+            if params.get("startTime") is not None:
+                rows = [row for row in rows if row[0] >= params["startTime"]]
+            content = json.dumps(rows[-params.get("limit", 500):]).encode()
+            self.responses[key] = content
+        return FakeResponse(content, self.requests)
+
+    def close(self):
+        pass
+
+def measure(name, count, func, repeat, alloc=True):
+    """
+    测量 func 的耗时和内存分配
+
+    返回:
+    - 结果字典：总耗时取 repeat 次中最快的一次，内存为单独一次运行的峰值与净分配
+    """
+    func()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    result = {
+        "name": name,
+        "symbols": count,
+        "seconds": best,
+        "per_symbol_us": best / count * 1e6,
+    }
+    if alloc:
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_kib"] = (peak - before) / 1024
+        result["retained_kib"] = (after - before) / 1024
+    return result
+
+def run_suite(counts, fixtures, repeat, alloc):
+    session = FakeSession(fixtures)
+    api.binance_client._session = session
+    api.binance_client.limiter = TokenBucket(10 ** 12)
+    api.kline_store.disk = None
+    signals.bot.send_message = lambda *args, **kwargs: None
+
+    results = []
+    intervals = signals.KLINE_INTERVALS
+    for count in counts:
+        symbols = [f"S{i:04d}USDT" for i in range(count)]
+        session.assign(symbols)
+        signals.load_user_symbols = lambda: symbols
+
+        payloads = [
+            json.dumps(session.symbols[symbol][interval][-limit:]).encode()
+            for symbol in symbols for interval, limit in intervals.items()
+        ]
+        frames = {
+            symbol: {interval: api.parse_klines(session.symbols[symbol][interval][-limit:])
+                     for interval, limit in intervals.items()}
+            for symbol in symbols
+        }
+        frames_1h = [frames[symbol]["1h"] for symbol in symbols]
+
+        def cold_klines():
+            api.kline_store.clear()
+            for symbol in symbols:
+                for interval, limit in intervals.items():
+                    api.get_klines(symbol, interval, limit)
+
+        def run_indicators(func, *args):
+            return lambda: [func(df, *args) for df in frames_1h]
+
+        def run_analysis():
+            for symbol in symbols:
+                f = frames[symbol]
+                signals.analyze_frames(symbol, f["1h"], f["4h"], f["1d"])
+
+        def cold_probability():
+            api.kline_store.clear()
+            signals.calculate_probability.cache.invalidate()
+            for symbol in symbols:
+                signals.calculate_probability(symbol)
+
+        def cold_cycle():
+            api.kline_store.clear()
+            signals.calculate_probability.cache.invalidate()
+            signals.monitor_symbols()
+
+        def incremental_cycle():
+            # K线缓存保留，只增量拉取最后一根K线
+            signals.calculate_probability.cache.invalidate()
+            signals.monitor_symbols()
+
+        cases = [
+            ("parse_klines", lambda: [api.parse_klines(payload) for payload in payloads]),
+            ("get_klines (cold store)", cold_klines),
+            ("calculate_rsi", run_indicators(indicators.calculate_rsi)),
+            ("calculate_macd", run_indicators(indicators.calculate_macd)),
+            ("calculate_bollinger_bands", run_indicators(indicators.calculate_bollinger_bands)),
+            ("calculate_ema", run_indicators(indicators.calculate_ema, config.EMA_LONG)),
+            ("calculate_atr", run_indicators(indicators.calculate_atr)),
+            ("get_market_type", run_indicators(indicators.get_market_type)),
+            ("calculate_stop_loss", run_indicators(risk.calculate_stop_loss)),
+            ("calculate_take_profit", run_indicators(risk.calculate_take_profit)),
+            ("calculate_position_size", run_indicators(risk.calculate_position_size)),
+            ("analyze_frames", run_analysis),
+            ("analyze_batch", lambda: signals.analyze_batch(symbols, frames)),
+            ("calculate_probability (cold)", cold_probability),
+            ("monitor_symbols (cold)", cold_cycle),
+            ("monitor_symbols (incremental)", incremental_cycle),
+        ]
+        for name, func in cases:
+            result = measure(name, count, func, repeat, alloc)
+            results.append(result)
+            alloc_text = f"{result['peak_kib']:>12.0f}" if alloc else ""
+            print(f"{count:>6}  {name:<32}{result['seconds'] * 1000:>10.1f}{result['per_symbol_us']:>12.0f}{alloc_text}")
+    return results
+
+def metadata(fixture_source):
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "json": api.json_loads.__module__,
+        "fixtures": fixture_source,
+        "concurrent": config.MONITOR_CONCURRENT,
+    }
+
+def compare(results, baseline_path):
+    """与之前保存的结果对比耗时"""
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["symbols"]): r for r in json.load(f)["results"]}
+    print(f"\n与 {baseline_path} 对比（>1 表示变快）")
+    for result in results:
+        before = baseline.get((result["name"], result["symbols"]))
+        if before:
+            print(f"{result['symbols']:>6}  {result['name']:<32}{before['seconds'] / result['seconds']:>8.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="分析热路径基准测试")
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量取最快的一次")
+    parser.add_argument("--no-alloc", action="store_true", help="跳过 tracemalloc 内存测量")
+    parser.add_argument("--output", default="bench_results.json", help="结果 JSON 路径")
+    parser.add_argument("--compare", help="对比的历史结果 JSON")
+    parser.add_argument("--record", nargs="+", metavar="SYMBOL", help="从 BINANCE_API_URL 录制夹具后退出")
+    args = parser.parse_args()
+
+    intervals = list(signals.KLINE_INTERVALS)
+    if args.record:
+        record_fixtures(args.record, intervals)
+        return
+
+    fixtures, source = load_fixtures(intervals)
+    if source == "synthetic":
+        print(f"未找到 {FIXTURE_DIR} 中的夹具，使用模拟K线，结果不能与使用夹具的结果对比")
+    print(f"夹具: {source} ({len(fixtures)} 个交易对)  JSON 解析器: {api.json_loads.__module__}")
+    print(f"{'count':>6}  {'case':<32}{'total ms':>10}{'us/symbol':>12}{'peak KiB' if not args.no_alloc else '':>12}")
+    results = run_suite(args.symbols, fixtures, args.repeat, not args.no_alloc)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(source), "results": results}, f, indent=2)
+    print(f"\n结果已保存到 {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
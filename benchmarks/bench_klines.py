@@ -0,0 +1,88 @@
+"""
+K线解码微基准
+
+对比旧的解码方式（json + 12列 object DataFrame + 逐列 astype）与
+get_klines 当前使用的 decode_klines / parse_klines。
+
+旧方式分别用标准库 json 和 api.json_loads 测量，把 JSON 解析器带来的提升
+（speedup 列中 legacy json_loads 相对 legacy json）与数组解码带来的提升
+（vs same decoder 列，同一解析器下相对旧方式）分开报告。
+
+运行:
+    python benchmarks/bench_klines.py
+    python benchmarks/bench_klines.py --rows 100 500 1000 --repeat 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.api import decode_klines, parse_klines, json_loads  # noqa: E402
+
+LEGACY_COLUMNS = [
+    "timestamp", "open", "high", "low", "close", "volume",
+    "close_time", "quote_volume", "trades", "taker_buy_base",
+    "taker_buy_quote", "ignore"
+]
+
+def make_payload(rows, interval_ms=3_600_000, start=1_700_000_000_000):
+    """生成与 Binance K线接口格式相同的响应字节"""
+    data = []
+    price = 100.0
+    for i in range(rows):
+        open_time = start + i * interval_ms
+        price *= 1.0005 if i % 3 else 0.9995
+        data.append([
+            open_time, f"{price:.8f}", f"{price * 1.01:.8f}", f"{price * 0.99:.8f}",
+            f"{price:.8f}", "1234.56780000", open_time + interval_ms - 1,
+            "123456.78900000", 1000, "600.00000000", "60000.00000000", "0"
+        ])
+    return json.dumps(data).encode()
+
+def legacy_parse(raw, loads=json.loads):
+    """旧实现：12列 object DataFrame + 逐列转换，默认使用标准库 json"""
+    df = pd.DataFrame(loads(raw), columns=LEGACY_COLUMNS)
+    for col in ["open", "high", "low", "close", "volume"]:
+        df[col] = df[col].astype(float)
+    return df
+
+def timeit(func, arg, repeat):
+    func(arg)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="K线解码微基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[30, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    decoder = json_loads.__module__
+    # (名称, 函数, 是否使用 json_loads)
+    cases = [
+        ("legacy (json)", legacy_parse, False),
+        (f"legacy ({decoder})", lambda raw: legacy_parse(raw, json_loads), True),
+        (f"{decoder} only", json_loads, True),
+        ("decode_klines -> ndarray", decode_klines, True),
+        ("parse_klines -> DataFrame", parse_klines, True),
+    ]
+    print(f"JSON 解析器: {decoder}")
+    print(f"{'rows':>6}  {'case':<34}{'us/call':>10}{'speedup':>9}{'vs same decoder':>17}")
+    for rows in args.rows:
+        raw = make_payload(rows)
+        timings = {}
+        for name, func, same_decoder in cases:
+            elapsed = timings[name] = timeit(func, raw, args.repeat)
+            baseline = timings["legacy (json)"]
+            legacy = timings[f"legacy ({decoder})"] if same_decoder else baseline
+            print(f"{rows:>6}  {name:<34}{elapsed:>10.1f}{baseline / elapsed:>8.1f}x{legacy / elapsed:>16.1f}x")
+
+if __name__ == "__main__":
+    main()
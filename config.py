@@ -1,3 +1,5 @@
+import os
+
 # Telegram配置
 TELEGRAM_BOT_TOKEN = "YOUR_TELEGRAM_BOT_TOKEN"
 OWNER_ID = "YOUR_OWNER_ID"  # 严格限制只有你能使用
@@ -5,6 +7,8 @@ CHAT_ID = "YOUR_CHAT_ID"  # 添加这一行，通常与OWNER_ID相同
 
 # 交易对配置
 SYMBOLS = ["ETHUSDT", "BNBUSDT", "KAITOUSDT", "DOGEUSDT", "SOLUSDT"]
+QUOTE_ASSETS = ["USDT", "FDUSD", "USDC", "BTC", "ETH", "BNB"]  # 命令中只输入币种时按此顺序选择计价货币
+SYMBOL_INDEX_REFRESH = 6  # 交易对索引（exchangeInfo）刷新间隔（小时）
 
 # 技术指标参数
 RSI_PERIOD = 14
@@ -25,16 +29,52 @@ EMA_WEIGHT = 0.20
 ATR_WEIGHT = 0.10
 
 # 安全配置
-MAX_REQUESTS_PER_MINUTE = 60  # Binance API 限制
+# Binance REST 地址，可通过环境变量指向本地模拟服务器（tools/fake_binance.py）
+BINANCE_API_URL = os.environ.get("BINANCE_API_URL", "https://api.binance.com/api/v3")
+MAX_REQUESTS_PER_MINUTE = 1200  # Binance API 每分钟请求权重上限（按权重限流）
+API_POOL_SIZE = 10  # Binance HTTP 连接池大小
+USE_KLINE_STORE = True  # 内存缓存K线，只增量拉取新K线
+KLINE_DISK_CACHE = True  # 将K线持久化到磁盘，重启后直接读取（需要 USE_KLINE_STORE = True）
+KLINE_CACHE_DIR = "data/klines"  # K线磁盘缓存目录，每个交易对和周期一个文件
+KLINE_CACHE_MAX_RECORDS = 5000   # 单个文件保留的最大K线数量
+
+# K线推送配置（需要安装 websocket-client，且 USE_KLINE_STORE = True）
+USE_KLINE_STREAM = False  # 是否通过 WebSocket 接收K线推送
+BINANCE_WS_URL = "wss://stream.binance.com:9443/stream"
+STREAM_PING_INTERVAL = 60  # 心跳间隔（秒）
+STREAM_MAX_BACKOFF = 60    # 重连最大等待时间（秒）
 
 # 信号阈值
 RSI_OVERSOLD = 30
 RSI_OVERBOUGHT = 70
 
 # 定时任务间隔（分钟）
-MONITOR_INTERVAL = 15
 HEARTBEAT_INTERVAL = 240  # 4小时
 
+# K线收盘调度配置
+SCHEDULE_INTERVALS = ["1h", "4h", "1d"]  # 在这些周期收盘时分析（可加入 "15m" 等）
+SCHEDULE_SETTLE_DELAY = 3  # 收盘后等待的秒数
+
+# 分析结果缓存（新K线收盘后失效）
+RESULT_CACHE_SIZE = 512   # 最大缓存条目数
+RESULT_CACHE_TTL = 300    # 没有数据版本的缓存有效期（秒），按K线版本缓存的结果不受此限制
+
+# 市场概况快照：/m 在快照有效期内直接使用最近一次监控周期的结果
+MARKET_SNAPSHOT_MAX_AGE = 60  # 快照有效期（秒）
+
+# 并发监控配置
+MONITOR_CONCURRENT = True  # 是否并发拉取所有交易对的K线
+MONITOR_WORKERS = 10       # 并发线程数（不宜超过 API_POOL_SIZE）
+
+# 异步监控配置（需要安装 aiohttp）
+USE_ASYNC_PIPELINE = False    # 是否使用 asyncio 事件循环执行监控
+ASYNC_MAX_CONCURRENCY = 100   # 异步模式下的最大并发连接数
+
+# 指标服务配置（Prometheus 文本格式，http://METRICS_HOST:METRICS_PORT/metrics）
+METRICS_ENABLED = False
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
 # 添加重试和超时配置
 REQUEST_TIMEOUT = 30  # 请求超时时间（秒）
 MAX_RETRIES = 5      # 最大重试次数
@@ -51,6 +91,29 @@ POLLING_INTERVAL = 3       # 轮询间隔（秒）
 POLLING_TIMEOUT = 30       # 轮询超时时间（秒）
 LONG_POLLING_TIMEOUT = 30  # 长轮询超时时间（秒）
 
+# Webhook 配置（USE_WEBHOOK = True 时不再轮询，由内置 HTTP 服务接收更新）
+USE_WEBHOOK = False
+WEBHOOK_URL = ""                 # Telegram 回调的公网 HTTPS 地址，例如 https://example.com/telegram
+WEBHOOK_LISTEN = "0.0.0.0"       # 本地监听地址
+WEBHOOK_PORT = 8443              # 本地监听端口（Telegram 只支持 443/80/88/8443，使用反向代理时可任意）
+WEBHOOK_PATH = "/telegram"       # 接收更新的路径
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")  # 校验 X-Telegram-Bot-Api-Secret-Token 请求头
+WEBHOOK_SSL_CERT = None          # 直接提供 HTTPS 时的证书路径（会同时上传给 Telegram，自签名证书必须上传）
+WEBHOOK_SSL_KEY = None           # 证书私钥路径
+
+# Telegram 消息发送队列配置
+TELEGRAM_GLOBAL_PER_SECOND = 25   # 全局每秒最多发送消息数（官方上限约30条/秒）
+TELEGRAM_CHAT_PER_MINUTE = 20     # 单个聊天每分钟最多发送消息数（群组上限20条/分钟）
+TELEGRAM_CHAT_BURST = 3           # 单个聊天允许的突发消息数
+TELEGRAM_COALESCE_SECONDS = 2     # 可合并消息的等待时间（秒），期间同一聊天的提醒合并为一条
+TELEGRAM_SEND_ATTEMPTS = 5        # 单条消息最多发送次数（429按 retry_after 等待后重试）
+
+# 命令执行配置：/m /risk /add 等耗时命令在线程池中执行，不阻塞轮询线程
+COMMAND_WORKERS = 4           # 耗时命令的工作线程数
+COMMAND_QUEUE_LIMIT = 20      # 排队中的耗时命令上限，超过后提示繁忙
+COMMAND_TIMEOUT = 60          # 耗时命令默认超时（秒）
+COMMAND_LATENCY_WINDOW = 500  # 每个命令保留最近多少次耗时用于统计 p50/p99
+
 # 添加错误处理配置
 ERROR_RETRY_DELAY = 30    # 错误重试延迟（秒）
 MAX_RESTART_ATTEMPTS = 3  # 最大重启尝试次数
@@ -9,10 +9,14 @@ import sys
 from config import *
 
 # 导入模块
-from modules.utils import setup_logging
+from modules.utils import setup_logging, load_user_symbols
 from modules.api import setup_requests_session
-from modules.bot import bot, run_bot, send_startup_message
-from modules.signals import monitor_symbols
+from modules.bot import bot, dispatcher, run_bot, send_startup_message
+from modules.signals import run_schedule, candle_scheduler, KLINE_INTERVALS
+from modules.stream import kline_stream
+from modules.metrics import start_metrics_server
+from modules.profiling import install_signal_handler
+from modules.webhook import run_webhook, check_secret
 
 # 重要！导入命令处理模块以确保命令注册
 import modules.bot_commands
@@ -24,11 +28,28 @@ logger.info("📡 交易信号监控启动中...")
 
 if __name__ == "__main__":
     try:
-        # 确保清理之前的webhook设置
-        bot.delete_webhook()
+        # 轮询模式下确保清理之前的webhook设置；Webhook 模式没有密钥时在启动任何服务前退出
+        if not USE_WEBHOOK:
+            bot.delete_webhook()
+        else:
+            check_secret()
         
-        # 启动监控线程
-        monitor_thread = threading.Thread(target=monitor_symbols)
+        # kill -USR1 <pid> 触发一次监控周期的性能分析
+        install_signal_handler()
+        
+        # 启动指标服务
+        if METRICS_ENABLED:
+            start_metrics_server()
+        
+        # 启动K线推送
+        if USE_KLINE_STREAM:
+            # 所有交易对的收盘推送到齐后立即分析，不必等待调度器的结算延迟
+            kline_stream.on_interval_closed = candle_scheduler.trigger
+            kline_stream.set_symbols(load_user_symbols(), KLINE_INTERVALS)
+            kline_stream.start()
+        
+        # 启动监控线程（启动时分析一次，之后在K线收盘时分析）
+        monitor_thread = threading.Thread(target=run_schedule)
         monitor_thread.daemon = True
         monitor_thread.start()
         
@@ -40,7 +61,10 @@ if __name__ == "__main__":
 
         # 启动机器人
         logger.info("开始运行机器人...")
-        run_bot()
+        if USE_WEBHOOK:
+            run_webhook()
+        else:
+            run_bot()
         
     except KeyboardInterrupt:
         logger.info("收到退出信号，正在关闭机器人...")
@@ -49,8 +73,11 @@ if __name__ == "__main__":
             bot.stop_polling()
         except:
             pass
+        # 发送队列中剩余的消息
+        dispatcher.stop()
     except Exception as e:
         logger.error(f"机器人运行出错: {e}")
+        dispatcher.flush(timeout=10)
         # 重启机器人
         time.sleep(60)  # 等待1分钟后重试
         os.execv(sys.executable, ['python'] + sys.argv)  # 重启程序
\ No newline at end of file
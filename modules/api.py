@@ -1,78 +1,233 @@
 """
 API请求相关功能
 """
+import json
 import requests
+import numpy as np
 import pandas as pd
 import logging
+import threading
+from itertools import chain
 import backoff
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 from requests.exceptions import RequestException, ProxyError, SSLError
+from modules.utils import TokenBucket
+from modules.kline_store import KlineStore
+from modules.kline_disk import DiskKlineCache
+from modules import metrics
 from config import *
 
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # 未安装 orjson 时使用标准库
+    json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+class CountingRetry(Retry):
+    """记录 urllib3 重试次数的 Retry"""
+    def increment(self, *args, **kwargs):
+        metrics.binance_retries_total.inc(source="urllib3")
+        return super().increment(*args, **kwargs)
+
 # 配置 requests 的重试策略
-def setup_requests_session():
+def setup_requests_session(pool_size=API_POOL_SIZE):
     session = requests.Session()
-    retry_strategy = Retry(
+    retry_strategy = CountingRetry(
         total=5,  # 总重试次数
         backoff_factor=1,  # 重试间隔
-        status_forcelist=[429, 500, 502, 503, 504],  # 需要重试的HTTP状态码
+        status_forcelist=[500, 502, 503, 504],  # 需要重试的HTTP状态码（429/418由限流器处理）
+        respect_retry_after_header=False,  # 否则 urllib3 会自行重试带 Retry-After 的 429，限流器无法暂停
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry_strategy
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
-# Binance API URL
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+# 各接口的请求权重（未列出的接口按1计算）
+ENDPOINT_WEIGHTS = {
+    "klines": 2,
+    "exchangeInfo": 20,
+}
+
+def estimate_weight(endpoint, params=None):
+    """估算一次请求消耗的 Binance 权重"""
+    params = params or {}
+    if endpoint == "ticker/price":
+        return 2 if "symbol" in params else 4
+    if endpoint == "ticker/24hr":
+        return 2 if "symbol" in params else 80
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+class BinanceClient:
+    """
+    长连接的 Binance REST 客户端
+
+    - 复用同一个 Session 的连接池，避免每次请求重新握手
+    - 进程内共享的令牌桶按请求权重限流，并根据 X-MBX-USED-WEIGHT 响应头校正
+    - 收到 429/418 时按 Retry-After 暂停所有请求
+    """
+    def __init__(self, base_url=BINANCE_API_URL, limiter=None, pool_size=API_POOL_SIZE):
+        self.base_url = base_url
+        self.limiter = limiter or TokenBucket(MAX_REQUESTS_PER_MINUTE, period=60)
+        self.pool_size = pool_size
+        self.used_weight = 0
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = setup_requests_session(self.pool_size)
+        return self._session
+
+    def get(self, endpoint, params=None, weight=None):
+        """发送 GET 请求并返回解析后的 JSON"""
+        response = self.request(endpoint, params, weight)
+        return json_loads(response.content)
+
+    def request(self, endpoint, params=None, weight=None):
+        """发送 GET 请求并返回原始响应"""
+        if weight is None:
+            weight = estimate_weight(endpoint, params)
+        waited = self.limiter.acquire(weight)
+        if waited > 1:
+            logger.warning(f"Binance 请求权重接近上限，已等待 {waited:.1f} 秒")
+
+        metrics.binance_weight_requested_total.inc(weight)
+
+        url = f"{self.base_url}/{endpoint}"
+        with metrics.binance_request_seconds.time(endpoint=endpoint):
+            try:
+                response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            except Exception:
+                metrics.binance_requests_total.inc(endpoint=endpoint, status="error")
+                raise
+        self._handle_headers(response.status_code, response.headers)
+        metrics.binance_requests_total.inc(endpoint=endpoint, status=response.status_code)
+        response.raise_for_status()
+        return response
+
+    def _handle_headers(self, status, headers):
+        """读取响应头中的已用权重并同步到令牌桶，遇到 429/418 时暂停请求"""
+        used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("X-MBX-USED-WEIGHT")
+        if used is not None:
+            try:
+                self.used_weight = int(used)
+                self.limiter.sync(self.used_weight)
+                metrics.binance_used_weight.set(self.used_weight)
+            except ValueError:
+                pass
+
+        if status in (418, 429):
+            metrics.binance_rate_limited_total.inc(status=status)
+            retry_after = 60
+            try:
+                retry_after = int(headers.get("Retry-After", 60))
+            except (TypeError, ValueError):
+                pass
+            self.limiter.pause(retry_after)
+            logger.warning(f"Binance 限流 ({status})，暂停请求 {retry_after} 秒")
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
 
-# 使用 backoff 装饰器处理网络请求重试
+# 全局共享的客户端
+binance_client = BinanceClient()
+
+def _is_client_error(e):
+    """4xx 错误（限流除外）重试无意义，直接放弃"""
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and 400 <= status < 500 and status not in (418, 429)
+
+# 使用 backoff 装饰器处理网络请求重试（429/418 时令牌桶已暂停，重试会等待到暂停结束）
 @backoff.on_exception(
     backoff.expo,
     (RequestException, ProxyError, SSLError),
     max_tries=5,
-    max_time=300
+    max_time=300,
+    giveup=_is_client_error,
+    on_backoff=lambda details: metrics.binance_retries_total.inc(source="backoff")
 )
+def _get_with_retry(endpoint, params=None):
+    return binance_client.get(endpoint, params)
+
 def get_binance_data(endpoint, params=None):
     """统一的 Binance API 请求函数"""
     try:
-        session = setup_requests_session()
-        url = f"{BINANCE_API_URL}/{endpoint}"
-        response = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response.json()
+        return _get_with_retry(endpoint, params)
     except Exception as e:
         logger.error(f"Binance API 请求失败: {e}")
         return None
-    finally:
-        session.close()
+
+# 全局K线增量存储
+kline_store = KlineStore(
+    fetch=get_binance_data,
+    disk=DiskKlineCache() if KLINE_DISK_CACHE else None
+)
+metrics.counter(
+    "kline_store_events_total", "K线存储的加载与拉取次数", ["event"],
+    function=lambda: dict(kline_store.stats)
+)
+
+# K线只保留需要的字段：开盘时间、OHLCV、收盘时间
+KLINE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "close_time"]
+
+def decode_klines(data):
+    """
+    将K线接口返回的数据直接解码为 float64 数组
+
+    参数:
+    - data: 响应原始字节或已解析的列表
+
+    返回:
+    - 形状为 (K线数量, 7) 的数组，列顺序同 KLINE_COLUMNS
+    """
+    if isinstance(data, (bytes, bytearray, str)):
+        data = json_loads(data)
+    width = len(KLINE_COLUMNS)
+    values = np.fromiter(
+        map(float, chain.from_iterable(row[:width] for row in data)),
+        dtype=np.float64,
+        count=len(data) * width
+    )
+    return values.reshape(len(data), width)
+
+# K线原始数据转换为 DataFrame
+def parse_klines(data):
+    """将 Binance K线接口返回的数据转换为 DataFrame"""
+    return pd.DataFrame(decode_klines(data), columns=KLINE_COLUMNS, copy=False)
 
 # 🚀 获取 Binance 交易对 K 线数据
-def get_klines(symbol, interval="15m", limit=100):
+def get_klines(symbol, interval="15m", limit=100, refresh=True):
     try:
-        params = {
-            "symbol": symbol,
-            "interval": interval,
-            "limit": limit
-        }
-        data = get_binance_data("klines", params)
+        if USE_KLINE_STORE:
+            # refresh=False 时没有新K线收盘就直接使用缓存中的K线
+            data = kline_store.get_rows(symbol, interval, limit, refresh)
+        else:
+            params = {
+                "symbol": symbol,
+                "interval": interval,
+                "limit": limit
+            }
+            data = get_binance_data("klines", params)
         if not data:
             return None
 
-        df = pd.DataFrame(data, columns=[
-            "timestamp", "open", "high", "low", "close", "volume",
-            "close_time", "quote_volume", "trades", "taker_buy_base",
-            "taker_buy_quote", "ignore"
-        ])
-        
-        # 只转换需要的列，减少计算量
-        for col in ["open", "high", "low", "close", "volume"]:
-            df[col] = df[col].astype(float)
-            
-        return df
+        return parse_klines(data)
     except Exception as e:
         error_message = f"❌ 获取K线数据失败 - {symbol}: {str(e)}"
         logger.error(error_message)
-        return None 
\ No newline at end of file
+        return None
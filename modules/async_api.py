@@ -0,0 +1,151 @@
+"""
+异步 API 请求功能（基于 aiohttp）
+"""
+import asyncio
+import logging
+import backoff
+from modules.api import (
+    BinanceClient, BINANCE_API_URL, binance_client, kline_store,
+    estimate_weight, json_loads, parse_klines
+)
+from modules import metrics
+from config import *
+
+try:
+    import aiohttp
+    NETWORK_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+except ImportError:  # 未安装 aiohttp 时仅同步模式可用
+    aiohttp = None
+    NETWORK_ERRORS = (asyncio.TimeoutError,)
+
+logger = logging.getLogger(__name__)
+
+def _is_client_error(e):
+    """4xx 错误（限流除外）重试无意义，直接放弃"""
+    status = getattr(e, "status", None)
+    return status is not None and 400 <= status < 500 and status not in (418, 429)
+
+class AsyncBinanceClient(BinanceClient):
+    """
+    基于 aiohttp 的 Binance REST 客户端
+
+    与同步客户端共用同一个令牌桶，单个事件循环内可同时挂起大量请求，
+    实际并发连接数由 ASYNC_MAX_CONCURRENCY 限制。
+
+    用法:
+        async with AsyncBinanceClient() as client:
+            df = await async_get_klines(client, "ETHUSDT", "1h", 100)
+    """
+    def __init__(self, base_url=BINANCE_API_URL, limiter=None, max_concurrency=ASYNC_MAX_CONCURRENCY):
+        super().__init__(base_url, limiter or binance_client.limiter, pool_size=max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if aiohttp is None:
+            raise RuntimeError("异步模式需要安装 aiohttp: pip install aiohttp")
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @backoff.on_exception(
+        backoff.expo,
+        NETWORK_ERRORS,
+        max_tries=MAX_RETRIES,
+        max_time=300,
+        giveup=_is_client_error,
+        on_backoff=lambda details: metrics.binance_retries_total.inc(source="backoff")
+    )
+    async def get(self, endpoint, params=None, weight=None):
+        """发送 GET 请求并返回解析后的 JSON"""
+        if self._session is None:
+            await self.open()
+        if weight is None:
+            weight = estimate_weight(endpoint, params)
+        wait = self.limiter.reserve(weight)
+        if wait > 0:
+            if wait > 1:
+                logger.warning(f"Binance 请求权重接近上限，已等待 {wait:.1f} 秒")
+            await asyncio.sleep(wait)
+
+        metrics.binance_weight_requested_total.inc(weight)
+
+        url = f"{self.base_url}/{endpoint}"
+        with metrics.binance_request_seconds.time(endpoint=endpoint):
+            try:
+                async with self._session.get(url, params=params) as response:
+                    self._handle_headers(response.status, response.headers)
+                    metrics.binance_requests_total.inc(endpoint=endpoint, status=response.status)
+                    response.raise_for_status()
+                    return json_loads(await response.read())
+            except NETWORK_ERRORS as e:
+                if getattr(e, "status", None) is None:
+                    metrics.binance_requests_total.inc(endpoint=endpoint, status="error")
+                raise
+
+async def async_get_binance_data(client, endpoint, params=None):
+    """统一的异步 Binance API 请求函数"""
+    try:
+        return await client.get(endpoint, params)
+    except Exception as e:
+        logger.error(f"Binance API 请求失败: {e}")
+        return None
+
+async def _store_call(method, *args):
+    """
+    调用 KlineStore 的同步方法
+
+    启用磁盘缓存时 plan() 可能读取磁盘、merge() 会写入磁盘，放到线程池执行以免阻塞事件循环；
+    未启用时只操作内存，直接调用
+    """
+    if kline_store.disk is None:
+        return method(*args)
+    return await asyncio.to_thread(method, *args)
+
+# 通过K线增量存储异步获取数据
+async def async_get_store_rows(client, symbol, interval, limit, refresh=True):
+    """与 KlineStore.get_rows 相同，但网络请求在事件循环中执行"""
+    for _ in range(2):
+        params, full = await _store_call(kline_store.plan, symbol, interval, limit, refresh)
+        if params is None:
+            return kline_store.cached_rows(symbol, interval, limit)
+        data = await async_get_binance_data(client, "klines", params)
+        if data is None or (full and not data):
+            return None
+        rows = await _store_call(kline_store.merge, symbol, interval, limit, params, full, data)
+        if rows is not None:
+            return rows
+    return None
+
+# 🚀 异步获取 Binance 交易对 K 线数据
+async def async_get_klines(client, symbol, interval="15m", limit=100, refresh=True):
+    try:
+        if USE_KLINE_STORE:
+            data = await async_get_store_rows(client, symbol, interval, limit, refresh)
+        else:
+            params = {
+                "symbol": symbol,
+                "interval": interval,
+                "limit": limit
+            }
+            data = await async_get_binance_data(client, "klines", params)
+        if not data:
+            return None
+
+        return parse_klines(data)
+    except Exception as e:
+        error_message = f"❌ 获取K线数据失败 - {symbol}: {str(e)}"
+        logger.error(error_message)
+        return None
@@ -0,0 +1,419 @@
+"""
+历史回测模块
+
+用与 signals.analyze_frames 相同的评分规则 (modules/scoring) 和与 modules/risk
+相同的止损/止盈/仓位规则回放历史K线，所有K线一次向量化计算，不逐根调用分析函数。
+
+回测分两步：
+- prepare_features(): 计算与参数无关的指标序列和每根K线之后的价格路径
+- evaluate(): 按给定参数计算概率、风险等级、止损止盈并模拟持仓结果
+
+与实时分析一样只使用已收盘的K线（1小时、4小时和日线），每个位置的分析窗口为最近
+99 根1小时K线。唯一的差异：EMA/MACD 使用完整历史计算，实时分析只用窗口内的K线
+（预热期后差异可忽略）。
+
+用法:
+    python -m modules.backtest --symbols BTCUSDT ETHUSDT --data data/history
+    python -m modules.backtest --symbols BTCUSDT --data data/history --download 730
+"""
+import argparse
+import os
+import sys
+import time
+import logging
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from modules import scoring
+from modules.indicators import IndicatorContext
+from modules.kline_disk import DiskKlineCache
+from modules.utils import interval_to_ms
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# 实时分析使用的1小时K线数量：signals.KLINE_INTERVALS["1h"] 根中去掉未收盘的一根
+ANALYSIS_WINDOW = 99
+# 持仓最多观察的K线数量，到期仍未触发止损止盈则按收盘价平仓
+DEFAULT_HORIZON = 24
+
+# 默认参数与 config.py 和 modules/risk 中的数值一致
+DEFAULT_PARAMS = {
+    "rsi_weight": RSI_WEIGHT,
+    "macd_weight": MACD_WEIGHT,
+    "bollinger_weight": BOLLINGER_WEIGHT,
+    "ema_weight": EMA_WEIGHT,
+    "rsi_overbought": RSI_OVERBOUGHT,
+    "rsi_oversold": RSI_OVERSOLD,
+    "entry_threshold": STRONG_SIGNAL_THRESHOLD,  # 上涨概率高于该值做多，低于 100 - 该值做空
+    "atr_multiplier_low": 1.0,   # 低波动率止损ATR倍数
+    "atr_multiplier_mid": 1.5,   # 中波动率
+    "atr_multiplier_high": 2.0,  # 高波动率
+    "fib_low": 1.618,     # 低风险止盈斐波那契扩展位
+    "fib_medium": 2.618,  # 中等风险
+    "fib_high": 3.618,    # 高风险
+    "fee": 0.0,  # 每笔交易的往返手续费（百分比）
+}
+
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "close_time"]
+
+def load_klines(directory, symbol, interval):
+    """
+    读取本地K线文件
+
+    支持 {symbol}_{interval}.bin（K线磁盘缓存格式）和 {symbol}_{interval}.json
+    （Binance K线接口的原始响应），文件不存在时返回 None
+    """
+    cache = DiskKlineCache(directory)
+    if os.path.exists(cache.path(symbol, interval)):
+        return pd.DataFrame(cache.read(symbol, interval), columns=COLUMNS)
+
+    path = os.path.join(directory, f"{symbol}_{interval}.json")
+    if os.path.exists(path):
+        from modules.api import parse_klines
+        with open(path, "rb") as f:
+            return parse_klines(f.read())
+    return None
+
+def resample(df, interval):
+    """由1小时K线合成更长周期的K线"""
+    step = interval_to_ms(interval)
+    bucket = df["timestamp"].astype("int64") // step * step
+    grouped = df.groupby(bucket, sort=True)
+    out = pd.DataFrame({
+        "timestamp": grouped["timestamp"].first().index,
+        "open": grouped["open"].first().values,
+        "high": grouped["high"].max().values,
+        "low": grouped["low"].min().values,
+        "close": grouped["close"].last().values,
+        "volume": grouped["volume"].sum().values,
+    })
+    out["close_time"] = out["timestamp"] + step - 1
+    return out
+
+def load_frames(directory, symbol):
+    """读取 1h/4h/1d K线，缺少的长周期由1小时K线合成"""
+    df_1h = load_klines(directory, symbol, "1h")
+    if df_1h is None or df_1h.empty:
+        return None
+    frames = {"1h": df_1h}
+    for interval in ("4h", "1d"):
+        df = load_klines(directory, symbol, interval)
+        frames[interval] = df if df is not None and not df.empty else resample(df_1h, interval)
+    return frames
+
+def download_history(symbol, interval, days, directory):
+    """分页下载最近 days 天的K线并写入 directory（K线磁盘缓存格式）"""
+    from modules.api import get_binance_data
+    cache = DiskKlineCache(directory, max_records=sys.maxsize)
+    start = int(time.time() * 1000) - days * 86_400_000
+    total = 0
+    while True:
+        data = get_binance_data("klines", {
+            "symbol": symbol, "interval": interval, "startTime": start, "limit": 1000
+        })
+        if not data:
+            break
+        cache.write(symbol, interval, data)
+        total += len(data)
+        if len(data) < 1000:
+            break
+        start = int(data[-1][6]) + 1
+    logger.info(f"{symbol} {interval} 下载 {total} 根K线")
+    return total
+
+def _closed_values(df_1h, df, values):
+    """取每根1小时K线收盘时最近一根已收盘的长周期K线的值"""
+    left = pd.DataFrame({"close_time": df_1h["close_time"].astype("int64").values})
+    right = pd.DataFrame({
+        "close_time": df["close_time"].astype("int64").values,
+        "value": np.asarray(values, dtype=float)
+    })
+    return pd.merge_asof(left, right, on="close_time", direction="backward")["value"].to_numpy()
+
+def prepare_symbol(df_1h, df_4h, df_1d, horizon=DEFAULT_HORIZON, window=ANALYSIS_WINDOW):
+    """
+    计算单个交易对与参数无关的特征
+
+    只保留前面有完整分析窗口、后面有 horizon 根K线的位置
+    """
+    ctx = IndicatorContext(df_1h)
+    close = df_1h["close"].astype(float)
+    high = df_1h["high"].to_numpy(dtype=float)
+    low = df_1h["low"].to_numpy(dtype=float)
+    _, _, histogram = ctx.macd()
+    _, upper_band, lower_band = ctx.bollinger_bands()
+    window_start = close.shift(window - 1)
+
+    features = {
+        "price": close.to_numpy(),
+        "rsi_1h": ctx.rsi().to_numpy(),
+        "rsi_4h": _closed_values(df_1h, df_4h, IndicatorContext(df_4h).rsi()),
+        "rsi_1d": _closed_values(df_1h, df_1d, IndicatorContext(df_1d).rsi()),
+        "macd_histogram": histogram.to_numpy(),
+        "bb_upper": upper_band.to_numpy(),
+        "bb_lower": lower_band.to_numpy(),
+        "ema_short": ctx.ema(EMA_SHORT).to_numpy(),
+        "ema_long": ctx.ema(EMA_LONG).to_numpy(),
+        "atr": ctx.atr(ATR_PERIOD).to_numpy(),
+        # 分析窗口内的涨跌幅和收益率标准差（get_market_type 与止损使用）
+        "price_change": ((close - window_start) / window_start * 100).to_numpy(),
+        "volatility": (ctx.returns().rolling(window - 1).std() * 100).to_numpy(),
+        "rolling_volatility": ctx.rolling_volatility(20).to_numpy(),
+        # 止盈使用的近30根K线高低点
+        "recent_high": df_1h["high"].rolling(30, min_periods=1).max().to_numpy(dtype=float),
+        "recent_low": df_1h["low"].rolling(30, min_periods=1).min().to_numpy(dtype=float),
+        "exit_close": close.shift(-horizon).to_numpy(),
+    }
+
+    n = len(df_1h)
+    rows = slice(window - 1, n - horizon)
+    if rows.start >= rows.stop:
+        return None
+    features = {key: values[rows] for key, values in features.items()}
+    # 之后 horizon 根K线的最高价和最低价路径
+    features["future_high"] = sliding_window_view(high[1:], horizon)[rows]
+    features["future_low"] = sliding_window_view(low[1:], horizon)[rows]
+    return features
+
+def prepare_features(frames, horizon=DEFAULT_HORIZON):
+    """
+    计算所有交易对的回测特征
+
+    参数:
+    - frames: {交易对: {"1h": df, "4h": df, "1d": df}}
+
+    返回:
+    - 各特征拼接后的数组字典，symbol 列为交易对序号，symbols 为交易对列表
+    """
+    parts, symbols = [], []
+    for symbol, symbol_frames in frames.items():
+        features = prepare_symbol(symbol_frames["1h"], symbol_frames["4h"], symbol_frames["1d"], horizon)
+        if features is None:
+            logger.warning(f"{symbol} K线数量不足，跳过回测")
+            continue
+        features["symbol"] = np.full(len(features["price"]), len(symbols))
+        symbols.append(symbol)
+        parts.append(features)
+    if not parts:
+        raise ValueError("没有可用于回测的K线数据")
+
+    features = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    features.update(_fixed_scores(features))
+    features["symbols"] = symbols
+    features["horizon"] = horizon
+    return features
+
+def _fixed_scores(features):
+    """与参数无关的评分项，只计算一次供每组参数复用"""
+    ema_short, ema_long = features["ema_short"], features["ema_long"]
+    return {
+        "rsi_composite": scoring.rsi_composite(features["rsi_1h"], features["rsi_4h"], features["rsi_1d"]),
+        "macd_probability": scoring.macd_probability(features["macd_histogram"]),
+        "bb_probability": scoring.bb_probability(
+            scoring.price_position_bb(features["price"], features["bb_upper"], features["bb_lower"])
+        ),
+        "trend_probability": scoring.trend_probability(ema_short, ema_long),
+        "market_risk": _market_risk(features),
+    }
+
+def _market_risk(features):
+    """get_market_type 与 evaluate_risk_level 中市场类型对应的风险分"""
+    ema_short, ema_long = features["ema_short"], features["ema_long"]
+    price_change = features["price_change"]
+    strong_up = (ema_short > ema_long) & (price_change > 5)
+    strong_down = (ema_short < ema_long) & (price_change < -5)
+    ranging = np.abs(price_change) < 2
+    return np.select([strong_up | strong_down, ranging], [5, 25], 15)
+
+def evaluate(features, params=None, trades=False):
+    """
+    按给定参数回测
+
+    参数:
+    - features: prepare_features 的结果
+    - params: 覆盖 DEFAULT_PARAMS 的参数
+    - trades: 是否同时返回逐笔交易明细 DataFrame
+
+    返回:
+    - 统计结果字典（trades 为 True 时返回 (统计结果, 交易明细)）
+    """
+    start = time.perf_counter()
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    f = features
+    price = f["price"]
+
+    # 上涨概率（与 analyze_frames 相同）
+    probability = scoring.up_probability(
+        scoring.rsi_probability(f["rsi_composite"], p["rsi_overbought"], p["rsi_oversold"]),
+        f["macd_probability"],
+        f["bb_probability"],
+        f["trend_probability"],
+        p["rsi_weight"], p["macd_weight"], p["bollinger_weight"], p["ema_weight"]
+    )
+
+    # 风险收益比和风险等级（与 evaluate_risk_level 相同）
+    is_buy = scoring.direction(probability) == "buy"
+    upside = (f["bb_upper"] - price) / price * 100
+    downside = (price - f["bb_lower"]) / price * 100
+    reward = np.where(is_buy, upside, downside)
+    risk = np.where(is_buy, downside, upside)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rr_ratio = np.where(risk > 0, reward / risk, 1.0)
+    risk_score = (
+        (50 - np.abs(probability - 50)) +
+        f["market_risk"] +
+        np.select([rr_ratio >= 3, rr_ratio >= 2], [5, 10], 20)
+    )
+    risk_level = np.select([risk_score < 40, risk_score < 70], [0, 1], 2)  # low / medium / high
+
+    # 止损（ATR方法）、止盈（斐波那契扩展）和仓位（与 modules/risk 相同）
+    side = np.where(probability > 50, 1, -1)
+    volatility = f["volatility"]
+    atr_multiplier = np.select(
+        [volatility > 5, volatility > 3],
+        [p["atr_multiplier_high"], p["atr_multiplier_mid"]],
+        p["atr_multiplier_low"]
+    )
+    stop_distance = np.clip(f["atr"] * atr_multiplier / price, 0.005, 0.10)
+    stop_loss = price * (1 - side * stop_distance)
+
+    fib_level = np.choose(risk_level, [p["fib_low"], p["fib_medium"], p["fib_high"]])
+    price_range = f["recent_high"] - f["recent_low"]
+    take_profit = np.where(
+        side > 0,
+        np.minimum(f["recent_low"] + price_range * fib_level, price * 1.5),
+        np.maximum(f["recent_high"] - price_range * fib_level, price * 0.5)
+    )
+
+    rolling_volatility = f["rolling_volatility"]
+    position_size = np.clip(
+        np.choose(risk_level, [0.3, 0.5, 0.1]) *
+        np.select([rolling_volatility > 5, rolling_volatility > 3], [0.5, 0.7], 1.0),
+        0.05, 1.0
+    )
+
+    # 强烈信号开仓
+    entry = (
+        ((probability > p["entry_threshold"]) | (probability < 100 - p["entry_threshold"])) &
+        ~np.isnan(stop_loss) & ~np.isnan(take_profit)
+    )
+    idx = np.flatnonzero(entry)
+    entry_side = side[idx]
+    entry_price = price[idx]
+    sl, tp = stop_loss[idx], take_profit[idx]
+    future_high, future_low = f["future_high"][idx], f["future_low"][idx]
+    horizon = f["horizon"]
+
+    # 之后每根K线是否触及止盈/止损，取第一次触及的位置（同一根K线同时触及按止损计）
+    long = entry_side[:, None] > 0
+    tp_hit = np.where(long, future_high >= tp[:, None], future_low <= tp[:, None])
+    sl_hit = np.where(long, future_low <= sl[:, None], future_high >= sl[:, None])
+    tp_bar = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), horizon)
+    sl_bar = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), horizon)
+
+    stopped = (sl_bar < horizon) & (sl_bar <= tp_bar)
+    targeted = (tp_bar < horizon) & ~stopped
+    exit_price = np.select([stopped, targeted], [sl, tp], f["exit_close"][idx])
+    pnl = entry_side * (exit_price - entry_price) / entry_price * 100 - p["fee"]
+    weighted_pnl = pnl * position_size[idx]
+
+    # 全部非中性信号的方向准确率
+    directional = np.abs(probability - 50) > 10
+    moved_up = f["exit_close"] > price
+
+    count = len(idx)
+    gains, losses = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+    seconds = time.perf_counter() - start
+    stats = {
+        **{key: p[key] for key in DEFAULT_PARAMS},
+        "bars": len(price),
+        "trades": count,
+        "long_trades": int((entry_side > 0).sum()),
+        "short_trades": int((entry_side < 0).sum()),
+        "hit_rate": float((pnl > 0).mean()) if count else np.nan,
+        "take_profit_rate": float(targeted.mean()) if count else np.nan,
+        "stop_loss_rate": float(stopped.mean()) if count else np.nan,
+        "avg_pnl": float(pnl.mean()) if count else np.nan,
+        "total_pnl": float(pnl.sum()),
+        "weighted_pnl": float(weighted_pnl.sum()),
+        "profit_factor": float(gains / losses) if losses > 0 else np.nan,
+        "direction_accuracy": float((moved_up[directional] == (probability[directional] > 50)).mean())
+            if directional.any() else np.nan,
+        "seconds": seconds,
+        "bars_per_second": len(price) / seconds if seconds > 0 else np.nan,
+    }
+    if not trades:
+        return stats
+
+    detail = pd.DataFrame({
+        "symbol": np.asarray(f["symbols"])[f["symbol"][idx]],
+        "side": np.where(entry_side > 0, "buy", "sell"),
+        "up_probability": probability[idx],
+        "risk_level": np.asarray(["low", "medium", "high"])[risk_level[idx]],
+        "price": entry_price,
+        "stop_loss": sl,
+        "take_profit": tp,
+        "exit": np.select([stopped, targeted], ["stop_loss", "take_profit"], "timeout"),
+        "exit_price": exit_price,
+        "pnl": pnl,
+        "position_size": position_size[idx],
+    })
+    return stats, detail
+
+def format_report(stats, detail=None):
+    """生成文本回测报告"""
+    lines = [
+        f"K线数量: {stats['bars']}",
+        f"交易次数: {stats['trades']} (做多 {stats['long_trades']} / 做空 {stats['short_trades']})",
+        f"胜率: {stats['hit_rate']:.2%}",
+        f"止盈/止损触发率: {stats['take_profit_rate']:.2%} / {stats['stop_loss_rate']:.2%}",
+        f"平均收益: {stats['avg_pnl']:.3f}%  累计收益: {stats['total_pnl']:.2f}%  按仓位加权: {stats['weighted_pnl']:.2f}%",
+        f"盈亏比: {stats['profit_factor']:.2f}",
+        f"方向准确率: {stats['direction_accuracy']:.2%}",
+        f"评估耗时: {stats['seconds'] * 1000:.1f}ms ({stats['bars_per_second']:,.0f} 根K线/秒)",
+    ]
+    if detail is not None and not detail.empty:
+        by_symbol = detail.groupby("symbol")["pnl"].agg(
+            trades="count", hit_rate=lambda pnl: (pnl > 0).mean(), total_pnl="sum"
+        )
+        lines += ["", by_symbol.to_string(float_format=lambda value: f"{value:.3f}")]
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="信号策略历史回测")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--data", default="data/history", help="本地K线目录")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="最长持仓K线数")
+    parser.add_argument("--threshold", type=float, default=STRONG_SIGNAL_THRESHOLD, help="开仓概率阈值")
+    parser.add_argument("--fee", type=float, default=0.0, help="往返手续费（百分比）")
+    parser.add_argument("--download", type=int, metavar="DAYS", help="先从 Binance 下载最近 DAYS 天的K线")
+    parser.add_argument("--trades", help="逐笔交易明细输出的 CSV 路径")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.download:
+        for symbol in args.symbols:
+            for interval in ("1h", "4h", "1d"):
+                download_history(symbol, interval, args.download, args.data)
+
+    frames = {}
+    for symbol in args.symbols:
+        symbol_frames = load_frames(args.data, symbol)
+        if symbol_frames is None:
+            logger.warning(f"{args.data} 中没有 {symbol} 的1小时K线")
+            continue
+        frames[symbol] = symbol_frames
+
+    start = time.perf_counter()
+    features = prepare_features(frames, args.horizon)
+    prepare_seconds = time.perf_counter() - start
+    stats, detail = evaluate(features, {"entry_threshold": args.threshold, "fee": args.fee}, trades=True)
+
+    print(f"特征计算耗时: {prepare_seconds:.2f}s")
+    print(format_report(stats, detail))
+    if args.trades:
+        detail.to_csv(args.trades, index=False)
+
+if __name__ == "__main__":
+    main()
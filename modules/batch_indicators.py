@@ -0,0 +1,168 @@
+"""
+多交易对批量技术指标计算模块
+
+输入为 (交易对 × 时间 × OHLCV) 的 NumPy 数组，一次向量化计算所有交易对的
+RSI、MACD、布林带、EMA 和 ATR，结果与 modules/indicators 中逐个交易对的
+pandas 实现一致。长度不足的交易对在时间轴前部用 NaN 补齐。
+
+用法:
+    ohlcv = stack_frames([df_eth, df_bnb, ...])
+    inputs = compute_batch_inputs(ohlcv)
+    scores = score_batch(frames_1h, frames_4h, frames_1d)
+
+signals 的并发和异步监控周期通过 signals.analyze_batch 使用 score_batch。
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from modules import scoring
+from config import *
+
+# OHLCV 在最后一维中的位置
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+def stack_frames(frames, length=None):
+    """
+    将多个K线 DataFrame 合并为 (交易对, 时间, OHLCV) 数组
+
+    参数:
+    - frames: DataFrame 列表
+    - length: 时间轴长度，默认取最长的 DataFrame；较短的在前部补 NaN，较长的只保留最近部分
+    """
+    if length is None:
+        length = max(len(df) for df in frames)
+    ohlcv = np.full((len(frames), length, len(OHLCV_COLUMNS)), np.nan)
+    for i, df in enumerate(frames):
+        values = df[OHLCV_COLUMNS].to_numpy(dtype=float)[-length:]
+        ohlcv[i, length - len(values):] = values
+    return ohlcv
+
+def rolling_mean(values, window):
+    """沿时间轴的滚动均值，窗口内有 NaN 或不足 window 时为 NaN"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(values, window, axis=1).mean(axis=-1)
+    return out
+
+def rolling_std(values, window):
+    """沿时间轴的滚动样本标准差"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(values, window, axis=1).std(axis=-1, ddof=1)
+    return out
+
+def ema(values, period):
+    """沿时间轴的EMA（adjust=False），跳过前部的 NaN"""
+    alpha = 2 / (period + 1)
+    out = np.empty(values.shape)
+    prev = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        current = values[:, t]
+        prev = np.where(np.isnan(prev), current, alpha * current + (1 - alpha) * prev)
+        out[:, t] = prev
+    return out
+
+def _previous(values):
+    """沿时间轴向后移一位"""
+    out = np.full(values.shape, np.nan)
+    out[:, 1:] = values[:, :-1]
+    return out
+
+def batch_rsi(ohlcv, period=RSI_PERIOD):
+    """批量计算RSI"""
+    close = ohlcv[:, :, CLOSE]
+    delta = close - _previous(close)
+    with np.errstate(invalid="ignore"):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    # 补齐部分保持 NaN，每个交易对的第一根K线记为 0（与 pandas 实现一致）
+    padding = np.isnan(close)
+    gain[padding] = np.nan
+    loss[padding] = np.nan
+
+    avg_gain = rolling_mean(gain, period)
+    avg_loss = rolling_mean(loss, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+def batch_macd(ohlcv, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    """批量计算MACD，返回 (MACD线, 信号线, 柱状图)"""
+    close = ohlcv[:, :, CLOSE]
+    macd_line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+def batch_bollinger_bands(ohlcv, period=BOLLINGER_PERIOD, std_dev=BOLLINGER_STD):
+    """批量计算布林带，返回 (中轨, 上轨, 下轨)"""
+    close = ohlcv[:, :, CLOSE]
+    sma = rolling_mean(close, period)
+    std = rolling_std(close, period)
+    return sma, sma + std * std_dev, sma - std * std_dev
+
+def batch_ema(ohlcv, period):
+    """批量计算EMA"""
+    return ema(ohlcv[:, :, CLOSE], period)
+
+def batch_atr(ohlcv, period=ATR_PERIOD):
+    """批量计算ATR"""
+    high, low = ohlcv[:, :, HIGH], ohlcv[:, :, LOW]
+    prev_close = _previous(ohlcv[:, :, CLOSE])
+    # fmax 忽略 NaN，第一根K线的真实波幅为 high - low
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range[np.isnan(high - low)] = np.nan
+    return rolling_mean(true_range, period)
+
+def _last(values):
+    return values[:, -1]
+
+def compute_batch_inputs(ohlcv):
+    """
+    一次计算所有交易对在最新K线上的指标值
+
+    返回:
+    - 字典，每个值为长度等于交易对数量的数组
+    """
+    close = ohlcv[:, :, CLOSE]
+    _, _, histogram = batch_macd(ohlcv)
+    middle_band, upper_band, lower_band = batch_bollinger_bands(ohlcv)
+
+    # 每个交易对第一根有效收盘价，用于计算窗口内涨跌幅
+    first_valid = np.argmax(~np.isnan(close), axis=1)
+    first_close = close[np.arange(close.shape[0]), first_valid]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = close / _previous(close) - 1
+        price_change = (_last(close) - first_close) / first_close * 100
+    valid_returns = np.sum(~np.isnan(returns), axis=1)
+    with np.errstate(invalid="ignore"):
+        volatility = np.where(valid_returns > 1, np.nanstd(returns, axis=1, ddof=1), np.nan) * 100
+
+    return {
+        "price": _last(close),
+        "rsi": _last(batch_rsi(ohlcv)),
+        "macd_histogram": _last(histogram),
+        "bb_middle": _last(middle_band),
+        "bb_upper": _last(upper_band),
+        "bb_lower": _last(lower_band),
+        "ema_short": _last(batch_ema(ohlcv, EMA_SHORT)),
+        "ema_long": _last(batch_ema(ohlcv, EMA_LONG)),
+        "atr": _last(batch_atr(ohlcv)),
+        "price_change": price_change,
+        "volatility": volatility,
+    }
+
+def score_batch(frames_1h, frames_4h, frames_1d):
+    """
+    批量计算多个交易对的上涨概率
+
+    参数:
+    - frames_1h / frames_4h / frames_1d: 按相同交易对顺序排列的 DataFrame 列表
+
+    返回:
+    - 1小时指标值、rsi_4h、rsi_1d 以及 scoring.score_inputs 的评分结果
+    """
+    inputs = compute_batch_inputs(stack_frames(frames_1h))
+    inputs["rsi_4h"] = _last(batch_rsi(stack_frames(frames_4h)))
+    inputs["rsi_1d"] = _last(batch_rsi(stack_frames(frames_1d)))
+    inputs.update(scoring.score_inputs(inputs))
+    return inputs
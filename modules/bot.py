@@ -4,12 +4,39 @@ Telegram机器人核心功能
 import telebot
 import logging
 import time
+from modules import metrics
+from modules.dispatcher import MessageDispatcher
 from config import *
 
 logger = logging.getLogger(__name__)
 
+class InstrumentedTeleBot(telebot.TeleBot):
+    """记录消息发送耗时和失败次数的 TeleBot（reply_to 也经过 send_message）"""
+    def _timed(self, method, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            metrics.telegram_send_errors_total.inc(method=method)
+            raise
+        finally:
+            metrics.telegram_send_seconds.observe(time.perf_counter() - start, method=method)
+
+    def send_message(self, *args, **kwargs):
+        return self._timed("send_message", super().send_message, *args, **kwargs)
+
+    def send_document(self, *args, **kwargs):
+        return self._timed("send_document", super().send_document, *args, **kwargs)
+
 # 初始化机器人
-bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN)
+bot = InstrumentedTeleBot(TELEGRAM_BOT_TOKEN)
+
+# 外发消息队列：所有 send_message/reply_to 经由它限速发送
+dispatcher = MessageDispatcher(bot)
+metrics.gauge(
+    "telegram_queue_depth", "等待发送的 Telegram 消息数量",
+    function=dispatcher.queue_depth
+)
 
 # 🚀 仅允许授权用户使用
 def is_authorized(user_id):
@@ -26,7 +53,7 @@ def is_authorized(user_id):
 def send_startup_message():
     """发送机器人启动消息"""
     try:
-        bot.send_message(CHAT_ID, f"@{OWNER_ID} 🤖 交易信号监控机器人已启动！\n\n使用 /m 查看市场概况\n使用 /help 查看帮助")
+        dispatcher.send(CHAT_ID, f"@{OWNER_ID} 🤖 交易信号监控机器人已启动！\n\n使用 /m 查看市场概况\n使用 /help 查看帮助")
     except Exception as e:
         logger.error(f"无法发送启动消息: {e}")
 
@@ -35,10 +62,8 @@ def handle_error(e, context=""):
     """统一错误处理"""
     error_message = f"@{OWNER_ID} ❌ 机器人运行异常 {context}: {str(e)}"
     logger.error(error_message)
-    try:
-        bot.send_message(CHAT_ID, error_message)
-    except:
-        pass
+    # 短时间内的多条错误合并为一条消息
+    dispatcher.send(CHAT_ID, error_message, coalesce="error")
 
 # 机器人轮询函数
 def run_bot():
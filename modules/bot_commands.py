@@ -2,21 +2,61 @@
 Telegram机器人命令处理模块
 """
 import logging
+import threading
 from telebot import types
-from modules.bot import bot, is_authorized
+from modules.bot import bot, dispatcher, is_authorized
 from modules.signals import calculate_probability, monitor_symbols, send_market_overview
 from modules.utils import load_user_symbols, save_user_symbols
 from modules.api import get_klines
+from modules.stream import kline_stream
+from modules.profiling import send_profile
+from modules.executor import command_executor
+from modules.symbols import symbol_index, normalize, legacy_symbol
 from config import *
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# 解析命令中的交易对
+def resolve_symbol(text):
+    """
+    将用户输入解析为交易对
+
+    返回:
+    - (交易对, None)，无法解析时返回 (None, 错误提示)
+    """
+    if not symbol_index.ensure_loaded():
+        # 交易对索引不可用时退回旧规则，通过K线验证交易对是否存在
+        symbol = legacy_symbol(text)
+        test_data = get_klines(symbol, interval="1h", limit=1)
+        if test_data is None or test_data.empty:
+            return None, f"❌ 交易对 {symbol} 不存在或无法获取数据"
+        return symbol, None
+    
+    symbol = symbol_index.resolve(text)
+    if symbol:
+        return symbol, None
+    suggestions = symbol_index.suggest(text)
+    hint = f"\n你是不是要找: {', '.join(suggestions)}" if suggestions else ""
+    return None, f"❌ 找不到交易对 {normalize(text)}{hint}"
+
+# 在监控列表中查找交易对（支持只输入币种）
+def find_watched_symbol(text, symbols):
+    name = normalize(text)
+    if name in symbols:
+        return name
+    for symbol in symbols:
+        pair = symbol_index.split(symbol)
+        if pair and pair[0] == name:
+            return symbol
+    return legacy_symbol(text)
+
 # 帮助命令
 @bot.message_handler(commands=['h', 'help'])
+@command_executor.fast
 def help_command(message):
     if not is_authorized(message.chat.id):
-        bot.reply_to(message, "🚫 你无权使用此机器人！")
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
         return
     
     help_text = (
@@ -29,61 +69,56 @@ def help_command(message):
         "🔍 <b>/risk ETH</b>\n- 查看特定交易对的详细风险分析\n\n"
         "🆔 <b>/myid</b>\n- 获取你的用户ID\n\n"
         "✅ <b>/test</b>\n- 测试机器人是否正常响应\n\n"
+        "⏱ <b>/profile</b>\n- 分析一次监控周期的性能（仅所有者）\n\n"
+        "📈 <b>/stats</b>\n- 查看命令响应耗时统计\n\n"
         "❓ <b>/help</b> 或 <b>/h</b>\n- 显示此帮助信息"
     )
     
-    bot.reply_to(message, help_text, parse_mode="HTML")
+    dispatcher.reply(message, help_text, parse_mode="HTML")
 
 # 获取用户ID
 @bot.message_handler(commands=['myid'])
+@command_executor.fast
 def my_id(message):
-    bot.reply_to(message, f"🆔 你的用户ID是: {message.from_user.id}")
+    dispatcher.reply(message, f"🆔 你的用户ID是: {message.from_user.id}")
 
 # 市场分析命令
 @bot.message_handler(commands=['m', 'market'])
+@command_executor.heavy(timeout=120)
 def market_command(message):
     if not is_authorized(message.chat.id):
-        bot.reply_to(message, "🚫 你无权使用此机器人！")
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
         return
     
-    bot.reply_to(message, "📊 正在获取市场数据，请稍等...")
+    dispatcher.reply(message, "📊 正在获取市场数据，请稍等...")
     send_market_overview()
 
 # 添加新命令处理函数 (添加监控币种)
 @bot.message_handler(commands=['add'])
+@command_executor.heavy(timeout=30)
 def add_symbol(message):
     if not is_authorized(message.chat.id):
-        bot.reply_to(message, "🚫 你无权使用此机器人！")
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
         return
         
     args = message.text.split()
     if len(args) < 2:
-        bot.reply_to(message, "❌ 请指定要添加的币种，例如: /add BTC")
+        dispatcher.reply(message, "❌ 请指定要添加的币种，例如: /add BTC")
         return
         
-    # 获取币名并转换为大写
-    coin = args[1].upper()
-    
-    # 如果已经包含USDT，使用原样，否则添加USDT后缀
-    if 'USDT' in coin:
-        symbol = coin
-    else:
-        symbol = f"{coin}USDT"
+    # 验证交易对是否存在（BTC、BTCUSDT、ETH/BTC 等写法均可）
+    symbol, error = resolve_symbol(args[1])
+    if error:
+        dispatcher.reply(message, error)
+        return
     
-    # 验证交易对是否存在
     try:
-        # 尝试获取K线数据，验证交易对是否存在
-        test_data = get_klines(symbol, interval="1h", limit=1)
-        if test_data is None or test_data.empty:
-            bot.reply_to(message, f"❌ 交易对 {symbol} 不存在或无法获取数据")
-            return
-            
         # 加载当前监控列表
         current_symbols = load_user_symbols()
         
         # 检查是否已存在
         if symbol in current_symbols:
-            bot.reply_to(message, f"ℹ️ {symbol} 已在监控列表中")
+            dispatcher.reply(message, f"ℹ️ {symbol} 已在监控列表中")
             return
             
         # 添加到列表
@@ -91,41 +126,36 @@ def add_symbol(message):
         
         # 保存更新后的列表
         if save_user_symbols(current_symbols):
-            bot.reply_to(message, f"✅ 已添加 {symbol} 到监控列表")
+            dispatcher.reply(message, f"✅ 已添加 {symbol} 到监控列表")
         else:
-            bot.reply_to(message, f"❌ 保存监控列表失败，请稍后再试")
+            dispatcher.reply(message, f"❌ 保存监控列表失败，请稍后再试")
             
     except Exception as e:
         logger.error(f"添加监控币种失败 - {symbol}: {e}")
-        bot.reply_to(message, f"❌ 添加失败: {str(e)}")
+        dispatcher.reply(message, f"❌ 添加失败: {str(e)}")
 
 # 添加新命令处理函数 (移除监控币种)
 @bot.message_handler(commands=['remove'])
+@command_executor.fast
 def remove_symbol(message):
     if not is_authorized(message.chat.id):
-        bot.reply_to(message, "🚫 你无权使用此机器人！")
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
         return
         
     args = message.text.split()
     if len(args) < 2:
-        bot.reply_to(message, "❌ 请指定要移除的币种，例如: /remove BTC")
+        dispatcher.reply(message, "❌ 请指定要移除的币种，例如: /remove BTC")
         return
     
-    # 获取币名并转换为大写
-    coin = args[1].upper()
-    
-    # 如果已经包含USDT，使用原样，否则添加USDT后缀
-    if 'USDT' in coin:
-        symbol = coin
-    else:
-        symbol = f"{coin}USDT"
-    
     # 加载当前监控列表
     current_symbols = load_user_symbols()
     
+    # 只输入币种时匹配监控列表中该币种的交易对
+    symbol = find_watched_symbol(args[1], current_symbols)
+    
     # 检查是否存在
     if symbol not in current_symbols:
-        bot.reply_to(message, f"ℹ️ {symbol} 不在监控列表中")
+        dispatcher.reply(message, f"ℹ️ {symbol} 不在监控列表中")
         return
         
     # 从列表中移除
@@ -133,63 +163,56 @@ def remove_symbol(message):
     
     # 保存更新后的列表
     if save_user_symbols(current_symbols):
-        bot.reply_to(message, f"✅ 已从监控列表中移除 {symbol}")
+        dispatcher.reply(message, f"✅ 已从监控列表中移除 {symbol}")
     else:
-        bot.reply_to(message, f"❌ 保存监控列表失败，请稍后再试")
+        dispatcher.reply(message, f"❌ 保存监控列表失败，请稍后再试")
 
 # 添加新命令处理函数 (查看监控列表)
 @bot.message_handler(commands=['list'])
+@command_executor.fast
 def list_symbols(message):
     if not is_authorized(message.chat.id):
-        bot.reply_to(message, "🚫 你无权使用此机器人！")
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
         return
     
     # 加载当前监控列表
     current_symbols = load_user_symbols()
     
     if not current_symbols:
-        bot.reply_to(message, "📋 监控列表为空")
+        dispatcher.reply(message, "📋 监控列表为空")
         return
         
     # 格式化列表
     symbols_list = "\n".join([f"• {symbol}" for symbol in current_symbols])
-    bot.reply_to(message, f"📋 当前监控列表:\n{symbols_list}")
+    dispatcher.reply(message, f"📋 当前监控列表:\n{symbols_list}")
 
 # 添加风险分析命令
 @bot.message_handler(commands=['risk'])
+@command_executor.heavy(timeout=60)
 def risk_analysis(message):
     if not is_authorized(message.chat.id):
-        bot.reply_to(message, "🚫 你无权使用此机器人！")
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
         return
         
     args = message.text.split()
     if len(args) < 2:
-        bot.reply_to(message, "❌ 请指定要分析的币种，例如: /risk BTC")
+        dispatcher.reply(message, "❌ 请指定要分析的币种，例如: /risk BTC")
         return
     
-    # 获取币名并转换为大写
-    coin = args[1].upper()
-    
-    # 如果已经包含USDT，使用原样，否则添加USDT后缀
-    if 'USDT' in coin:
-        symbol = coin
-    else:
-        symbol = f"{coin}USDT"
+    # 验证交易对是否存在
+    symbol, error = resolve_symbol(args[1])
+    if error:
+        dispatcher.reply(message, error)
+        return
     
-    bot.reply_to(message, f"🔍 正在分析 {symbol} 的风险参数，请稍等...")
+    dispatcher.reply(message, f"🔍 正在分析 {symbol} 的风险参数，请稍等...")
     
     try:
-        # 尝试获取K线数据，验证交易对是否存在
-        test_data = get_klines(symbol, interval="1h", limit=1)
-        if test_data is None or test_data.empty:
-            bot.reply_to(message, f"❌ 交易对 {symbol} 不存在或无法获取数据")
-            return
-        
         # 获取分析数据
         prob_data = calculate_probability(symbol)
         
         if not prob_data:
-            bot.reply_to(message, f"❌ 无法获取 {symbol} 的数据，请确认交易对是否正确")
+            dispatcher.reply(message, f"❌ 无法获取 {symbol} 的数据，请确认交易对是否正确")
             return
             
         # 风险图标
@@ -236,29 +259,65 @@ def risk_analysis(message):
             f"└ MACD柱状图: {prob_data.get('macd_histogram', 0):.6f}\n"
             f"└ 布林带位置: {prob_data.get('price_position_bb', 0):.2f}\n"
             f"└ ATR: {prob_data.get('atr', 0):.4f}\n\n"
+            f"{live_indicator_text(symbol)}"
             
             f"💡 交易建议:\n"
             f"└ 短期: {prob_data.get('short_term_rec', 'N/A')}\n"
             f"└ 长期: {prob_data.get('long_term_rec', 'N/A')}"
         )
         
-        bot.reply_to(message, message_text)
+        dispatcher.reply(message, message_text)
         
     except Exception as e:
         logger.error(f"分析 {symbol} 风险失败: {e}")
-        bot.reply_to(message, f"❌ 分析失败: {str(e)}")
+        dispatcher.reply(message, f"❌ 分析失败: {str(e)}")
+
+# 推送维护的未收盘K线指标（分析只使用已收盘K线）
+def live_indicator_text(symbol, interval="1h"):
+    live = kline_stream.live_indicators(symbol, interval)
+    if not live:
+        return ""
+    return (
+        f"⏱ 实时指标 ({interval} 未收盘):\n"
+        f"└ 最新价格: ${live['price']:.4f}\n"
+        f"└ RSI: {live['rsi']:.1f}\n"
+        f"└ MACD柱状图: {live['macd_histogram']:.6f}\n\n"
+    )
+
+# 性能分析命令（仅所有者）
+@bot.message_handler(commands=['profile'])
+@command_executor.fast
+def profile_command(message):
+    if str(message.from_user.id) != str(OWNER_ID):
+        dispatcher.reply(message, "🚫 只有所有者可以使用此命令！")
+        return
+    
+    dispatcher.reply(message, "⏱ 正在分析一次监控周期，完成后发送报告...")
+    threading.Thread(target=send_profile, args=(message.chat.id,), daemon=True).start()
+
+# 命令耗时统计
+@bot.message_handler(commands=['stats'])
+@command_executor.fast
+def stats_command(message):
+    if not is_authorized(message.chat.id):
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
+        return
+    
+    dispatcher.reply(message, command_executor.format_stats())
 
 # 添加一个简单的测试命令
 @bot.message_handler(commands=['test'])
+@command_executor.fast
 def test_command(message):
     """测试机器人是否正常响应"""
-    bot.reply_to(message, "✅ 机器人工作正常!")
+    dispatcher.reply(message, "✅ 机器人工作正常!")
 
 # 处理未知命令
 @bot.message_handler(func=lambda message: True)
+@command_executor.fast
 def echo_all(message):
     if not is_authorized(message.chat.id):
-        bot.reply_to(message, "🚫 你无权使用此机器人！")
+        dispatcher.reply(message, "🚫 你无权使用此机器人！")
         return
         
-    bot.reply_to(message, "❓ 未知命令，使用 /help 查看可用命令") 
\ No newline at end of file
+    dispatcher.reply(message, "❓ 未知命令，使用 /help 查看可用命令") 
\ No newline at end of file
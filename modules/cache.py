@@ -0,0 +1,146 @@
+"""
+结果缓存模块
+"""
+import time
+import threading
+import functools
+from collections import OrderedDict
+from config import *
+
+class ResultCache:
+    """
+    线程安全的 LRU 结果缓存
+
+    - 超过 maxsize 时淘汰最久未使用的条目
+    - 条目在版本号变化（例如有新K线收盘）时失效；设置 ttl 时超过 ttl 秒也会失效
+    - 记录命中、未命中和淘汰次数
+    """
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (version, time, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version=None):
+        """
+        查询缓存
+
+        返回:
+        - (是否命中, 缓存值)
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry_version, created, value = entry
+                if entry_version == version and (self.ttl is None or time.monotonic() - created < self.ttl):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, version=None):
+        """写入缓存，必要时淘汰最久未使用的条目"""
+        with self.lock:
+            self.entries[key] = (version, time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """删除指定条目（不指定则清空）"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+def make_key(args, kwargs):
+    return args + tuple(sorted(kwargs.items())) if kwargs else args
+
+# 缓存装饰器
+def cache_result(maxsize=RESULT_CACHE_SIZE, ttl=None, version=None):
+    """
+    缓存函数结果的装饰器
+
+    参数:
+    - maxsize: 最大条目数
+    - ttl: 条目最长有效期（秒）；默认提供 version 时只按版本失效，否则为 RESULT_CACHE_TTL
+    - version: 可选函数，接收与被装饰函数相同的参数，返回当前数据版本
+
+    返回值为 None 时不缓存。被装饰函数的 cache 属性为对应的 ResultCache，
+    map 属性用于批量查询并一次计算所有未命中的参数。
+    """
+    if ttl is None and version is None:
+        ttl = RESULT_CACHE_TTL
+    
+    def decorator(func):
+        cache = ResultCache(maxsize, ttl)
+        
+        def current_version(args, kwargs):
+            return version(*args, **kwargs) if version else None
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            key_version = current_version(args, kwargs)
+            hit, result = cache.get(key, key_version)
+            if hit:
+                return result
+            
+            # 执行函数并缓存结果
+            result = func(*args, **kwargs)
+            if result is not None:
+                cache.put(key, result, key_version)
+            return result
+        
+        def map_cached(args_list, compute):
+            """
+            批量查询缓存
+
+            参数:
+            - args_list: 参数元组列表
+            - compute: 接收未命中的参数元组列表，返回按相同顺序排列的结果列表
+
+            返回:
+            - 与 args_list 顺序一致的结果列表（计算失败的为 None）。版本在计算前读取，
+              计算期间有新K线收盘时结果会按旧版本缓存，下次查询时重新计算
+            """
+            results = [None] * len(args_list)
+            missing = []
+            for index, args in enumerate(args_list):
+                key_version = current_version(args, {})
+                hit, result = cache.get(args, key_version)
+                if hit:
+                    results[index] = result
+                else:
+                    missing.append((index, args, key_version))
+            if not missing:
+                return results
+            
+            computed = compute([args for _, args, _ in missing])
+            for (index, args, key_version), result in zip(missing, computed):
+                results[index] = result
+                if result is not None:
+                    cache.put(args, result, key_version)
+            return results
+        
+        wrapper.cache = cache
+        wrapper.version = version
+        wrapper.map = map_cached
+        return wrapper
+    return decorator
@@ -0,0 +1,213 @@
+"""
+Telegram 消息发送队列
+
+所有外发消息先进入队列，由后台线程按全局和单个聊天的令牌桶限速发送，调用方不会被
+网络请求或限流阻塞。收到 429 时按 retry_after 暂停该聊天后重试；带合并键的消息
+（信号提醒 "signal"、错误通知 "error"）在 TELEGRAM_COALESCE_SECONDS 内会与同一聊天中
+尚未发送的同类消息合并成一条，不同类的消息不会合并。同一聊天内的消息保持先后顺序。
+"""
+import threading
+import time
+import logging
+from collections import deque
+from telebot.apihelper import ApiTelegramException
+from modules import metrics
+from modules.utils import TokenBucket
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# Telegram 单条消息的最大长度
+MAX_MESSAGE_LENGTH = 4096
+# 合并消息之间的分隔
+COALESCE_SEPARATOR = "\n\n"
+
+class OutgoingMessage:
+    """排队中的一条消息"""
+    def __init__(self, chat_id, text, kwargs, reply_to=None, coalesce=None):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.reply_to = reply_to     # 要回复的 telebot Message
+        self.coalesce = coalesce     # 合并键，None 表示不合并
+        self.not_before = 0.0        # 最早发送时间（time.monotonic）
+        self.attempts = 0
+
+class ChatQueue:
+    """单个聊天的消息队列和令牌桶"""
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.messages = deque()
+        self.ready_at = 0.0          # 限流或 429 暂停结束的时间
+        self.reserved = False        # 是否已为队首消息预占令牌
+
+class MessageDispatcher:
+    """
+    限速的 Telegram 消息发送队列
+
+    参数:
+    - bot: TeleBot 实例
+    - global_per_second: 全局每秒消息数
+    - chat_per_minute: 单个聊天每分钟消息数
+    - chat_burst: 单个聊天的突发消息数
+    - coalesce_seconds: 可合并消息的等待时间
+    """
+    def __init__(self, bot, global_per_second=TELEGRAM_GLOBAL_PER_SECOND,
+                 chat_per_minute=TELEGRAM_CHAT_PER_MINUTE, chat_burst=TELEGRAM_CHAT_BURST,
+                 coalesce_seconds=TELEGRAM_COALESCE_SECONDS, max_attempts=TELEGRAM_SEND_ATTEMPTS):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_per_second, 1)
+        self.chat_per_minute = chat_per_minute
+        self.chat_burst = chat_burst
+        self.coalesce_seconds = coalesce_seconds
+        self.max_attempts = max_attempts
+        self.chats = {}
+        self.pending = 0
+        self.sending = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        """启动后台发送线程（重复调用无副作用）"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=5):
+        """等待队列发送完毕后停止后台线程"""
+        self.flush(timeout)
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def flush(self, timeout=None):
+        """阻塞直到队列中的消息全部发送（或超时），返回是否已清空"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending or self.sending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def send(self, chat_id, text, coalesce=None, **kwargs):
+        """
+        将消息加入发送队列
+
+        参数:
+        - chat_id: 目标聊天
+        - text: 消息内容
+        - coalesce: 合并键，与同一聊天中排队的相同合并键的消息合并（None 表示不合并）
+        - kwargs: 传给 bot.send_message 的其他参数（如 parse_mode）
+        """
+        self._enqueue(OutgoingMessage(chat_id, text, kwargs, coalesce=coalesce))
+
+    def send_parts(self, chat_id, parts, **kwargs):
+        """将拆分后的长消息整体加入队列，各部分连续发送，不与其他消息交错"""
+        self._enqueue(*(OutgoingMessage(chat_id, text, kwargs) for text in parts))
+
+    def reply(self, message, text, **kwargs):
+        """将对某条消息的回复加入发送队列"""
+        self._enqueue(OutgoingMessage(message.chat.id, text, kwargs, reply_to=message))
+
+    def queue_depth(self):
+        """排队中的消息数量"""
+        return self.pending
+
+    def _enqueue(self, *items):
+        self.start()
+        now = time.monotonic()
+        with self.condition:
+            for item in items:
+                chat = self.chats.get(item.chat_id)
+                if chat is None:
+                    period = self.chat_burst * 60 / self.chat_per_minute
+                    chat = self.chats[item.chat_id] = ChatQueue(TokenBucket(self.chat_burst, period))
+                if item.coalesce is not None:
+                    last = chat.messages[-1] if chat.messages else None
+                    if (last is not None and last.coalesce == item.coalesce and last.attempts == 0 and last.kwargs == item.kwargs
+                            and len(last.text) + len(COALESCE_SEPARATOR) + len(item.text) <= MAX_MESSAGE_LENGTH):
+                        last.text += COALESCE_SEPARATOR + item.text
+                        metrics.telegram_coalesced_total.inc()
+                        continue
+                    item.not_before = now + self.coalesce_seconds
+                chat.messages.append(item)
+                self.pending += 1
+            self.condition.notify_all()
+
+    def _next(self):
+        """取出下一条可发送的消息；没有时等待。停止时返回 None"""
+        with self.condition:
+            while self.running:
+                now = time.monotonic()
+                wake_at = None
+                for chat_id, chat in self.chats.items():
+                    if not chat.messages:
+                        continue
+                    ready_at = max(chat.ready_at, chat.messages[0].not_before)
+                    if ready_at <= now and not chat.reserved:
+                        wait = chat.bucket.reserve()
+                        chat.reserved = True
+                        if wait > 0:
+                            chat.ready_at = ready_at = now + wait
+                    if ready_at <= now:
+                        chat.reserved = False
+                        self.pending -= 1
+                        self.sending += 1
+                        return chat_id, chat.messages.popleft()
+                    wake_at = ready_at if wake_at is None else min(wake_at, ready_at)
+                self.condition.wait(None if wake_at is None else wake_at - now)
+            return None
+
+    def _run(self):
+        while True:
+            next_item = self._next()
+            if next_item is None:
+                return
+            chat_id, item = next_item
+            try:
+                self.global_bucket.acquire()
+                self._deliver(chat_id, item)
+            except Exception as e:
+                logger.error(f"Telegram 消息发送线程出错: {e}")
+            finally:
+                with self.condition:
+                    self.sending -= 1
+                    self.condition.notify_all()
+
+    def _deliver(self, chat_id, item):
+        item.attempts += 1
+        try:
+            if item.reply_to is not None:
+                self.bot.reply_to(item.reply_to, item.text, **item.kwargs)
+            else:
+                self.bot.send_message(chat_id, item.text, **item.kwargs)
+            return
+        except ApiTelegramException as e:
+            if e.error_code != 429:
+                logger.error(f"Telegram 消息发送失败（{chat_id}），已丢弃: {e.description}")
+                return
+            delay = float((e.result_json.get("parameters") or {}).get("retry_after", 1))
+            metrics.telegram_rate_limited_total.inc()
+            logger.warning(f"Telegram 限流（{chat_id}），{delay:.0f} 秒后重试")
+        except Exception as e:
+            delay = min(2 ** item.attempts, 60)
+            logger.warning(f"Telegram 消息发送出错（{chat_id}），{delay} 秒后重试: {e}")
+
+        if item.attempts >= self.max_attempts:
+            logger.error(f"Telegram 消息发送失败 {item.attempts} 次，已丢弃（{chat_id}）")
+            return
+        metrics.telegram_retries_total.inc()
+        # 放回队首，保证同一聊天内的顺序
+        with self.condition:
+            chat = self.chats[chat_id]
+            chat.messages.appendleft(item)
+            chat.ready_at = max(chat.ready_at, time.monotonic() + delay)
+            self.pending += 1
@@ -0,0 +1,186 @@
+"""
+命令执行模块
+
+telebot 默认只用两个线程执行消息处理函数，/m、/risk、/add 这类需要访问 Binance 的命令
+会占住线程，使其他用户的命令排队。耗时命令用 @command_executor.heavy 装饰后在独立的
+线程池中执行，线程都在忙时立即回复排队提示，超过超时时间后通知用户；/list、/test、/myid
+等简单命令用 @command_executor.fast 装饰，直接在轮询线程中执行。两类命令都记录耗时并
+统计 p50/p99（/stats）。
+"""
+import math
+import threading
+import time
+import functools
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from modules import metrics
+from modules.bot import dispatcher, is_authorized
+from config import *
+
+logger = logging.getLogger(__name__)
+
+def command_name(message, default):
+    """从消息文本中取出命令名（去掉 / 和 @机器人名）"""
+    text = (message.text or "").split(maxsplit=1)
+    if text and text[0].startswith("/"):
+        return text[0][1:].split("@")[0].lower() or default
+    return default
+
+def percentile(values, q):
+    """values 已排序时的 q 分位数（最近秩法）"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+class CommandExecutor:
+    """
+    命令执行器
+
+    参数:
+    - workers: 耗时命令的线程数
+    - queue_limit: 排队中（含执行中）的耗时命令上限
+    - timeout: 耗时命令默认超时（秒）
+    - window: 每个命令保留的最近耗时样本数
+    """
+    def __init__(self, workers=COMMAND_WORKERS, queue_limit=COMMAND_QUEUE_LIMIT,
+                 timeout=COMMAND_TIMEOUT, window=COMMAND_LATENCY_WINDOW):
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="command")
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.window = window
+        self.latencies = {}
+        self.counts = {"timeouts": 0, "rejected": 0, "errors": 0}
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def record(self, name, lane, seconds):
+        metrics.command_seconds.observe(seconds, command=name, lane=lane)
+        with self.lock:
+            samples = self.latencies.get(name)
+            if samples is None:
+                samples = self.latencies[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def stats(self):
+        """
+        各命令最近的耗时统计
+
+        返回:
+        - {命令名: {"count", "p50", "p99", "max"}}，耗时单位为秒
+        """
+        with self.lock:
+            snapshot = {name: sorted(samples) for name, samples in self.latencies.items()}
+        return {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+            for name, values in snapshot.items() if values
+        }
+
+    def fast(self, func):
+        """简单命令：在轮询线程中直接执行，只记录耗时"""
+        @functools.wraps(func)
+        def wrapper(message):
+            start = time.perf_counter()
+            try:
+                return func(message)
+            finally:
+                self.record(command_name(message, func.__name__), "fast", time.perf_counter() - start)
+        return wrapper
+
+    def heavy(self, timeout=None):
+        """
+        耗时命令：在线程池中执行
+
+        参数:
+        - timeout: 超时秒数，超时后通知用户（命令本身仍会执行完，结果照常发送）
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(message):
+                self.submit(func, message, timeout or self.timeout)
+            return wrapper
+        return decorator
+
+    def submit(self, func, message, timeout):
+        name = command_name(message, func.__name__)
+        with self.lock:
+            ahead = self.active
+            if ahead >= self.queue_limit:
+                self.counts["rejected"] += 1
+            else:
+                self.active += 1
+        if ahead >= self.queue_limit:
+            metrics.command_rejected_total.inc(command=name)
+            dispatcher.reply(message, "⏳ 机器人繁忙，请稍后再试")
+            return
+
+        # 线程都在忙时先告知用户已排队
+        if ahead >= self.workers and is_authorized(message.chat.id):
+            dispatcher.reply(message, f"⏳ 已加入队列，前面还有 {ahead - self.workers + 1} 个命令")
+
+        received = time.perf_counter()
+        done = threading.Event()
+
+        def on_timeout():
+            if done.is_set():
+                return
+            with self.lock:
+                self.counts["timeouts"] += 1
+            metrics.command_timeouts_total.inc(command=name)
+            logger.warning(f"命令 /{name} 超过 {timeout} 秒仍未完成")
+            dispatcher.reply(message, f"⌛ /{name} 处理超时，结果稍后发送")
+
+        def run():
+            try:
+                func(message)
+            except Exception as e:
+                with self.lock:
+                    self.counts["errors"] += 1
+                logger.error(f"命令 /{name} 执行失败: {e}")
+                dispatcher.reply(message, f"❌ 命令执行失败: {str(e)}")
+            finally:
+                done.set()
+                timer.cancel()
+                with self.lock:
+                    self.active -= 1
+                self.record(name, "heavy", time.perf_counter() - received)
+
+        timer = threading.Timer(timeout, on_timeout)
+        timer.daemon = True
+        timer.start()
+        self.pool.submit(run)
+
+    def format_stats(self):
+        """/stats 命令的文本"""
+        lines = ["⏱ 命令耗时统计（最近样本）", ""]
+        stats = self.stats()
+        if not stats:
+            lines.append("暂无数据")
+        for name, item in sorted(stats.items(), key=lambda x: -x[1]["p99"]):
+            lines.append(
+                f"/{name}: {item['count']} 次 | p50 {item['p50'] * 1000:.0f}ms | "
+                f"p99 {item['p99'] * 1000:.0f}ms | 最长 {item['max'] * 1000:.0f}ms"
+            )
+        with self.lock:
+            counts = dict(self.counts)
+            active = self.active
+        lines += [
+            "",
+            f"执行/排队中: {active}  超时: {counts['timeouts']}  繁忙拒绝: {counts['rejected']}  失败: {counts['errors']}",
+            f"待发送消息: {dispatcher.queue_depth()}",
+        ]
+        return "\n".join(lines)
+
+# 全局命令执行器
+command_executor = CommandExecutor()
+metrics.gauge(
+    "command_active", "执行中和排队中的耗时命令数量",
+    function=lambda: command_executor.active
+)
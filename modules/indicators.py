@@ -8,111 +8,186 @@ from config import *
 
 logger = logging.getLogger(__name__)
 
+class IndicatorContext:
+    """
+    单个K线 DataFrame 的指标上下文
+
+    每个派生序列（收益率、真实波幅、ATR、EMA等）在第一次请求时计算并缓存，
+    同一次分析中 indicators 和 risk 的函数共享结果，避免重复计算。
+    所有接收 df 的函数同样接受 IndicatorContext。
+    """
+    def __init__(self, df):
+        self.df = df
+        self._cache = {}
+
+    @classmethod
+    def of(cls, df):
+        """将 DataFrame 包装为上下文（已是上下文则原样返回）"""
+        return df if isinstance(df, cls) else cls(df)
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def returns(self):
+        """收盘价变化率"""
+        return self._memo("returns", lambda: self.df['close'].pct_change())
+
+    def volatility(self):
+        """整个窗口的波动率 (收益率标准差，百分比)"""
+        return self._memo("volatility", lambda: self.returns().std() * 100)
+
+    def rolling_volatility(self, window=20):
+        """滚动波动率序列 (百分比)"""
+        return self._memo(
+            ("rolling_volatility", window),
+            lambda: self.returns().rolling(window=window).std() * 100
+        )
+
+    def true_range(self):
+        """真实波幅"""
+        def compute():
+            df = self.df
+            high_low = df['high'] - df['low']
+            high_close = abs(df['high'] - df['close'].shift())
+            low_close = abs(df['low'] - df['close'].shift())
+            
+            ranges = pd.concat([high_low, high_close, low_close], axis=1)
+            return ranges.max(axis=1)
+        return self._memo("true_range", compute)
+
+    def atr(self, period=ATR_PERIOD):
+        return self._memo(("atr", period), lambda: self.true_range().rolling(window=period).mean())
+
+    def ema(self, period):
+        return self._memo(("ema", period), lambda: self.df['close'].ewm(span=period, adjust=False).mean())
+
+    def rsi(self, period=RSI_PERIOD):
+        def compute():
+            delta = self.df['close'].diff()
+            gain = delta.where(delta > 0, 0)
+            loss = -delta.where(delta < 0, 0)
+            
+            avg_gain = gain.rolling(window=period).mean()
+            avg_loss = loss.rolling(window=period).mean()
+            
+            rs = avg_gain / avg_loss
+            return 100 - (100 / (1 + rs))
+        return self._memo(("rsi", period), compute)
+
+    def macd(self, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+        def compute():
+            macd_line = self.ema(fast) - self.ema(slow)
+            signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+            histogram = macd_line - signal_line
+            return macd_line, signal_line, histogram
+        return self._memo(("macd", fast, slow, signal), compute)
+
+    def bollinger_bands(self, period=BOLLINGER_PERIOD, std_dev=BOLLINGER_STD):
+        def compute():
+            sma = self.df['close'].rolling(window=period).mean()
+            std = self.df['close'].rolling(window=period).std()
+            upper_band = sma + (std * std_dev)
+            lower_band = sma - (std * std_dev)
+            return sma, upper_band, lower_band
+        return self._memo(("bollinger", period, std_dev), compute)
+
 def calculate_rsi(df, period=RSI_PERIOD):
     """计算RSI指标"""
+    ctx = IndicatorContext.of(df)
     try:
-        delta = df['close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.rolling(window=period).mean()
-        avg_loss = loss.rolling(window=period).mean()
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
+        return ctx.rsi(period)
     except Exception as e:
         logger.error(f"计算RSI失败: {e}")
-        return pd.Series(index=df.index)
+        return pd.Series(index=ctx.df.index)
 
 def calculate_macd(df, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
     """计算MACD指标"""
+    ctx = IndicatorContext.of(df)
     try:
-        exp1 = df['close'].ewm(span=fast, adjust=False).mean()
-        exp2 = df['close'].ewm(span=slow, adjust=False).mean()
-        macd_line = exp1 - exp2
-        signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-        histogram = macd_line - signal_line
-        
-        return macd_line, signal_line, histogram
+        return ctx.macd(fast, slow, signal)
     except Exception as e:
         logger.error(f"计算MACD失败: {e}")
-        empty = pd.Series(index=df.index)
+        empty = pd.Series(index=ctx.df.index)
         return empty, empty, empty
 
 def calculate_bollinger_bands(df, period=BOLLINGER_PERIOD, std_dev=BOLLINGER_STD):
     """计算布林带指标"""
+    ctx = IndicatorContext.of(df)
     try:
-        sma = df['close'].rolling(window=period).mean()
-        std = df['close'].rolling(window=period).std()
-        upper_band = sma + (std * std_dev)
-        lower_band = sma - (std * std_dev)
-        
-        return sma, upper_band, lower_band
+        return ctx.bollinger_bands(period, std_dev)
     except Exception as e:
         logger.error(f"计算布林带失败: {e}")
-        empty = pd.Series(index=df.index)
+        empty = pd.Series(index=ctx.df.index)
         return empty, empty, empty
 
 def calculate_ema(df, period):
     """计算EMA指标"""
+    ctx = IndicatorContext.of(df)
     try:
-        return df['close'].ewm(span=period, adjust=False).mean()
+        return ctx.ema(period)
     except Exception as e:
         logger.error(f"计算EMA失败: {e}")
-        return pd.Series(index=df.index)
+        return pd.Series(index=ctx.df.index)
 
 def calculate_atr(df, period=ATR_PERIOD):
     """计算ATR指标"""
+    ctx = IndicatorContext.of(df)
     try:
-        high_low = df['high'] - df['low']
-        high_close = abs(df['high'] - df['close'].shift())
-        low_close = abs(df['low'] - df['close'].shift())
-        
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = ranges.max(axis=1)
-        
-        atr = true_range.rolling(window=period).mean()
-        return atr
+        return ctx.atr(period)
     except Exception as e:
         logger.error(f"计算ATR失败: {e}")
-        return pd.Series(index=df.index)
+        return pd.Series(index=ctx.df.index)
+
+def classify_market(price_change, volatility, ema_short, ema_long):
+    """
+    按窗口涨跌幅、波动率和最新EMA判断市场类型
+
+    参数:
+    - price_change: 窗口内价格变化百分比
+    - volatility: 收益率标准差（百分比）
+    - ema_short / ema_long: 最新的短期、长期EMA
+    """
+    # 趋势判断
+    if ema_short > ema_long and price_change > 5:
+        if volatility > 5:
+            return "强上升趋势-高波动"
+        else:
+            return "强上升趋势"
+    elif ema_short < ema_long and price_change < -5:
+        if volatility > 5:
+            return "强下降趋势-高波动"
+        else:
+            return "强下降趋势"
+    elif abs(price_change) < 2 and volatility > 3:
+        return "震荡市场-高波动"
+    elif abs(price_change) < 2:
+        return "震荡市场"
+    elif ema_short > ema_long:
+        return "弱上升趋势"
+    elif ema_short < ema_long:
+        return "弱下降趋势"
+    else:
+        return "不确定"
 
 def get_market_type(df):
     """确定市场类型（趋势、震荡等）"""
     try:
+        ctx = IndicatorContext.of(df)
+        df = ctx.df
+        
         # 价格变化百分比
         price_change = ((df['close'].iloc[-1] - df['close'].iloc[0]) / df['close'].iloc[0]) * 100
         
         # 波动率 (标准差)
-        volatility = df['close'].pct_change().std() * 100
+        volatility = ctx.volatility()
         
         # EMA指标判断趋势
-        ema_short = calculate_ema(df, EMA_SHORT)
-        ema_long = calculate_ema(df, EMA_LONG)
+        ema_short = calculate_ema(ctx, EMA_SHORT)
+        ema_long = calculate_ema(ctx, EMA_LONG)
         
-        # 趋势判断
-        if ema_short.iloc[-1] > ema_long.iloc[-1] and price_change > 5:
-            if volatility > 5:
-                return "强上升趋势-高波动"
-            else:
-                return "强上升趋势"
-        elif ema_short.iloc[-1] < ema_long.iloc[-1] and price_change < -5:
-            if volatility > 5:
-                return "强下降趋势-高波动"
-            else:
-                return "强下降趋势"
-        elif abs(price_change) < 2 and volatility > 3:
-            return "震荡市场-高波动"
-        elif abs(price_change) < 2:
-            return "震荡市场"
-        elif ema_short.iloc[-1] > ema_long.iloc[-1]:
-            return "弱上升趋势"
-        elif ema_short.iloc[-1] < ema_long.iloc[-1]:
-            return "弱下降趋势"
-        else:
-            return "不确定"
+        return classify_market(price_change, volatility, ema_short.iloc[-1], ema_long.iloc[-1])
             
     except Exception as e:
         logger.error(f"分析市场类型失败: {e}")
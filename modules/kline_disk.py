@@ -0,0 +1,127 @@
+"""
+K线磁盘缓存模块
+
+每个 (交易对, 周期) 对应一个文件，由定长记录组成，每条记录为 7 个 float64：
+开盘时间、开、高、低、收、成交量、收盘时间（与 api.KLINE_COLUMNS 顺序一致）。
+读取时通过 np.memmap 只映射需要的尾部记录，写入时只追加新K线或覆盖最后一条。
+"""
+import os
+import threading
+import logging
+import numpy as np
+from modules.utils import interval_to_ms
+from config import *
+
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = 7
+RECORD_SIZE = RECORD_FIELDS * 8
+
+class DiskKlineCache:
+    """
+    K线磁盘缓存
+
+    参数:
+    - directory: 缓存目录
+    - max_records: 单个文件保留的最大记录数，超过两倍时压缩为最近的 max_records 条
+    """
+    def __init__(self, directory=KLINE_CACHE_DIR, max_records=KLINE_CACHE_MAX_RECORDS):
+        self.directory = directory
+        self.max_records = max_records
+        self.lock = threading.Lock()
+
+    def path(self, symbol, interval):
+        return os.path.join(self.directory, f"{symbol}_{interval}.bin")
+
+    def _count(self, path):
+        try:
+            return os.path.getsize(path) // RECORD_SIZE
+        except OSError:
+            return 0
+
+    def read(self, symbol, interval, limit=None):
+        """
+        读取最近 limit 条记录
+
+        返回:
+        - (记录数, 7) 的 float64 数组（文件不存在时为空数组）
+        """
+        path = self.path(symbol, interval)
+        with self.lock:
+            count = self._count(path)
+            if count == 0:
+                return np.empty((0, RECORD_FIELDS))
+            records = np.memmap(path, dtype=np.float64, mode="r", shape=(count, RECORD_FIELDS))
+            start = 0 if limit is None else max(0, count - limit)
+            values = np.array(records[start:])
+            del records
+            return values
+
+    def load(self, symbol, interval, limit):
+        """读取最近 limit 根K线，转换为与 REST 接口相同的行格式"""
+        rows = []
+        for record in self.read(symbol, interval, limit).tolist():
+            record[0] = int(record[0])
+            record[6] = int(record[6])
+            rows.append(record)
+        return rows
+
+    def write(self, symbol, interval, rows):
+        """
+        写入K线
+
+        与文件最后一条开盘时间相同的K线覆盖最后一条，更新的K线追加到末尾；
+        新数据与文件之间存在缺口时丢弃旧文件，避免历史中出现断档。
+        """
+        if not rows:
+            return
+        values = np.array([row[:RECORD_FIELDS] for row in rows], dtype=np.float64)
+        path = self.path(symbol, interval)
+        step = interval_to_ms(interval)
+
+        with self.lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                count = self._count(path)
+                mode = "r+b" if count else "wb"
+                with open(path, mode) as f:
+                    if count:
+                        f.seek((count - 1) * RECORD_SIZE)
+                        last_open = np.frombuffer(f.read(8), dtype=np.float64)[0]
+                        values = values[values[:, 0] >= last_open]
+                        if len(values) == 0:
+                            return
+                        if values[0, 0] > last_open + step:
+                            # 与已有数据不连续，重新开始
+                            f.seek(0)
+                            f.truncate()
+                            count = 0
+                        elif values[0, 0] == last_open:
+                            f.seek((count - 1) * RECORD_SIZE)
+                            count -= 1
+                        else:
+                            f.seek(count * RECORD_SIZE)
+                    f.write(values.tobytes())
+                    count += len(values)
+
+                if count > self.max_records * 2:
+                    self._compact(path, count)
+            except OSError as e:
+                logger.error(f"写入K线缓存失败 - {symbol} {interval}: {e}")
+
+    def _compact(self, path, count):
+        """只保留最近 max_records 条记录"""
+        records = np.memmap(path, dtype=np.float64, mode="r", shape=(count, RECORD_FIELDS))
+        tail = np.array(records[-self.max_records:])
+        del records
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(tail.tobytes())
+        os.replace(temp_path, path)
+
+    def clear(self, symbol, interval):
+        with self.lock:
+            try:
+                os.remove(self.path(symbol, interval))
+            except FileNotFoundError:
+                pass
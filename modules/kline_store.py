@@ -0,0 +1,230 @@
+"""
+K线增量存储模块
+
+每个 (交易对, 周期) 在内存中保存一个按开盘时间排序的环形缓冲区。
+首次请求拉取完整窗口，之后只通过 startTime 拉取上次收盘之后的新K线，
+并原地替换仍未收盘的最后一根K线。
+
+由 WebSocket 推送维护的 (交易对, 周期) 会被标记为实时，读取时不再发起 REST 请求
+（最后一根K线已收盘但还没有收到它的收盘推送时除外）。
+
+配置磁盘缓存后，缓冲区首次使用时先从磁盘读取历史K线，之后拉取到的K线
+同步写回磁盘，进程重启后只需增量拉取停机期间的新K线。
+"""
+import time
+import threading
+import logging
+from collections import deque
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# Binance 单次K线请求的最大数量
+MAX_KLINES_PER_REQUEST = 1000
+
+class KlineBuffer:
+    """单个 (交易对, 周期) 的K线环形缓冲区"""
+    def __init__(self, capacity):
+        self.rows = deque(maxlen=capacity)
+        self.final_open = None  # 推送确认已收盘的最后一根K线的开盘时间
+
+    @property
+    def capacity(self):
+        return self.rows.maxlen
+
+    def reset(self, rows, capacity):
+        """用完整窗口替换缓冲区内容"""
+        self.rows = deque(rows, maxlen=max(capacity, self.capacity))
+
+    def merge(self, rows):
+        """合并新K线：相同开盘时间的替换，较新的追加，较旧的忽略"""
+        for row in rows:
+            open_time = int(row[0])
+            if self.rows and open_time == int(self.rows[-1][0]):
+                self.rows[-1] = row
+            elif not self.rows or open_time > int(self.rows[-1][0]):
+                self.rows.append(row)
+
+    def is_current(self, now_ms):
+        """
+        最后一根K线是否仍未收盘
+
+        REST 返回的最后一根总是当前未收盘的K线，因此它仍未收盘时，之前的K线都是收盘后拉取的
+        最终数据；它已经收盘时，缓存中的这根K线可能是收盘前拉取的，需要重新拉取
+        """
+        return bool(self.rows) and int(self.rows[-1][6]) >= now_ms
+
+    def is_final(self):
+        """最后一根K线是否已由推送确认收盘"""
+        return bool(self.rows) and int(self.rows[-1][0]) == self.final_open
+
+    def tail(self, limit):
+        """返回最近 limit 根K线"""
+        if limit >= len(self.rows):
+            return list(self.rows)
+        return list(self.rows)[-limit:]
+
+class KlineStore:
+    """
+    K线增量存储
+
+    获取数据分为三步：plan() 决定请求参数，调用方执行网络请求，
+    merge() 合并结果。同步与异步请求都可以复用同一个存储。
+    """
+    def __init__(self, fetch=None, disk=None):
+        self.fetch = fetch
+        self.disk = disk
+        self.buffers = {}
+        self.live = set()
+        self.lock = threading.Lock()
+        self.stats = {"full_fetches": 0, "incremental_fetches": 0, "candles_fetched": 0, "disk_loads": 0}
+
+    def _buffer(self, symbol, interval):
+        key = (symbol, interval)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.setdefault(key, KlineBuffer(0))
+        return buffer
+
+    def _load_disk(self, symbol, interval, buffer, limit):
+        """
+        缓冲区为空时从磁盘读取历史K线
+
+        读取磁盘时不持有锁，避免阻塞其他交易对；读取期间缓冲区已被填充时丢弃读取结果
+        """
+        if self.disk is None:
+            return
+        with self.lock:
+            if buffer.rows:
+                return
+            count = max(limit, buffer.capacity)
+        rows = self.disk.load(symbol, interval, count)
+        if not rows:
+            return
+        with self.lock:
+            if not buffer.rows:
+                buffer.reset(rows, limit)
+                self.stats["disk_loads"] += 1
+
+    def _persist(self, symbol, interval, rows):
+        if self.disk is not None and rows:
+            self.disk.write(symbol, interval, rows)
+
+    def plan(self, symbol, interval, limit, refresh=True):
+        """
+        计算本次需要的请求参数
+
+        refresh 为 False 时，缓存中已有足够的K线且最后一根仍未收盘（期间没有K线收盘）就不再请求
+
+        返回:
+        - (params, full): 请求参数，以及是否为完整窗口加载；
+          params 为 None 表示缓存已是最新，无需请求
+        """
+        buffer = self._buffer(symbol, interval)
+        self._load_disk(symbol, interval, buffer, limit)
+        with self.lock:
+            now_ms = int(time.time() * 1000)
+            if len(buffer.rows) >= limit and (
+                ((symbol, interval) in self.live and (buffer.is_current(now_ms) or buffer.is_final()))
+                or (not refresh and buffer.is_current(now_ms))
+            ):
+                return None, False
+
+            if len(buffer.rows) < limit:
+                capacity = max(limit, buffer.capacity)
+                return {"symbol": symbol, "interval": interval, "limit": capacity}, True
+
+            # 最后一根K线可能是在收盘前拉取的，从它开始重新拉取以获得最终数据
+            return {
+                "symbol": symbol,
+                "interval": interval,
+                "startTime": int(buffer.rows[-1][0]),
+                "limit": MAX_KLINES_PER_REQUEST
+            }, False
+
+    def merge(self, symbol, interval, limit, params, full, data):
+        """
+        合并请求结果并返回最近 limit 根K线
+
+        增量请求返回满额数据说明中间可能有缺口，返回 None 以便调用方重新完整加载
+        """
+        buffer = self._buffer(symbol, interval)
+        with self.lock:
+            if full:
+                buffer.reset(data, params["limit"])
+                self.stats["full_fetches"] += 1
+            else:
+                if len(data) >= params["limit"]:
+                    buffer.reset([], buffer.capacity)
+                    return None
+                buffer.merge(data)
+                self.stats["incremental_fetches"] += 1
+            self.stats["candles_fetched"] += len(data)
+            rows = buffer.tail(limit)
+        self._persist(symbol, interval, data)
+        return rows
+
+    def cached_rows(self, symbol, interval, limit):
+        """直接返回缓存中最近 limit 根K线，不发起请求"""
+        buffer = self._buffer(symbol, interval)
+        with self.lock:
+            return buffer.tail(limit)
+
+    def get_rows(self, symbol, interval, limit, refresh=True):
+        """同步获取最近 limit 根K线（原始行格式）"""
+        for _ in range(2):
+            params, full = self.plan(symbol, interval, limit, refresh)
+            if params is None:
+                return self.cached_rows(symbol, interval, limit)
+            data = self.fetch("klines", params)
+            if data is None or (full and not data):
+                return None
+            rows = self.merge(symbol, interval, limit, params, full, data)
+            if rows is not None:
+                return rows
+        return None
+
+    def apply(self, symbol, interval, row, closed=False):
+        """
+        合并一根推送的K线
+
+        只有标记为实时的 (交易对, 周期) 才会合并，未完成补齐的推送直接丢弃，
+        避免在缓存缺口之后追加新K线。已收盘的K线同时写入磁盘缓存。
+        """
+        key = (symbol, interval)
+        with self.lock:
+            if key not in self.live:
+                return False
+            buffer = self.buffers[key]
+            buffer.merge([row])
+            if closed:
+                buffer.final_open = int(row[0])
+        if closed:
+            self._persist(symbol, interval, [row])
+        return True
+
+    def set_live(self, symbol, interval, live=True):
+        """标记 (交易对, 周期) 是否由实时推送维护"""
+        key = (symbol, interval)
+        with self.lock:
+            if live and key in self.buffers and len(self.buffers[key].rows) > 0:
+                self.live.add(key)
+            else:
+                self.live.discard(key)
+
+    def clear_live(self):
+        """取消所有实时标记（推送连接断开时调用）"""
+        with self.lock:
+            self.live.clear()
+
+    def clear(self, symbol=None):
+        """清空缓存（指定交易对或全部）"""
+        with self.lock:
+            if symbol is None:
+                self.buffers.clear()
+                self.live.clear()
+            else:
+                for key in [key for key in self.buffers if key[0] == symbol]:
+                    del self.buffers[key]
+                    self.live.discard(key)
@@ -0,0 +1,243 @@
+"""
+运行指标模块
+
+以 Prometheus 文本格式暴露计数器、仪表和直方图，不依赖 prometheus_client。
+各模块直接在本模块的全局指标上记录数据，开启 METRICS_ENABLED 后
+由 start_metrics_server() 在 http://METRICS_HOST:METRICS_PORT/metrics 提供抓取。
+"""
+import bisect
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """指标基类，按标签值分别记录"""
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function  # 抓取时调用，返回当前值（无标签）或 {标签值元组: 值}
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        if self.function is None:
+            with self.lock:
+                return list(self.values.items())
+        try:
+            value = self.function()
+        except Exception as e:
+            logger.error(f"读取指标 {self.name} 失败: {e}")
+            return []
+        if isinstance(value, dict):
+            return [(key if isinstance(key, tuple) else (key,), item) for key, item in value.items()]
+        return [((), value)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """记录 with 代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self.values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def counter(name, documentation, labelnames=(), function=None):
+    return registry.register(Counter(name, documentation, labelnames, function))
+
+def gauge(name, documentation, labelnames=(), function=None):
+    return registry.register(Gauge(name, documentation, labelnames, function))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+# Binance API
+binance_request_seconds = histogram(
+    "binance_request_seconds", "Binance REST 请求耗时", ["endpoint"]
+)
+binance_requests_total = counter(
+    "binance_requests_total", "Binance REST 请求次数（按状态码）", ["endpoint", "status"]
+)
+binance_weight_requested_total = counter(
+    "binance_weight_requested_total", "客户端估算的已发送请求权重"
+)
+binance_used_weight = gauge(
+    "binance_used_weight_1m", "最近一次响应头 X-MBX-USED-WEIGHT-1M 的值"
+)
+binance_rate_limited_total = counter(
+    "binance_rate_limited_total", "收到 429/418 的次数", ["status"]
+)
+binance_retries_total = counter(
+    "binance_retries_total", "请求重试次数（backoff 装饰器或 urllib3 Retry）", ["source"]
+)
+
+# 监控周期与分析
+analysis_stage_seconds = histogram(
+    "analysis_stage_seconds", "单个交易对分析各阶段耗时", ["stage"]
+)
+monitor_cycle_seconds = histogram(
+    "monitor_cycle_seconds", "监控周期总耗时", buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+)
+monitor_fetch_seconds = histogram(
+    "monitor_fetch_seconds", "监控周期中拉取K线阶段的耗时", buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+)
+monitor_symbols_total = counter(
+    "monitor_symbols_total", "监控周期处理的交易对数量", ["result"]
+)
+
+# Telegram
+telegram_send_seconds = histogram(
+    "telegram_send_seconds", "Telegram 消息发送耗时", ["method"]
+)
+telegram_send_errors_total = counter(
+    "telegram_send_errors_total", "Telegram 消息发送失败次数", ["method"]
+)
+telegram_rate_limited_total = counter(
+    "telegram_rate_limited_total", "Telegram 返回 429 的次数"
+)
+telegram_retries_total = counter(
+    "telegram_retries_total", "消息队列重新排队重试的次数"
+)
+telegram_coalesced_total = counter(
+    "telegram_coalesced_total", "合并到排队消息中的消息数量"
+)
+
+# Webhook
+webhook_updates_total = counter(
+    "webhook_updates_total", "Webhook 收到的请求（按处理结果）", ["result"]
+)
+webhook_dispatch_seconds = histogram(
+    "webhook_dispatch_seconds", "Webhook 更新交给处理函数的耗时"
+)
+
+# 机器人命令
+command_seconds = histogram(
+    "command_seconds", "命令从收到到处理完成的耗时", ["command", "lane"]
+)
+command_timeouts_total = counter(
+    "command_timeouts_total", "超过超时时间的耗时命令次数", ["command"]
+)
+command_rejected_total = counter(
+    "command_rejected_total", "因队列已满被拒绝的命令次数", ["command"]
+)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """在后台线程中启动指标 HTTP 服务"""
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"指标服务已启动: http://{host}:{server.server_address[1]}/metrics")
+        return server
+    except OSError as e:
+        logger.error(f"指标服务启动失败: {e}")
+        return None
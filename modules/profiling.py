@@ -0,0 +1,170 @@
+"""
+监控周期性能分析模块
+
+对一次按配置流水线（同步或异步，见 USE_ASYNC_PIPELINE）运行的监控周期同时开启 cProfile
+和 tracemalloc，生成按累计耗时排序的函数列表和内存分配最多的代码位置。本次周期的工作线程
+各自使用一个 cProfile，结束后合并，因此 HTTP 请求和分析的耗时也会出现在报告中。其他线程
+（命令处理、消息发送等）不受影响：工作线程随线程池关闭而结束，它们的 cProfile 也随之停止。
+分析使用的周期不更新信号状态、不发布市场快照，也不发送提醒。
+
+触发方式：所有者发送 /profile 命令，或向进程发送 SIGUSR1，报告以文件形式发送到 CHAT_ID。
+"""
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import logging
+from datetime import datetime
+from config import *
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = "data/profiles"
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# 同一时间只允许一次性能分析
+_profile_lock = threading.Lock()
+
+def _thread_profiler(profiles, prefix):
+    """
+    返回 threading.setprofile 的钩子：在名称以 prefix 开头的新线程中启动独立的 cProfile
+
+    其他线程只移除钩子，不做分析，避免长期运行的线程在分析结束后继续被记录
+    """
+    def start(*args):
+        sys.setprofile(None)
+        if not threading.current_thread().name.startswith(prefix):
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Python 3.12+ 的 cProfile 基于 sys.monitoring，主线程的分析已包含所有线程
+            return
+        profiles.append(profile)
+    return start
+
+def profile_call(func, *args, thread_prefix=None, **kwargs):
+    """
+    运行 func 并记录性能数据
+
+    参数:
+    - thread_prefix: 需要一并分析的工作线程名称前缀；这些线程须在 func 返回前结束，
+      为 None 时只分析调用线程
+
+    返回:
+    - (func 返回值, pstats.Stats, tracemalloc 快照, 峰值内存字节数, 耗时秒数)
+    """
+    profiles = []
+    main_profile = cProfile.Profile()
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    if thread_prefix:
+        threading.setprofile(_thread_profiler(profiles, thread_prefix))
+    start = time.perf_counter()
+    main_profile.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        main_profile.disable()
+        elapsed = time.perf_counter() - start
+        threading.setprofile(None)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+    stats = pstats.Stats(main_profile)
+    for profile in profiles:
+        profile.disable()
+        stats.add(profile)
+    return result, stats, snapshot, peak, elapsed
+
+def format_report(stats, snapshot, peak, elapsed, title="monitor_symbols"):
+    """生成文本报告：累计耗时最多的函数和分配内存最多的代码位置"""
+    out = io.StringIO()
+    out.write(f"{title} 性能分析 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    out.write(f"耗时: {elapsed:.2f}s  内存峰值: {peak / 1024 / 1024:.1f} MiB\n\n")
+
+    out.write(f"==== 累计耗时前 {TOP_FUNCTIONS} 的函数（各线程耗时累加）====\n")
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    out.write(f"\n==== 内存分配前 {TOP_ALLOCATIONS} 的代码位置 ====\n")
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+    for index, stat in enumerate(snapshot.statistics("lineno")[:TOP_ALLOCATIONS], 1):
+        frame = stat.traceback[0]
+        out.write(f"{index:>3}. {frame.filename}:{frame.lineno}  {stat.size / 1024:.1f} KiB  ({stat.count} 个对象)\n")
+    return out.getvalue()
+
+def profile_monitor_cycle(fresh=True):
+    """
+    对一次监控周期进行性能分析（与 run_scheduled_cycle 使用相同的流水线，但不发布结果）
+
+    参数:
+    - fresh: 是否先清空分析结果缓存，使本次周期重新拉取和计算所有交易对
+
+    返回:
+    - (报告文件路径, cProfile 数据文件路径)；已有分析在运行时返回 None
+    """
+    from modules.signals import run_monitor_cycle, calculate_probability, WORKER_THREAD_PREFIX
+
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        if fresh:
+            calculate_probability.cache.invalidate()
+        results, stats, snapshot, peak, elapsed = profile_call(
+            run_monitor_cycle, publish=False, thread_prefix=WORKER_THREAD_PREFIX
+        )
+        pipeline = "async_monitor_symbols" if USE_ASYNC_PIPELINE else "monitor_symbols"
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = datetime.now().strftime("monitor_%Y%m%d_%H%M%S")
+        report_path = os.path.join(PROFILE_DIR, f"{name}.txt")
+        stats_path = os.path.join(PROFILE_DIR, f"{name}.prof")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(format_report(stats, snapshot, peak, elapsed, f"{pipeline} ({len(results)} 个交易对)"))
+        stats.dump_stats(stats_path)
+        logger.info(f"性能分析完成，耗时 {elapsed:.2f}s，报告已保存到 {report_path}")
+        return report_path, stats_path
+    finally:
+        _profile_lock.release()
+
+def send_profile(chat_id=CHAT_ID):
+    """运行性能分析并把报告发送到 Telegram"""
+    from modules.bot import bot, dispatcher, handle_error
+    try:
+        paths = profile_monitor_cycle()
+        if paths is None:
+            dispatcher.send(chat_id, "⏳ 已有性能分析正在运行")
+            return
+        report_path, stats_path = paths
+        for path in (report_path, stats_path):
+            with open(path, "rb") as f:
+                bot.send_document(chat_id, f, caption=os.path.basename(path))
+    except Exception as e:
+        handle_error(e, "性能分析")
+
+def install_signal_handler(signum=getattr(signal, "SIGUSR1", None)):
+    """收到信号（默认 SIGUSR1）时在后台线程运行性能分析，须在主线程调用"""
+    if signum is None:  # Windows 不支持 SIGUSR1
+        return False
+
+    def handler(signum, frame):
+        logger.info("收到性能分析信号")
+        threading.Thread(target=send_profile, name="profile", daemon=True).start()
+
+    signal.signal(signum, handler)
+    return True
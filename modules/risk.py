@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import logging
+from modules.indicators import IndicatorContext
 from config import *
 
 logger = logging.getLogger(__name__)
@@ -10,27 +11,24 @@ def calculate_stop_loss(df, side="buy", method="atr"):
     计算建议止损位
     
     参数:
-    - df: 包含价格数据的DataFrame
+    - df: 包含价格数据的DataFrame（或 IndicatorContext）
     - side: 交易方向 ("buy" 或 "sell")
     - method: 止损计算方法 ("atr", "bollinger", "swing")
     
     返回:
     - 止损价格
     """
+    ctx = IndicatorContext.of(df)
+    df = ctx.df
     try:
         current_price = df['close'].iloc[-1]
         
         if method == "atr":
             # 使用ATR计算止损
-            high_low = df["high"] - df["low"]
-            high_close = abs(df["high"] - df["close"].shift())
-            low_close = abs(df["low"] - df["close"].shift())
-            ranges = pd.concat([high_low, high_close, low_close], axis=1)
-            true_range = ranges.max(axis=1)
-            atr = true_range.rolling(window=ATR_PERIOD).mean().iloc[-1]
+            atr = ctx.atr(ATR_PERIOD).iloc[-1]
             
             # ATR倍数根据市场波动率动态调整
-            volatility = df['close'].pct_change().std() * 100
+            volatility = ctx.volatility()
             atr_multiplier = 1.0
             
             if volatility > 5:  # 高波动率
@@ -45,11 +43,7 @@ def calculate_stop_loss(df, side="buy", method="atr"):
                 
         elif method == "bollinger":
             # 使用布林带计算止损
-            window = BOLLINGER_PERIOD
-            std = df['close'].rolling(window=window).std()
-            sma = df['close'].rolling(window=window).mean()
-            lower_band = sma - (std * BOLLINGER_STD)
-            upper_band = sma + (std * BOLLINGER_STD)
+            _, upper_band, lower_band = ctx.bollinger_bands(BOLLINGER_PERIOD, BOLLINGER_STD)
             
             if side == "buy":
                 stop_loss = lower_band.iloc[-1]
@@ -103,13 +97,14 @@ def calculate_take_profit(df, side="buy", risk_level="medium"):
     计算建议止盈位，使用斐波那契扩展位
     
     参数:
-    - df: 包含价格数据的DataFrame
+    - df: 包含价格数据的DataFrame（或 IndicatorContext）
     - side: 交易方向 ("buy" 或 "sell")
     - risk_level: 风险等级 ("low", "medium", "high")
     
     返回:
     - 止盈价格
     """
+    df = IndicatorContext.of(df).df
     try:
         current_price = df['close'].iloc[-1]
         
@@ -160,15 +155,16 @@ def calculate_position_size(df, risk_level="medium"):
     计算建议仓位大小
     
     参数:
-    - df: 包含价格数据的DataFrame
+    - df: 包含价格数据的DataFrame（或 IndicatorContext）
     - risk_level: 风险等级 ("low", "medium", "high")
     
     返回:
     - 建议仓位比例(0-1之间)
     """
+    ctx = IndicatorContext.of(df)
     try:
         # 计算价格波动率 (过去20天标准差)
-        volatility = df['close'].pct_change().rolling(window=20).std().iloc[-1] * 100
+        volatility = ctx.rolling_volatility(20).iloc[-1]
         
         # 基础仓位大小
         if risk_level == "low":
@@ -0,0 +1,113 @@
+"""
+K线收盘对齐的定时调度模块
+
+调度器在每个关注周期的K线收盘时刻（加上少量结算延迟）唤醒，
+只把刚收盘的周期交给任务处理；上一次任务未结束时跳过本次，避免重叠执行。
+K线推送确认收盘时可以通过 trigger 提前执行，同一收盘时刻只执行一次。
+"""
+import time
+import threading
+import logging
+from modules.utils import interval_to_ms
+from config import *
+
+logger = logging.getLogger(__name__)
+
+def next_close(intervals, now_ms):
+    """
+    计算下一个收盘时刻
+
+    返回:
+    - (收盘时间毫秒, 在该时刻收盘的周期列表)
+    """
+    closes = {interval: (now_ms // interval_to_ms(interval) + 1) * interval_to_ms(interval) for interval in intervals}
+    close_ms = min(closes.values())
+    return close_ms, [interval for interval in intervals if closes[interval] == close_ms]
+
+class CandleScheduler:
+    """
+    K线收盘调度器
+
+    参数:
+    - job: 任务函数，接收刚收盘的周期列表
+    - intervals: 关注的周期，例如 ["15m", "1h", "4h", "1d"]
+    - settle_delay: 收盘后等待的秒数，让交易所完成K线结算
+    """
+    def __init__(self, job, intervals=SCHEDULE_INTERVALS, settle_delay=SCHEDULE_SETTLE_DELAY):
+        self.job = job
+        self.intervals = list(intervals)
+        self.settle_ms = int(settle_delay * 1000)
+        self.stop_event = threading.Event()
+        self.running = threading.Lock()
+        self.thread = None
+        self.last_run = {}
+        self.skipped = 0
+        self.fired_close = 0  # 最近一次已执行的收盘时刻
+        self.fired_lock = threading.Lock()
+
+    def start(self):
+        """在后台线程中启动调度"""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run_forever, name="candle-scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run_forever(self):
+        while not self.stop_event.is_set():
+            now_ms = int(time.time() * 1000)
+            # 以 (当前时间 - 结算延迟) 计算，结算期间启动时不会漏掉刚收盘的周期
+            close_ms, closed = next_close(self.intervals, now_ms - self.settle_ms)
+            fire_ms = close_ms + self.settle_ms
+            while now_ms < fire_ms:
+                if self.stop_event.wait((fire_ms - now_ms) / 1000):
+                    return
+                now_ms = int(time.time() * 1000)
+            if self._claim(close_ms):
+                self.fire(close_ms, closed)
+
+    def trigger(self, interval, close_ms):
+        """
+        K线推送确认 interval 已收盘时提前执行 close_ms 的收盘任务
+
+        任务包含在 close_ms 收盘的所有关注周期；之后定时唤醒时不再重复执行
+        """
+        closed = [name for name in self.intervals if close_ms % interval_to_ms(name) == 0]
+        if interval in closed and self._claim(close_ms):
+            self.fire(close_ms, closed)
+
+    def _claim(self, close_ms):
+        """记录 close_ms 已执行，已经执行过时返回 False"""
+        with self.fired_lock:
+            if close_ms <= self.fired_close:
+                return False
+            self.fired_close = close_ms
+            return True
+
+    def fire(self, close_ms, closed):
+        """在工作线程中执行任务，上一次未结束则跳过"""
+        if not self.running.acquire(blocking=False):
+            self.skipped += 1
+            logger.warning(f"上一次监控尚未结束，跳过 {'/'.join(closed)} 收盘任务")
+            return
+        threading.Thread(target=self._run_job, args=(close_ms, closed), daemon=True).start()
+
+    def _run_job(self, close_ms, closed):
+        start = time.time()
+        lateness = start - close_ms / 1000
+        try:
+            logger.info(f"{'/'.join(closed)} K线收盘，延迟 {lateness:.2f}s 开始分析")
+            self.job(closed)
+        except Exception as e:
+            logger.error(f"收盘任务执行失败: {e}")
+        finally:
+            duration = time.time() - start
+            self.last_run = {
+                "close_time": close_ms,
+                "intervals": closed,
+                "lateness_seconds": lateness,
+                "duration_seconds": duration
+            }
+            self.running.release()
@@ -0,0 +1,126 @@
+"""
+信号评分规则模块
+
+calculate_probability 中各指标的概率换算规则。所有函数同时支持标量和 NumPy 数组，
+单个交易对的实时分析、多交易对批量计算和历史回测共用同一套规则。
+"""
+import numpy as np
+from config import *
+
+def _nan_to(values, default):
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), default, values)
+
+def rsi_composite(rsi_1h, rsi_4h, rsi_1d):
+    """不同时间周期RSI的加权平均（缺失值按50处理）"""
+    return (
+        _nan_to(rsi_1h, 50) * 0.5 +
+        _nan_to(rsi_4h, 50) * 0.3 +
+        _nan_to(rsi_1d, 50) * 0.2
+    )
+
+def rsi_probability(rsi_value, overbought=RSI_OVERBOUGHT, oversold=RSI_OVERSOLD):
+    """RSI概率计算 (RSI高于超买线看跌，低于超卖线看涨)"""
+    rsi_value = np.asarray(rsi_value, dtype=float)
+    # RSI在超卖和超买之间，接近超买看跌，接近超卖看涨
+    rsi_norm = (rsi_value - oversold) / (overbought - oversold)
+    return np.select(
+        [rsi_value >= overbought, rsi_value <= oversold],
+        [
+            np.maximum(0, 100 - (rsi_value - overbought) * 5),
+            np.minimum(100, 50 + (oversold - rsi_value) * 5)
+        ],
+        100 - (rsi_norm * 100)
+    )
+
+def macd_probability(histogram):
+    """MACD信号概率"""
+    histogram = np.asarray(histogram, dtype=float)
+    magnitude = np.minimum(29, np.abs(histogram) * 100)
+    return np.select(
+        [np.isnan(histogram), histogram > 0],
+        [50, 70 + magnitude],
+        30 - magnitude
+    )
+
+def price_position_bb(price, upper_band, lower_band):
+    """价格在布林带中的位置 (0-1之间，0表示在下轨，1表示在上轨)"""
+    price = np.asarray(price, dtype=float)
+    bb_range = np.asarray(upper_band, dtype=float) - np.asarray(lower_band, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(bb_range > 0, (price - lower_band) / bb_range, 0.5)
+
+def bb_probability(position):
+    """布林带信号概率"""
+    position = np.asarray(position, dtype=float)
+    return np.select(
+        [np.isnan(position), position > 0.8, position < 0.2],
+        [
+            50,
+            30 - (position - 0.8) * 150,  # 接近上轨
+            70 + (0.2 - position) * 150   # 接近下轨
+        ],
+        50 + (0.5 - position) * 40  # 在布林带中间区域
+    )
+
+def trend_probability(ema_short, ema_long):
+    """趋势信号概率"""
+    ema_short = np.asarray(ema_short, dtype=float)
+    ema_long = np.asarray(ema_long, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ema_diff = (ema_short - ema_long) / ema_long * 100
+    return np.select(
+        [np.isnan(ema_short) | np.isnan(ema_long), ema_diff > 1, ema_diff < -1],
+        [
+            50,
+            80 + np.minimum(19, ema_diff * 2),          # 强上升趋势
+            20 - np.minimum(19, np.abs(ema_diff) * 2)   # 强下降趋势
+        ],
+        50 + (ema_diff * 30)  # 弱趋势
+    )
+
+def up_probability(rsi_prob, macd_prob, bb_prob, trend_prob,
+                   rsi_weight=RSI_WEIGHT, macd_weight=MACD_WEIGHT,
+                   bollinger_weight=BOLLINGER_WEIGHT, ema_weight=EMA_WEIGHT):
+    """综合计算上涨概率 (加权平均)"""
+    return (
+        rsi_prob * rsi_weight +
+        macd_prob * macd_weight +
+        bb_prob * bollinger_weight +
+        trend_prob * ema_weight
+    )
+
+def signal_strength(probability):
+    """信号强度 (概率距离中点50的距离，0-100)"""
+    return np.abs(np.asarray(probability, dtype=float) - 50) * 2
+
+def direction(probability):
+    """根据概率确定方向"""
+    probability = np.asarray(probability, dtype=float)
+    return np.select([probability > 60, probability < 40], ["buy", "sell"], "neutral")
+
+def score_inputs(inputs):
+    """
+    由最新K线的指标值计算评分
+
+    参数:
+    - inputs: 包含 price、rsi (1小时)、rsi_4h、rsi_1d、macd_histogram、bb_upper、bb_lower、
+      ema_short、ema_long 的字典，值可以是标量或数组
+
+    返回:
+    - price_position_bb、up_probability、down_probability、signal_strength、direction
+    """
+    position = price_position_bb(inputs["price"], inputs["bb_upper"], inputs["bb_lower"])
+    probability = up_probability(
+        rsi_probability(rsi_composite(inputs["rsi"], inputs["rsi_4h"], inputs["rsi_1d"])),
+        macd_probability(inputs["macd_histogram"]),
+        bb_probability(position),
+        trend_probability(inputs["ema_short"], inputs["ema_long"])
+    )
+    return {
+        "price_position_bb": position,
+        "up_probability": probability,
+        "down_probability": 100 - probability,
+        "signal_strength": signal_strength(probability),
+        "direction": direction(probability),
+    }
@@ -0,0 +1,120 @@
+"""
+信号状态模块
+
+为每个交易对保存上一次提醒时的结果，每个周期只对真正发生的变化发送提醒：
+- 信号方向变化（上涨概率越过 STRONG_SIGNAL_THRESHOLD 或 100 - STRONG_SIGNAL_THRESHOLD）
+- 上涨概率相对上次提醒变化超过 PROBABILITY_CHANGE_THRESHOLD
+- 处于强烈信号时风险等级变化
+
+命中结果缓存的结果与上次比较时是同一个对象，直接跳过，不再比较和格式化。
+"""
+import threading
+import logging
+from config import *
+
+logger = logging.getLogger(__name__)
+
+BULLISH = "强烈看涨"
+BEARISH = "强烈看跌"
+NEUTRAL = "中性"
+
+def classify(up_probability, strong_threshold=STRONG_SIGNAL_THRESHOLD):
+    """按上涨概率判断信号方向"""
+    if up_probability >= strong_threshold:
+        return BULLISH
+    if up_probability <= 100 - strong_threshold:
+        return BEARISH
+    return NEUTRAL
+
+class SignalState:
+    """单个交易对的信号状态"""
+    def __init__(self, result, direction):
+        self.reference = result  # 上次提醒（或首次观察）时的结果，用于计算变化量
+        self.direction = direction
+        self.seen = result       # 最近一次检查过的结果对象
+
+class SignalStateTable:
+    """
+    信号状态表
+
+    参数:
+    - change_threshold: 触发提醒的上涨概率变化（百分点）
+    - strong_threshold: 强烈信号阈值
+    """
+    def __init__(self, change_threshold=PROBABILITY_CHANGE_THRESHOLD, strong_threshold=STRONG_SIGNAL_THRESHOLD):
+        self.change_threshold = change_threshold
+        self.strong_threshold = strong_threshold
+        self.states = {}
+        self.lock = threading.Lock()
+        self.stats = {"unchanged": 0, "checked": 0, "transitions": 0}
+
+    def update(self, results, symbols=None):
+        """
+        用本周期的结果更新状态
+
+        参数:
+        - results: 本周期的分析结果
+        - symbols: 当前监控列表，不在列表中的交易对状态会被删除
+
+        返回:
+        - 变化列表 [{"result", "previous", "direction", "previous_direction", "reasons"}]
+        """
+        transitions = []
+        with self.lock:
+            for result in results:
+                symbol = result['symbol']
+                state = self.states.get(symbol)
+                if state is not None and state.seen is result:
+                    self.stats["unchanged"] += 1
+                    continue
+                self.stats["checked"] += 1
+                transition = self._check(state, result)
+                if transition is not None:
+                    transitions.append(transition)
+            if symbols is not None:
+                for symbol in set(self.states) - set(symbols):
+                    del self.states[symbol]
+            self.stats["transitions"] += len(transitions)
+        return transitions
+
+    def _check(self, state, result):
+        symbol = result['symbol']
+        direction = classify(result['up_probability'], self.strong_threshold)
+
+        if state is None:
+            # 首次观察：只有已经处于强烈信号时才提醒
+            self.states[symbol] = SignalState(result, direction)
+            if direction == NEUTRAL:
+                return None
+            return self._transition(result, None, direction, None, [f"出现{direction}信号"])
+
+        state.seen = result
+        previous = state.reference
+        reasons = []
+        if direction != state.direction:
+            reasons.append(f"{state.direction} → {direction}")
+        delta = result['up_probability'] - previous['up_probability']
+        if abs(delta) >= self.change_threshold:
+            reasons.append(f"上涨概率 {previous['up_probability']:.1f}% → {result['up_probability']:.1f}% ({delta:+.1f})")
+        if direction != NEUTRAL and result.get('risk_level') != previous.get('risk_level'):
+            reasons.append(f"风险等级 {previous.get('risk_level', 'N/A')} → {result.get('risk_level', 'N/A')}")
+        if not reasons:
+            return None
+
+        previous_direction = state.direction
+        state.reference = result
+        state.direction = direction
+        return self._transition(result, previous, direction, previous_direction, reasons)
+
+    def _transition(self, result, previous, direction, previous_direction, reasons):
+        return {
+            "result": result,
+            "previous": previous,
+            "direction": direction,
+            "previous_direction": previous_direction,
+            "reasons": reasons,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.states.clear()
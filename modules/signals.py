@@ -6,337 +6,619 @@ import numpy as np
 import logging
 import time
 import schedule
-import functools
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from modules.api import get_klines
+from modules.async_api import AsyncBinanceClient, async_get_klines
+from modules.stream import kline_stream
+from modules.scheduler import CandleScheduler
 from modules.indicators import (
     calculate_rsi, calculate_macd, calculate_bollinger_bands,
-    calculate_ema, calculate_atr, get_market_type
+    calculate_ema, calculate_atr, get_market_type, classify_market, IndicatorContext
 )
+from modules.batch_indicators import score_batch
 from modules.risk import (
     calculate_stop_loss, calculate_take_profit, 
     calculate_position_size, evaluate_risk_level
 )
-from modules.utils import load_user_symbols
-from modules.bot import bot, handle_error
+from modules import scoring, metrics
+from modules.cache import cache_result
+from modules.snapshot import SnapshotStore
+from modules.signal_state import SignalStateTable, NEUTRAL
+from modules.symbols import symbol_index
+from modules.utils import load_user_symbols, last_closed_open_time, pack_messages
+from modules.bot import bot, dispatcher, handle_error
 from config import *
 
 logger = logging.getLogger(__name__)
 
-# 缓存装饰器
-def cache_result(seconds=300):
-    """缓存函数结果的装饰器"""
-    cache = {}
-    
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            key = str(args) + str(kwargs)
-            current_time = datetime.now()
-            
-            # 检查缓存是否存在且未过期
-            if key in cache and (current_time - cache[key]['time']).total_seconds() < seconds:
-                return cache[key]['result']
-            
-            # 执行函数并缓存结果
-            result = func(*args, **kwargs)
-            cache[key] = {'result': result, 'time': current_time}
-            return result
-        return wrapper
-    return decorator
-
-@cache_result(seconds=300)
+# 分析所需的K线周期及数量
+KLINE_INTERVALS = {"1h": 100, "4h": 50, "1d": 30}
+
+# 最近一次监控周期的耗时统计
+last_cycle_stats = {}
+
+def should_refresh(interval, refresh_intervals=None):
+    """refresh_intervals 为 None 时刷新所有周期，否则只刷新刚收盘的周期"""
+    return refresh_intervals is None or interval in refresh_intervals
+
+def fetch_frames(symbol, refresh_intervals=None):
+    """获取单个交易对在各周期的K线数据"""
+    with metrics.analysis_stage_seconds.time(stage="fetch"):
+        return {
+            interval: get_klines(
+                symbol, interval=interval, limit=limit,
+                refresh=should_refresh(interval, refresh_intervals)
+            )
+            for interval, limit in KLINE_INTERVALS.items()
+        }
+
+def candle_version(symbol):
+    """交易对当前的数据版本：各分析周期最近一根已收盘K线的开盘时间"""
+    now_ms = int(time.time() * 1000)
+    return tuple(last_closed_open_time(interval, now_ms) for interval in KLINE_INTERVALS)
+
+def closed_candles(df, now_ms=None):
+    """
+    去掉尚未收盘的K线
+
+    K线数据的最后一根通常是刚开盘的K线（收盘时间晚于当前时间），分析只使用已收盘的K线
+    """
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    count = int(np.searchsorted(df['close_time'].to_numpy(), now_ms))
+    return df if count == len(df) else df.iloc[:count]
+
+@cache_result(version=candle_version)
 def calculate_probability(symbol):
     """
     计算上涨/下跌概率
     """
+    # 获取不同时间周期的K线数据
+    frames = fetch_frames(symbol)
+    return analyze_frames(symbol, frames["1h"], frames["4h"], frames["1d"])
+
+metrics.counter(
+    "probability_cache_total", "分析结果缓存的命中、未命中与淘汰次数", ["event"],
+    function=lambda: {
+        key: value for key, value in calculate_probability.cache.stats().items() if key != "size"
+    }
+)
+
+def analyze_frames(symbol, df_1h, df_4h, df_1d, now_ms=None):
+    """
+    根据已获取的K线数据计算上涨/下跌概率（只使用 now_ms 之前已收盘的K线）
+    """
     try:
-        # 获取不同时间周期的K线数据
-        df_1h = get_klines(symbol, interval="1h", limit=100)
-        df_4h = get_klines(symbol, interval="4h", limit=50)
-        df_1d = get_klines(symbol, interval="1d", limit=30)
-        
         if df_1h is None or df_4h is None or df_1d is None:
             logger.error(f"获取 {symbol} K线数据失败")
             return None
-            
-        # 计算各种指标
-        # 1. RSI指标
-        rsi_1h = calculate_rsi(df_1h)
-        rsi_4h = calculate_rsi(df_4h)
-        rsi_1d = calculate_rsi(df_1d)
-        
-        # 2. MACD指标
-        macd_line, signal_line, histogram = calculate_macd(df_1h)
-        
-        # 3. 布林带指标
-        middle_band, upper_band, lower_band = calculate_bollinger_bands(df_1h)
-        
-        # 4. 趋势指标 (EMA)
-        ema_short = calculate_ema(df_1h, EMA_SHORT)
-        ema_long = calculate_ema(df_1h, EMA_LONG)
         
-        # 5. 波动率指标 (ATR)
-        atr = calculate_atr(df_1h)
+        df_1h, df_4h, df_1d = (closed_candles(df, now_ms) for df in (df_1h, df_4h, df_1d))
         
-        # 获取最新价格
-        price = df_1h['close'].iloc[-1]
-        
-        # 判断价格在布林带中的位置 (0-1之间，0表示在下轨，1表示在上轨)
-        bb_range = upper_band.iloc[-1] - lower_band.iloc[-1]
-        if bb_range > 0:
-            price_position_bb = (price - lower_band.iloc[-1]) / bb_range
-        else:
-            price_position_bb = 0.5
+        stage_start = time.perf_counter()
             
-        # 获取市场类型
-        market_type = get_market_type(df_1h)
-        
-        # 计算RSI指标信号概率 (RSI高于70超买，低于30超卖)
-        rsi_1h_value = rsi_1h.iloc[-1] if not pd.isna(rsi_1h.iloc[-1]) else 50
-        rsi_4h_value = rsi_4h.iloc[-1] if not pd.isna(rsi_4h.iloc[-1]) else 50
-        rsi_1d_value = rsi_1d.iloc[-1] if not pd.isna(rsi_1d.iloc[-1]) else 50
-        
-        # 不同时间周期RSI的加权平均
-        rsi_composite = (rsi_1h_value * 0.5 + rsi_4h_value * 0.3 + rsi_1d_value * 0.2)
-        
-        # RSI概率计算
-        if rsi_composite >= RSI_OVERBOUGHT:
-            rsi_probability = max(0, 100 - (rsi_composite - RSI_OVERBOUGHT) * 5)
-        elif rsi_composite <= RSI_OVERSOLD:
-            rsi_probability = min(100, 50 + (RSI_OVERSOLD - rsi_composite) * 5)
-        else:
-            # RSI在30-70之间，接近70看跌，接近30看涨
-            rsi_range = RSI_OVERBOUGHT - RSI_OVERSOLD
-            rsi_norm = (rsi_composite - RSI_OVERSOLD) / rsi_range
-            rsi_probability = 100 - (rsi_norm * 100)
-        
-        # MACD信号概率
-        if not pd.isna(histogram.iloc[-1]):
-            if histogram.iloc[-1] > 0:
-                macd_probability = 70 + min(29, abs(histogram.iloc[-1]) * 100)
-            else:
-                macd_probability = 30 - min(29, abs(histogram.iloc[-1]) * 100)
-        else:
-            macd_probability = 50
-        
-        # 布林带信号概率
-        if not pd.isna(price_position_bb):
-            if price_position_bb > 0.8:  # 接近上轨
-                bb_probability = 30 - (price_position_bb - 0.8) * 150
-            elif price_position_bb < 0.2:  # 接近下轨
-                bb_probability = 70 + (0.2 - price_position_bb) * 150
-            else:
-                # 在布林带中间区域
-                bb_probability = 50 + (0.5 - price_position_bb) * 40
-        else:
-            bb_probability = 50
-        
-        # 趋势信号概率
-        if not pd.isna(ema_short.iloc[-1]) and not pd.isna(ema_long.iloc[-1]):
-            ema_diff = (ema_short.iloc[-1] - ema_long.iloc[-1]) / ema_long.iloc[-1] * 100
-            if ema_diff > 1:  # 强上升趋势
-                trend_probability = 80 + min(19, ema_diff * 2)
-            elif ema_diff < -1:  # 强下降趋势
-                trend_probability = 20 - min(19, abs(ema_diff) * 2)
-            else:  # 弱趋势
-                trend_probability = 50 + (ema_diff * 30)
-        else:
-            trend_probability = 50
+        # 每个周期的派生序列只计算一次，供指标和风控函数共享
+        ctx_1h = IndicatorContext(df_1h)
+        values = frame_inputs(ctx_1h, df_4h, df_1d)
+        values.update(scoring.score_inputs(values))
         
-        # 波动率影响 (ATR相对值)
-        atr_value = atr.iloc[-1] if not pd.isna(atr.iloc[-1]) else 0
-        atr_percent = atr_value / price * 100  # ATR占价格百分比
+        indicators_done = time.perf_counter()
+        metrics.analysis_stage_seconds.observe(indicators_done - stage_start, stage="indicators")
         
-        # 综合计算上涨概率 (加权平均)
-        # 使用单独权重而非INDICATOR_WEIGHTS字典
-        up_probability = (
-            rsi_probability * RSI_WEIGHT +
-            macd_probability * MACD_WEIGHT +
-            bb_probability * BOLLINGER_WEIGHT +
-            trend_probability * EMA_WEIGHT
-        )
-        
-        # 计算信号强度 (概率距离中点50的距离)
-        signal_strength = abs(up_probability - 50) * 2  # 0-100
-        
-        # 信号强度文本描述
-        if signal_strength > 80:
-            signal_strength_text = "极强"
-        elif signal_strength > 60:
-            signal_strength_text = "较强"
-        elif signal_strength > 40:
-            signal_strength_text = "中等"
-        elif signal_strength > 20:
-            signal_strength_text = "较弱"
-        else:
-            signal_strength_text = "微弱"
-        
-        # 根据概率确定方向
-        if up_probability > 60:
-            direction = "buy"
-        elif up_probability < 40:
-            direction = "sell"
-        else:
-            direction = "neutral"
-        
-        # 短期建议
-        if up_probability > STRONG_SIGNAL_THRESHOLD:
-            short_term_rec = f"强烈看涨 ({signal_strength_text})"
-        elif up_probability > 60:
-            short_term_rec = f"看涨 ({signal_strength_text})"
-        elif up_probability < (100 - STRONG_SIGNAL_THRESHOLD):
-            short_term_rec = f"强烈看跌 ({signal_strength_text})"
-        elif up_probability < 40:
-            short_term_rec = f"看跌 ({signal_strength_text})"
-        else:
-            short_term_rec = f"震荡/观望 ({signal_strength_text})"
-        
-        # 长期建议基于日线RSI和趋势
-        if rsi_1d_value < 40 and "上升" in market_type:
-            long_term_rec = "看涨 (超跌+上升趋势)"
-        elif rsi_1d_value > 60 and "下降" in market_type:
-            long_term_rec = "看跌 (超买+下降趋势)"
-        elif "强上升" in market_type:
-            long_term_rec = "看涨 (强上升趋势)"
-        elif "强下降" in market_type:
-            long_term_rec = "看跌 (强下降趋势)"
-        elif rsi_1d_value < 30:
-            long_term_rec = "看涨 (长期超跌)"
-        elif rsi_1d_value > 70:
-            long_term_rec = "看跌 (长期超买)"
-        else:
-            long_term_rec = "中性 (无明显趋势)"
-        
-        # 风险收益比计算
-        if direction == "buy":
-            potential_reward = (upper_band.iloc[-1] - price) / price * 100
-            potential_risk = (price - lower_band.iloc[-1]) / price * 100
-        else:
-            potential_reward = (price - lower_band.iloc[-1]) / price * 100
-            potential_risk = (upper_band.iloc[-1] - price) / price * 100
-        
-        if potential_risk > 0:
-            rr_ratio = potential_reward / potential_risk
-        else:
-            rr_ratio = 1.0
-        
-        # 风险收益比评级
-        if rr_ratio > 3:
-            rr_rating = "极佳"
-        elif rr_ratio > 2:
-            rr_rating = "优秀"
-        elif rr_ratio > 1:
-            rr_rating = "良好"
-        else:
-            rr_rating = "一般"
-            
-        rr_info = {
-            "ratio": rr_ratio,
-            "rating": rr_rating,
-            "reward": potential_reward,
-            "risk": potential_risk
-        }
-        
-        # 添加风险管理参数
-        risk_level, risk_description = evaluate_risk_level(
-            up_probability, 
-            market_type, 
-            rr_info["ratio"] if rr_info else 0
-        )
-        
-        # 计算止损位
-        stop_loss = calculate_stop_loss(
-            df_1h, 
-            "buy" if up_probability > 50 else "sell", 
-            "atr"
-        )
-        
-        # 计算止盈位
-        take_profit = calculate_take_profit(
-            df_1h, 
-            "buy" if up_probability > 50 else "sell", 
-            risk_level
-        )
-        
-        # 计算建议仓位
-        position_size = calculate_position_size(df_1h, risk_level)
-        position_text = f"{int(position_size * 100)}%"
-        
-        # 将所有数据合并到一个字典中
-        result = {
-            "symbol": symbol,
-            "price": price,
-            "up_probability": up_probability,
-            "down_probability": 100 - up_probability,
-            "signal_strength": signal_strength,
-            "signal_strength_text": signal_strength_text,
-            "direction": direction,
-            "market_type": market_type,
-            "rsi_1h": rsi_1h_value,
-            "rsi_4h": rsi_4h_value,
-            "rsi_1d": rsi_1d_value,
-            "macd_histogram": histogram.iloc[-1] if not pd.isna(histogram.iloc[-1]) else 0,
-            "price_position_bb": price_position_bb,
-            "atr": atr_value,
-            "rr_info": rr_info,
-            "short_term_rec": short_term_rec,
-            "long_term_rec": long_term_rec,
-            "risk_level": risk_level,
-            "risk_description": risk_description,
-            "stop_loss": stop_loss,
-            "take_profit": take_profit,
-            "position_size": position_size,
-            "position_text": position_text
-        }
+        result = build_result(symbol, ctx_1h, values)
         
+        metrics.analysis_stage_seconds.observe(time.perf_counter() - indicators_done, stage="risk")
         return result
     except Exception as e:
         logger.error(f"分析 {symbol} 失败: {e}")
         return None
 
+def frame_inputs(ctx_1h, df_4h, df_1d):
+    """单个交易对最新K线的指标值（与 batch_indicators.score_batch 的输入相同）"""
+    # 计算各种指标
+    # 1. RSI指标
+    rsi_1h = calculate_rsi(ctx_1h)
+    rsi_4h = calculate_rsi(df_4h)
+    rsi_1d = calculate_rsi(df_1d)
+    
+    # 2. MACD指标
+    macd_line, signal_line, histogram = calculate_macd(ctx_1h)
+    
+    # 3. 布林带指标
+    middle_band, upper_band, lower_band = calculate_bollinger_bands(ctx_1h)
+    
+    # 4. 趋势指标 (EMA)
+    ema_short = calculate_ema(ctx_1h, EMA_SHORT)
+    ema_long = calculate_ema(ctx_1h, EMA_LONG)
+    
+    # 5. 波动率指标 (ATR)
+    atr = calculate_atr(ctx_1h)
+    
+    return {
+        "price": ctx_1h.df['close'].iloc[-1],
+        "rsi": rsi_1h.iloc[-1],
+        "rsi_4h": rsi_4h.iloc[-1],
+        "rsi_1d": rsi_1d.iloc[-1],
+        "macd_histogram": histogram.iloc[-1],
+        "bb_upper": upper_band.iloc[-1],
+        "bb_lower": lower_band.iloc[-1],
+        "ema_short": ema_short.iloc[-1],
+        "ema_long": ema_long.iloc[-1],
+        "atr": atr.iloc[-1],
+        "market_type": get_market_type(ctx_1h),
+    }
+
+def build_result(symbol, ctx_1h, values):
+    """
+    由最新K线的指标值和评分生成分析结果（建议文本和风险参数）
+
+    参数:
+    - ctx_1h: 1小时K线的 IndicatorContext，用于计算止损、止盈和仓位
+    - values: frame_inputs 的指标值以及 scoring.score_inputs 的评分结果；
+      单个交易对分析和批量分析共用
+    """
+    # 获取最新价格
+    price = values["price"]
+    upper_band = values["bb_upper"]
+    lower_band = values["bb_lower"]
+    market_type = values["market_type"]
+    
+    # 计算RSI指标信号概率 (RSI高于70超买，低于30超卖)
+    rsi_1h_value = values["rsi"] if not pd.isna(values["rsi"]) else 50
+    rsi_4h_value = values["rsi_4h"] if not pd.isna(values["rsi_4h"]) else 50
+    rsi_1d_value = values["rsi_1d"] if not pd.isna(values["rsi_1d"]) else 50
+    
+    # 波动率影响 (ATR相对值)
+    atr_value = values["atr"] if not pd.isna(values["atr"]) else 0
+    
+    # 综合上涨概率、信号强度和方向 (换算规则见 modules/scoring.py)
+    up_probability = float(values["up_probability"])
+    signal_strength = float(values["signal_strength"])
+    direction = str(values["direction"])
+    
+    # 信号强度文本描述
+    if signal_strength > 80:
+        signal_strength_text = "极强"
+    elif signal_strength > 60:
+        signal_strength_text = "较强"
+    elif signal_strength > 40:
+        signal_strength_text = "中等"
+    elif signal_strength > 20:
+        signal_strength_text = "较弱"
+    else:
+        signal_strength_text = "微弱"
+    
+    # 短期建议
+    if up_probability > STRONG_SIGNAL_THRESHOLD:
+        short_term_rec = f"强烈看涨 ({signal_strength_text})"
+    elif up_probability > 60:
+        short_term_rec = f"看涨 ({signal_strength_text})"
+    elif up_probability < (100 - STRONG_SIGNAL_THRESHOLD):
+        short_term_rec = f"强烈看跌 ({signal_strength_text})"
+    elif up_probability < 40:
+        short_term_rec = f"看跌 ({signal_strength_text})"
+    else:
+        short_term_rec = f"震荡/观望 ({signal_strength_text})"
+    
+    # 长期建议基于日线RSI和趋势
+    if rsi_1d_value < 40 and "上升" in market_type:
+        long_term_rec = "看涨 (超跌+上升趋势)"
+    elif rsi_1d_value > 60 and "下降" in market_type:
+        long_term_rec = "看跌 (超买+下降趋势)"
+    elif "强上升" in market_type:
+        long_term_rec = "看涨 (强上升趋势)"
+    elif "强下降" in market_type:
+        long_term_rec = "看跌 (强下降趋势)"
+    elif rsi_1d_value < 30:
+        long_term_rec = "看涨 (长期超跌)"
+    elif rsi_1d_value > 70:
+        long_term_rec = "看跌 (长期超买)"
+    else:
+        long_term_rec = "中性 (无明显趋势)"
+    
+    # 风险收益比计算
+    if direction == "buy":
+        potential_reward = (upper_band - price) / price * 100
+        potential_risk = (price - lower_band) / price * 100
+    else:
+        potential_reward = (price - lower_band) / price * 100
+        potential_risk = (upper_band - price) / price * 100
+    
+    if potential_risk > 0:
+        rr_ratio = potential_reward / potential_risk
+    else:
+        rr_ratio = 1.0
+    
+    # 风险收益比评级
+    if rr_ratio > 3:
+        rr_rating = "极佳"
+    elif rr_ratio > 2:
+        rr_rating = "优秀"
+    elif rr_ratio > 1:
+        rr_rating = "良好"
+    else:
+        rr_rating = "一般"
+        
+    rr_info = {
+        "ratio": rr_ratio,
+        "rating": rr_rating,
+        "reward": potential_reward,
+        "risk": potential_risk
+    }
+    
+    # 添加风险管理参数
+    risk_level, risk_description = evaluate_risk_level(
+        up_probability, 
+        market_type, 
+        rr_info["ratio"] if rr_info else 0
+    )
+    
+    # 计算止损位
+    stop_loss = calculate_stop_loss(
+        ctx_1h, 
+        "buy" if up_probability > 50 else "sell", 
+        "atr"
+    )
+    
+    # 计算止盈位
+    take_profit = calculate_take_profit(
+        ctx_1h, 
+        "buy" if up_probability > 50 else "sell", 
+        risk_level
+    )
+    
+    # 计算建议仓位
+    position_size = calculate_position_size(ctx_1h, risk_level)
+    position_text = f"{int(position_size * 100)}%"
+    
+    # 将所有数据合并到一个字典中
+    return {
+        "symbol": symbol,
+        "price": price,
+        "up_probability": up_probability,
+        "down_probability": 100 - up_probability,
+        "signal_strength": signal_strength,
+        "signal_strength_text": signal_strength_text,
+        "direction": direction,
+        "market_type": market_type,
+        "rsi_1h": rsi_1h_value,
+        "rsi_4h": rsi_4h_value,
+        "rsi_1d": rsi_1d_value,
+        "macd_histogram": values["macd_histogram"] if not pd.isna(values["macd_histogram"]) else 0,
+        "price_position_bb": float(values["price_position_bb"]),
+        "atr": atr_value,
+        "rr_info": rr_info,
+        "short_term_rec": short_term_rec,
+        "long_term_rec": long_term_rec,
+        "risk_level": risk_level,
+        "risk_description": risk_description,
+        "stop_loss": stop_loss,
+        "take_profit": take_profit,
+        "position_size": position_size,
+        "position_text": position_text
+    }
+
+def analyze_batch(symbols, frames, now_ms=None):
+    """
+    批量分析多个交易对：所有交易对的指标和评分通过 batch_indicators 一次向量化计算，
+    止损、止盈和仓位仍按交易对计算
+
+    参数:
+    - frames: {交易对: {周期: DataFrame}}
+
+    返回:
+    - 与 symbols 顺序一致的结果列表（失败的为 None）
+    """
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    closed = {}
+    for symbol in symbols:
+        symbol_frames = frames.get(symbol) or {}
+        if any(symbol_frames.get(interval) is None for interval in KLINE_INTERVALS):
+            logger.error(f"获取 {symbol} K线数据失败")
+            continue
+        symbol_frames = {interval: closed_candles(symbol_frames[interval], now_ms) for interval in KLINE_INTERVALS}
+        if any(df.empty for df in symbol_frames.values()):
+            logger.error(f"{symbol} 没有已收盘的K线")
+            continue
+        closed[symbol] = symbol_frames
+    
+    results = {}
+    valid = list(closed)
+    if valid:
+        stage_start = time.perf_counter()
+        try:
+            scores = score_batch(*[[closed[symbol][interval] for symbol in valid] for interval in ("1h", "4h", "1d")])
+        except Exception as e:
+            logger.error(f"批量计算指标失败，改为逐个分析: {e}")
+            return analyze_fetched_frames(symbols, frames, now_ms)
+        # 批量计算的耗时按交易对数量平摊
+        metrics.analysis_stage_seconds.observe((time.perf_counter() - stage_start) / len(valid), stage="indicators")
+        
+        for index, symbol in enumerate(valid):
+            risk_start = time.perf_counter()
+            try:
+                values = {key: value[index] for key, value in scores.items()}
+                values["market_type"] = classify_market(
+                    values["price_change"], values["volatility"], values["ema_short"], values["ema_long"]
+                )
+                results[symbol] = build_result(symbol, IndicatorContext(closed[symbol]["1h"]), values)
+            except Exception as e:
+                logger.error(f"分析 {symbol} 失败: {e}")
+            metrics.analysis_stage_seconds.observe(time.perf_counter() - risk_start, stage="risk")
+    
+    return [results.get(symbol) for symbol in symbols]
+
 # 监控所有交易对
-def monitor_symbols():
-    """监控所有配置的交易对，计算信号并处理变化"""
+def monitor_symbols(refresh_intervals=None, publish=True):
+    """
+    监控所有配置的交易对，计算信号并处理变化
+
+    参数:
+    - refresh_intervals: 需要重新拉取的周期（例如刚收盘的周期），None 表示全部
+    - publish: 为 False 时只分析，不更新信号状态、不发布快照也不发送提醒（性能分析使用）
+    """
     try:
         # 从配置或数据库加载监控的交易对
         symbols = load_user_symbols()
         
-        results = []
-        critical_signals = []
+        # 同步推送订阅（监控列表可能被 /add /remove 修改）
+        if kline_stream.running:
+            kline_stream.set_symbols(symbols, KLINE_INTERVALS)
+        
+        cycle_start = time.perf_counter()
+        
+        # 没有新K线收盘的交易对直接命中按K线版本缓存的结果，不发起请求
+        if MONITOR_CONCURRENT and len(symbols) > 1:
+            results, fetch_time = analyze_symbols_concurrently(symbols, refresh_intervals)
+        else:
+            results, fetch_time = analyze_symbols_sequentially(symbols, refresh_intervals), None
         
-        for symbol in symbols:
+        finish_cycle(symbols, results, fetch_time, cycle_start, publish)
+            
+        return results
+    
+    except Exception as e:
+        handle_error(e, "监控交易对")
+        return []
+
+# 各交易对上次提醒时的信号状态
+signal_states = SignalStateTable()
+metrics.counter(
+    "signal_state_total", "信号状态表：跳过未变化的结果、比较的结果、发出的提醒", ["event"],
+    function=lambda: dict(signal_states.stats)
+)
+
+# 最近一次监控周期的结果快照，供 /m 复用
+market_snapshots = SnapshotStore(monitor_symbols)
+metrics.counter(
+    "market_snapshot_requests_total", "市场概况请求：新计算、加入进行中的计算、复用快照", ["result"],
+    function=lambda: dict(market_snapshots.stats)
+)
+
+# 监控周期收尾：统计耗时并发送关键信号
+def finish_cycle(symbols, results, fetch_time, cycle_start, publish=True):
+    """记录周期耗时并处理关键信号；publish 为 False 时只记录日志"""
+    total_time = time.perf_counter() - cycle_start
+    fetch_text = f"拉取 {fetch_time:.2f}s, " if fetch_time is not None else ""
+    logger.info(
+        f"监控周期完成: {len(results)}/{len(symbols)} 个交易对, "
+        f"{fetch_text}总计 {total_time:.2f}s"
+    )
+    if not publish:
+        return
+    
+    # 与上次提醒相比真正发生变化的信号
+    transitions = signal_states.update(results, symbols)
+    
+    # 记录周期耗时
+    metrics.monitor_cycle_seconds.observe(total_time)
+    if fetch_time is not None:
+        metrics.monitor_fetch_seconds.observe(fetch_time)
+    metrics.monitor_symbols_total.inc(len(results), result="ok")
+    metrics.monitor_symbols_total.inc(len(symbols) - len(results), result="failed")
+    last_cycle_stats.update({
+        "time": datetime.now(),
+        "symbols": len(symbols),
+        "succeeded": len(results),
+        "fetch_seconds": fetch_time,
+        "total_seconds": total_time
+    })
+    
+    if results:
+        market_snapshots.publish(results)
+    
+    # 发送关键信号提醒
+    if transitions:
+        send_critical_signals(transitions)
+
+# 逐个交易对顺序分析
+def analyze_symbols_sequentially(symbols, refresh_intervals=None):
+    """逐个计算交易对信号（K线未更新时使用缓存结果）"""
+    def compute(missing):
+        results = []
+        for (symbol,) in missing:
             try:
-                # 计算信号
-                prob_data = calculate_probability(symbol)
-                
-                if prob_data:
-                    results.append(prob_data)
-                    
-                    # 判断是否是关键信号
-                    if prob_data['signal_strength'] in ["强烈看涨", "强烈看跌"]:
-                        critical_signals.append(prob_data)
-                        
+                frames = fetch_frames(symbol, refresh_intervals)
+                results.append(analyze_frames(symbol, frames["1h"], frames["4h"], frames["1d"]))
             except Exception as e:
                 logger.error(f"处理 {symbol} 时出错: {e}")
-                
-        # 发送关键信号提醒
-        if critical_signals:
-            send_critical_signals(critical_signals)
-            
+                results.append(None)
+        return results
+    
+    return [result for result in calculate_probability.map([(symbol,) for symbol in symbols], compute) if result]
+
+# 监控周期工作线程的名称前缀（性能分析只记录这些线程）
+WORKER_THREAD_PREFIX = "monitor-worker"
+
+# 并发拉取所有 (交易对, 周期) 的K线
+def fetch_frames_concurrently(symbols, refresh_intervals=None):
+    """
+    使用线程池并发获取全部K线数据
+
+    返回:
+    - {交易对: {周期: DataFrame}}，获取失败的为 None
+    """
+    frames = {symbol: {} for symbol in symbols}
+    pairs = [
+        (symbol, interval, limit)
+        for symbol in symbols
+        for interval, limit in KLINE_INTERVALS.items()
+    ]
+    
+    with ThreadPoolExecutor(max_workers=min(MONITOR_WORKERS, len(pairs)), thread_name_prefix=WORKER_THREAD_PREFIX) as executor:
+        futures = {
+            executor.submit(
+                get_klines, symbol, interval, limit, should_refresh(interval, refresh_intervals)
+            ): (symbol, interval)
+            for symbol, interval, limit in pairs
+        }
+        for future in as_completed(futures):
+            symbol, interval = futures[future]
+            try:
+                frames[symbol][interval] = future.result()
+            except Exception as e:
+                logger.error(f"获取 {symbol} {interval} K线失败: {e}")
+                frames[symbol][interval] = None
+    return frames
+
+def analyze_fetched_frames(symbols, frames, now_ms=None):
+    """逐个分析已获取的K线数据，返回与 symbols 顺序一致的结果列表"""
+    results = []
+    for symbol in symbols:
+        try:
+            symbol_frames = frames.get(symbol) or {}
+            results.append(analyze_frames(
+                symbol, symbol_frames.get("1h"), symbol_frames.get("4h"), symbol_frames.get("1d"), now_ms
+            ))
+        except Exception as e:
+            logger.error(f"处理 {symbol} 时出错: {e}")
+            results.append(None)
+    return results
+
+# 并发拉取所有 (交易对, 周期) 的K线后再分析
+def analyze_symbols_concurrently(symbols, refresh_intervals=None):
+    """
+    使用线程池并发获取全部K线数据，然后批量分析（K线未更新的交易对直接使用缓存结果）
+
+    返回:
+    - 分析结果列表
+    - 拉取阶段耗时（秒）
+    """
+    fetch_time = 0.0
+    
+    def compute(missing):
+        nonlocal fetch_time
+        pending = [symbol for (symbol,) in missing]
+        fetch_start = time.perf_counter()
+        frames = fetch_frames_concurrently(pending, refresh_intervals)
+        fetch_time = time.perf_counter() - fetch_start
+        return analyze_batch(pending, frames)
+    
+    results = calculate_probability.map([(symbol,) for symbol in symbols], compute)
+    return [result for result in results if result], fetch_time
+
+# 异步获取单个交易对在各周期的K线数据
+async def async_fetch_frames(client, symbol, refresh_intervals=None):
+    """在事件循环中并发获取单个交易对的全部周期K线"""
+    with metrics.analysis_stage_seconds.time(stage="fetch"):
+        frames = await asyncio.gather(*[
+            async_get_klines(client, symbol, interval, limit, should_refresh(interval, refresh_intervals))
+            for interval, limit in KLINE_INTERVALS.items()
+        ])
+    return dict(zip(KLINE_INTERVALS, frames))
+
+async def async_fetch_all_frames(client, symbols, refresh_intervals=None):
+    """在事件循环中并发获取多个交易对的全部周期K线，获取失败的交易对为 None"""
+    fetched = await asyncio.gather(
+        *[async_fetch_frames(client, symbol, refresh_intervals) for symbol in symbols],
+        return_exceptions=True
+    )
+    frames = {}
+    for symbol, symbol_frames in zip(symbols, fetched):
+        if isinstance(symbol_frames, Exception):
+            logger.error(f"获取 {symbol} K线失败: {symbol_frames}")
+            symbol_frames = {}
+        frames[symbol] = symbol_frames
+    return frames
+
+async def async_analyze_symbols(client, symbols, refresh_intervals=None):
+    """
+    异步获取未命中缓存的交易对K线并分析
+
+    缓存查询和分析在工作线程中执行，K线请求通过 run_coroutine_threadsafe 交回事件循环，
+    分析期间事件循环不会被阻塞
+    """
+    loop = asyncio.get_running_loop()
+    
+    def compute(missing):
+        pending = [symbol for (symbol,) in missing]
+        frames = asyncio.run_coroutine_threadsafe(
+            async_fetch_all_frames(client, pending, refresh_intervals), loop
+        ).result()
+        return analyze_batch(pending, frames)
+    
+    results = await asyncio.to_thread(
+        calculate_probability.map, [(symbol,) for symbol in symbols], compute
+    )
+    return [result for result in results if result]
+
+async def async_calculate_probability(symbol, client=None, refresh_intervals=None):
+    """
+    calculate_probability 的异步版本
+    """
+    if client is None:
+        async with AsyncBinanceClient() as client:
+            return await async_calculate_probability(symbol, client, refresh_intervals)
+    
+    results = await async_analyze_symbols(client, [symbol], refresh_intervals)
+    return results[0] if results else None
+
+async def async_monitor_symbols(symbols=None, refresh_intervals=None, publish=True):
+    """
+    monitor_symbols 的异步版本，所有交易对的K线请求在同一个事件循环中并发执行
+    """
+    try:
+        if symbols is None:
+            symbols = load_user_symbols()
+        
+        if kline_stream.running:
+            kline_stream.set_symbols(symbols, KLINE_INTERVALS)
+        
+        cycle_start = time.perf_counter()
+        
+        async with AsyncBinanceClient() as client:
+            results = await async_analyze_symbols(client, symbols, refresh_intervals)
+        
+        # 发送消息等阻塞操作放到线程中执行，避免阻塞事件循环
+        await asyncio.to_thread(finish_cycle, symbols, results, None, cycle_start, publish)
+        
         return results
     
     except Exception as e:
-        handle_error(e, "监控交易对")
+        handle_error(e, "异步监控交易对")
         return []
 
+def run_async_monitor(refresh_intervals=None, publish=True):
+    """在新的事件循环中运行一次异步监控"""
+    async def run():
+        # 分析在默认线程池中执行，事件循环结束时随之关闭
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(thread_name_prefix=WORKER_THREAD_PREFIX))
+        return await async_monitor_symbols(refresh_intervals=refresh_intervals, publish=publish)
+    return asyncio.run(run())
+
 # 发送关键信号提醒
-def send_critical_signals(signals):
-    """发送关键信号提醒"""
+def send_critical_signals(transitions):
+    """发送关键信号提醒（transitions 为 signal_states.update 返回的变化列表）"""
     try:
-        message = "🚨 关键信号提醒!\n\n"
+        header = "🚨 关键信号提醒!\n\n"
+        blocks = []
         
-        for signal in signals:
+        for transition in transitions:
+            signal = transition['result']
+            signal_icon = "⚪️" if transition['direction'] == NEUTRAL else "🔥"
             direction_arrow = "↗️" if signal['up_probability'] > 50 else "↘️"
             risk_icon = "🟢" if signal.get('risk_level') == "low" else "🟡" if signal.get('risk_level') == "medium" else "🔴"
             
@@ -346,10 +628,11 @@ def send_critical_signals(signals):
             # 计算目标百分比
             target_percent = abs((signal['take_profit'] - signal['price']) / signal['price'] * 100)
             
-            message += (
+            blocks.append(
                 f"💎 {signal['symbol']} {direction_arrow}\n"
                 f"└ 价格: ${signal['price']:.2f}\n"
-                f"└ 信号: {signal['signal_strength']}\n"
+                f"└ 信号: {signal_icon} {transition['direction']} ({signal.get('signal_strength_text', 'N/A')})\n"
+                f"└ 变化: {'；'.join(transition['reasons'])}\n"
                 f"└ 概率: ↑{signal['up_probability']:.1f}% | ↓{signal['down_probability']:.1f}%\n"
                 f"└ 市场: {signal.get('market_type', 'N/A')}\n"
                 f"└ 风险: {risk_icon} {signal.get('risk_description', 'N/A')}\n"
@@ -358,56 +641,51 @@ def send_critical_signals(signals):
                 f"└ 目标: ${signal.get('take_profit', 0):.2f} ({target_percent:.1f}%)\n\n"
             )
             
-        bot.send_message(CHAT_ID, message)
+        # 按交易对拆分过长的消息；短时间内连续触发的提醒合并为一条消息
+        for message in pack_messages(header, blocks):
+            dispatcher.send(CHAT_ID, message, coalesce="signal")
     
     except Exception as e:
         handle_error(e, "发送关键信号")
 
+# 市场概况中单个交易对的文本块
+def format_overview_block(result):
+    direction_arrow = "↗️" if result['up_probability'] > 50 else "↘️"
+    risk_icon = "🟢" if result.get('risk_level') == "low" else "🟡" if result.get('risk_level') == "medium" else "🔴"
+    
+    # 计算止损百分比
+    stop_loss_percent = abs((result['stop_loss'] - result['price']) / result['price'] * 100)
+    
+    # 计算目标百分比
+    target_percent = abs((result['take_profit'] - result['price']) / result['price'] * 100)
+    
+    return (
+        f"💎 {result['symbol']} {direction_arrow}\n"
+        f"└ 价格: ${result['price']:.2f}\n"
+        f"└ 概率: ↑{result['up_probability']:.1f}% | ↓{result['down_probability']:.1f}%\n"
+        f"└ 市场: {result.get('market_type', 'N/A')}\n"
+        f"└ 风险: {risk_icon} {result.get('risk_description', 'N/A')}\n"
+        f"└ 建议仓位: {result.get('position_text', 'N/A')}\n"
+        f"└ 止损: ${result.get('stop_loss', 0):.2f} ({stop_loss_percent:.1f}%)\n"
+        f"└ 目标: ${result.get('take_profit', 0):.2f} ({target_percent:.1f}%)\n\n"
+    )
+
+def render_market_overview(snapshot):
+    """将快照渲染为消息列表（按交易对边界拆分）"""
+    header = f"📊 市场概况 ({snapshot.time.strftime('%Y-%m-%d %H:%M:%S')})\n\n"
+    return tuple(pack_messages(header, [format_overview_block(result) for result in snapshot.results]))
+
 # 发送市场概况
 def send_market_overview():
-    """发送市场概况消息"""
+    """发送市场概况消息（使用有效期内的快照，多个请求共享同一次计算）"""
     try:
-        results = monitor_symbols()
+        snapshot = market_snapshots.get()
         
-        if not results:
-            bot.send_message(CHAT_ID, "❌ 无法获取市场数据，请稍后再试")
+        if snapshot is None or not snapshot.results:
+            dispatcher.send(CHAT_ID, "❌ 无法获取市场数据，请稍后再试")
             return
-            
-        # 添加当前时间
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        message = f"📊 市场概况 ({current_time})\n\n"
-        
-        # 按上涨概率排序
-        results.sort(key=lambda x: x['up_probability'], reverse=True)
         
-        for result in results:
-            direction_arrow = "↗️" if result['up_probability'] > 50 else "↘️"
-            risk_icon = "🟢" if result.get('risk_level') == "low" else "🟡" if result.get('risk_level') == "medium" else "🔴"
-            
-            # 计算止损百分比
-            stop_loss_percent = abs((result['stop_loss'] - result['price']) / result['price'] * 100)
-            
-            # 计算目标百分比
-            target_percent = abs((result['take_profit'] - result['price']) / result['price'] * 100)
-            
-            message += (
-                f"💎 {result['symbol']} {direction_arrow}\n"
-                f"└ 价格: ${result['price']:.2f}\n"
-                f"└ 概率: ↑{result['up_probability']:.1f}% | ↓{result['down_probability']:.1f}%\n"
-                f"└ 市场: {result.get('market_type', 'N/A')}\n"
-                f"└ 风险: {risk_icon} {result.get('risk_description', 'N/A')}\n"
-                f"└ 建议仓位: {result.get('position_text', 'N/A')}\n"
-                f"└ 止损: ${result.get('stop_loss', 0):.2f} ({stop_loss_percent:.1f}%)\n"
-                f"└ 目标: ${result.get('take_profit', 0):.2f} ({target_percent:.1f}%)\n\n"
-            )
-            
-        # 如果消息太长，拆分发送
-        if len(message) > 4000:
-            parts = [message[i:i+4000] for i in range(0, len(message), 4000)]
-            for part in parts:
-                bot.send_message(CHAT_ID, part)
-        else:
-            bot.send_message(CHAT_ID, message)
+        dispatcher.send_parts(CHAT_ID, market_snapshots.render(snapshot, render_market_overview))
     
     except Exception as e:
         handle_error(e, "发送市场概况")
@@ -418,26 +696,50 @@ def send_heartbeat():
     try:
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         message = f"💓 机器人正常运行中\n时间: {now}"
-        bot.send_message(CHAT_ID, message)
+        dispatcher.send(CHAT_ID, message)
     except Exception as e:
         handle_error(e, "发送心跳")
 
+# K线收盘任务
+def run_scheduled_cycle(closed_intervals):
+    """只对刚收盘的分析周期重新拉取K线并分析"""
+    refresh_intervals = [interval for interval in closed_intervals if interval in KLINE_INTERVALS]
+    if not refresh_intervals:
+        logger.debug(f"{'/'.join(closed_intervals)} 收盘不涉及分析周期，跳过")
+        return
+    run_monitor_cycle(refresh_intervals)
+
+def run_monitor_cycle(refresh_intervals=None, publish=True):
+    """按配置的流水线（USE_ASYNC_PIPELINE）运行一次监控周期"""
+    if USE_ASYNC_PIPELINE:
+        return run_async_monitor(refresh_intervals, publish)
+    return monitor_symbols(refresh_intervals, publish)
+
+# K线收盘调度器（启用推送时，所有交易对收到收盘推送后立即触发，见 index.py）
+candle_scheduler = CandleScheduler(run_scheduled_cycle)
+
 # 定时任务运行函数
 def run_schedule():
     """运行所有定时任务"""
+    # 预先加载交易对索引，命令校验交易对时无需等待
+    symbol_index.ensure_loaded()
+    
+    # 启动时先完整分析一次，之后只在K线收盘时分析
+    run_monitor_cycle()
+    candle_scheduler.start()
+    
     # 设置定时任务
-    schedule.every(MONITOR_INTERVAL).minutes.do(send_market_overview)
     schedule.every(HEARTBEAT_INTERVAL).minutes.do(send_heartbeat)
+    schedule.every(SYMBOL_INDEX_REFRESH).hours.do(symbol_index.refresh)
     
     while True:
         try:
             schedule.run_pending()
-            time.sleep(1)
+            # 休眠到下一个任务，而不是每秒轮询
+            idle_seconds = schedule.idle_seconds()
+            time.sleep(max(1, idle_seconds if idle_seconds is not None else 60))
         except Exception as e:
             error_message = f"❌ 定时任务出错: {str(e)}"
             logger.error(error_message)
-            try:
-                bot.send_message(CHAT_ID, error_message)
-            except:
-                pass
-            time.sleep(60) 
\ No newline at end of file
+            dispatcher.send(CHAT_ID, error_message, coalesce="error")
+            time.sleep(60)
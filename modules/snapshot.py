@@ -0,0 +1,107 @@
+"""
+市场快照模块
+
+每个监控周期结束时把结果发布为一个不可变快照（带递增版本号）。/m 在快照有效期内
+直接使用最近的快照；过期时只启动一次计算，同时到达的请求等待同一个计算结果。
+渲染好的消息按快照版本缓存，同一版本只渲染一次。
+"""
+import threading
+import time
+import logging
+from collections import namedtuple
+from concurrent.futures import Future
+from datetime import datetime
+from types import MappingProxyType
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# results 为按上涨概率从高到低排序的只读结果元组
+MarketSnapshot = namedtuple("MarketSnapshot", ["version", "time", "created", "results"])
+
+class SnapshotStore:
+    """
+    最近一次监控结果的快照与单飞计算
+
+    参数:
+    - compute: 运行一次完整监控的函数，返回结果列表
+    - max_age: 快照有效期（秒）
+    """
+    def __init__(self, compute, max_age=MARKET_SNAPSHOT_MAX_AGE):
+        self.compute = compute
+        self.max_age = max_age
+        self.latest = None
+        self.inflight = None
+        self.rendered = {}
+        self.lock = threading.Lock()
+        self.stats = {"computed": 0, "joined": 0, "reused": 0}
+
+    def publish(self, results):
+        """发布新快照，返回该快照"""
+        frozen = tuple(
+            MappingProxyType(dict(result))
+            for result in sorted(results, key=lambda x: x['up_probability'], reverse=True)
+        )
+        with self.lock:
+            version = self.latest.version + 1 if self.latest else 1
+            self.latest = MarketSnapshot(version, datetime.now(), time.monotonic(), frozen)
+            self.rendered.clear()
+            return self.latest
+
+    def fresh(self, max_age=None):
+        """在有效期内的最新快照，没有则返回 None"""
+        max_age = self.max_age if max_age is None else max_age
+        snapshot = self.latest
+        if snapshot is not None and time.monotonic() - snapshot.created < max_age:
+            return snapshot
+        return None
+
+    def get(self, max_age=None):
+        """
+        获取有效快照，必要时运行一次计算
+
+        返回:
+        - MarketSnapshot；计算失败或没有结果时返回 None
+        """
+        with self.lock:
+            snapshot = self.fresh(max_age)
+            if snapshot is not None:
+                self.stats["reused"] += 1
+                return snapshot
+            future = self.inflight
+            owner = future is None
+            if owner:
+                future = self.inflight = Future()
+                self.stats["computed"] += 1
+            else:
+                self.stats["joined"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            before = self.latest
+            results = self.compute()
+            # compute 正常结束时会自行发布快照（见 finish_cycle）
+            snapshot = self.latest if self.latest is not before else None
+            if snapshot is None and results:
+                snapshot = self.publish(results)
+            future.set_result(snapshot)
+            return snapshot
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight = None
+
+    def render(self, snapshot, renderer):
+        """按快照版本缓存 renderer(snapshot) 的结果"""
+        with self.lock:
+            cached = self.rendered.get(snapshot.version)
+        if cached is None:
+            cached = renderer(snapshot)
+            with self.lock:
+                if self.latest is not None and snapshot.version == self.latest.version:
+                    self.rendered[snapshot.version] = cached
+        return cached
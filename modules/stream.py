@@ -0,0 +1,301 @@
+"""
+WebSocket K线推送模块
+
+通过 Binance 组合流 (<symbol>@kline_<interval>) 维护K线增量存储：
+- 单个连接复用所有订阅，交易对变化时发送 SUBSCRIBE/UNSUBSCRIBE
+- 断线后按指数退避重连，重新订阅并通过 REST 补齐断线期间的缺口
+- 补齐期间收到的推送先缓存，标记为实时后按顺序重放，不会丢失补齐期间的收盘K线
+- 补齐完成后将对应 (交易对, 周期) 标记为实时，get_klines 不再发起 REST 请求
+- 订阅的所有交易对某个周期的K线都收盘后回调 on_interval_closed，由调度器立即开始分析
+- 每个实时 (交易对, 周期) 维护一组增量指标，推送到达时 O(1) 更新，可随时读取未收盘K线的指标
+"""
+import json
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from modules.api import kline_store
+from modules.streaming_indicators import IndicatorSet
+from config import *
+
+try:
+    import websocket
+except ImportError:  # 未安装 websocket-client 时无法使用推送模式
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+# 单条订阅消息中的最大流数量，以及消息间隔（Binance 限制每秒5条消息）
+SUBSCRIBE_CHUNK_SIZE = 100
+SUBSCRIBE_MESSAGE_INTERVAL = 0.25
+
+def stream_name(symbol, interval):
+    """交易对和周期对应的组合流名称"""
+    return f"{symbol.lower()}@kline_{interval}"
+
+def parse_kline_event(payload):
+    """
+    解析组合流推送的K线消息
+
+    返回:
+    - (symbol, interval, row, closed)，row 与 REST K线接口的行格式一致；
+      非K线消息返回 None
+    """
+    data = payload.get("data", payload)
+    if data.get("e") != "kline":
+        return None
+    k = data["k"]
+    row = [
+        k["t"], k["o"], k["h"], k["l"], k["c"], k["v"],
+        k["T"], k["q"], k["n"], k["V"], k["Q"], k.get("B", "0")
+    ]
+    return k["s"], k["i"], row, k["x"]
+
+class KlineStream:
+    """
+    K线推送客户端
+
+    参数:
+    - store: 需要维护的 KlineStore
+    - url: 组合流地址
+    - on_interval_closed: 可选回调 (interval, close_ms)，订阅的所有交易对在该周期的K线
+      都收到收盘推送时调用一次，close_ms 为收盘时刻（毫秒）
+    """
+    def __init__(self, store=kline_store, url=BINANCE_WS_URL, on_interval_closed=None):
+        self.store = store
+        self.url = url
+        self.on_interval_closed = on_interval_closed
+        self.limits = {}        # {(symbol, interval): limit}
+        self.pending = {}       # 补齐中的 (交易对, 周期) -> 期间收到的推送 [(row, closed)]
+        self.closes = {}        # (周期, 收盘时刻) -> 已收到收盘推送的交易对
+        self.indicators = {}    # 实时的 (交易对, 周期) -> [最后一根K线开盘时间, IndicatorSet]
+        self.subscribed = set()
+        self.ws = None
+        self.thread = None
+        self.running = False
+        self.connected = False
+        self.reconnects = 0
+        self.lock = threading.Lock()
+        self._next_id = 0
+
+    def set_symbols(self, symbols, intervals):
+        """
+        设置需要订阅的交易对
+
+        参数:
+        - symbols: 交易对列表
+        - intervals: {周期: 需要保留的K线数量}
+        """
+        limits = {
+            (symbol, interval): limit
+            for symbol in symbols
+            for interval, limit in intervals.items()
+        }
+        with self.lock:
+            added = [key for key in limits if key not in self.limits]
+            removed = [key for key in self.limits if key not in limits]
+            self.limits = limits
+
+        if not self.connected:
+            return
+        if removed:
+            for key in removed:
+                self.store.set_live(*key, live=False)
+            with self.lock:
+                for key in removed:
+                    self.indicators.pop(key, None)
+            self._send_subscription("UNSUBSCRIBE", [stream_name(*key) for key in removed])
+        if added:
+            self._start_backfill(added)
+            self._send_subscription("SUBSCRIBE", [stream_name(*key) for key in added])
+            self._backfill_async(added)
+
+    def start(self):
+        """在后台线程中启动推送连接"""
+        if websocket is None:
+            raise RuntimeError("推送模式需要安装 websocket-client: pip install websocket-client")
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="kline-stream", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """关闭推送连接"""
+        self.running = False
+        if self.ws is not None:
+            self.ws.close()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.store.clear_live()
+
+    def _run(self):
+        attempt = 0
+        while self.running:
+            started = time.monotonic()
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            self.ws.run_forever(ping_interval=STREAM_PING_INTERVAL, ping_timeout=10)
+            self._disconnected()
+            if not self.running:
+                break
+
+            # 连接持续较久说明不是连续失败，重置退避
+            if time.monotonic() - started > STREAM_MAX_BACKOFF:
+                attempt = 0
+            delay = min(STREAM_MAX_BACKOFF, 2 ** attempt)
+            attempt += 1
+            self.reconnects += 1
+            logger.warning(f"K线推送连接断开，{delay} 秒后重连")
+            time.sleep(delay)
+
+    def _on_open(self, ws):
+        self.connected = True
+        with self.lock:
+            keys = list(self.limits)
+        logger.info(f"K线推送已连接，订阅 {len(keys)} 个数据流")
+        # 先登记补齐，订阅后立即到达的推送会被缓存而不是丢弃
+        self._start_backfill(keys)
+        self._send_subscription("SUBSCRIBE", [stream_name(*key) for key in keys])
+        self._backfill_async(keys)
+
+    def _on_message(self, ws, message):
+        try:
+            payload = json.loads(message)
+            if "result" in payload:
+                return
+            event = parse_kline_event(payload)
+            if event is None:
+                return
+            symbol, interval, row, closed = event
+            with self.lock:
+                events = self.pending.get((symbol, interval))
+                if events is not None:
+                    events.append((row, closed))
+                    return
+            self._apply(symbol, interval, row, closed)
+        except Exception as e:
+            logger.error(f"处理K线推送失败: {e}")
+
+    def _apply(self, symbol, interval, row, closed):
+        """合并一根推送的K线，收盘时记录并在周期全部收盘时回调"""
+        if not self.store.apply(symbol, interval, row, closed):
+            return
+        with self.lock:
+            self._update_indicators((symbol, interval), row)
+        if closed:
+            self._record_close(symbol, interval, int(row[6]) + 1)
+
+    def _update_indicators(self, key, row):
+        """用推送的K线更新增量指标：同一根K线修正最后一根，新K线追加（调用方持有锁）"""
+        state = self.indicators.get(key)
+        if state is None:
+            return
+        open_time = int(row[0])
+        high, low, close = float(row[2]), float(row[3]), float(row[4])
+        if open_time == state[0]:
+            state[1].replace_last(high, low, close)
+        elif open_time > state[0]:
+            state[0] = open_time
+            state[1].push(high, low, close)
+
+    def live_indicators(self, symbol, interval):
+        """
+        实时 (交易对, 周期) 包含未收盘K线的最新指标
+
+        返回:
+        - IndicatorSet.snapshot() 的结果，附加 open_time；未实时维护时返回 None
+        """
+        with self.lock:
+            state = self.indicators.get((symbol, interval))
+            if state is None:
+                return None
+            return {"open_time": state[0], **state[1].snapshot()}
+
+    def _record_close(self, symbol, interval, close_ms):
+        with self.lock:
+            expected = {key[0] for key in self.limits if key[1] == interval}
+            # 只保留每个周期最近一个收盘时刻的记录
+            for key in [key for key in self.closes if key[0] == interval and key[1] < close_ms]:
+                del self.closes[key]
+            closed = self.closes.setdefault((interval, close_ms), set())
+            closed.add(symbol)
+            done = closed >= expected
+            if done:
+                del self.closes[(interval, close_ms)]
+        if done and self.on_interval_closed:
+            self.on_interval_closed(interval, close_ms)
+
+    def _on_error(self, ws, error):
+        logger.error(f"K线推送出错: {error}")
+
+    def _on_close(self, ws, status_code, reason):
+        self._disconnected()
+
+    def _disconnected(self):
+        self.connected = False
+        self.store.clear_live()
+        with self.lock:
+            self.pending.clear()
+            self.closes.clear()
+            self.indicators.clear()
+
+    def _send_subscription(self, method, streams):
+        """分批发送订阅/取消订阅消息"""
+        for i in range(0, len(streams), SUBSCRIBE_CHUNK_SIZE):
+            self._next_id += 1
+            message = {
+                "method": method,
+                "params": streams[i:i + SUBSCRIBE_CHUNK_SIZE],
+                "id": self._next_id
+            }
+            try:
+                self.ws.send(json.dumps(message))
+            except Exception as e:
+                logger.error(f"发送订阅消息失败: {e}")
+                return
+            time.sleep(SUBSCRIBE_MESSAGE_INTERVAL)
+
+    def _start_backfill(self, keys):
+        """登记需要补齐的 (交易对, 周期)，补齐完成前收到的推送先缓存"""
+        with self.lock:
+            for key in keys:
+                self.pending.setdefault(key, [])
+
+    def _backfill_async(self, keys):
+        threading.Thread(target=self._backfill, args=(keys,), daemon=True).start()
+
+    def _backfill(self, keys):
+        """通过 REST 补齐缓存缺口，完成后标记为实时并重放补齐期间收到的推送"""
+        def backfill_one(key):
+            symbol, interval = key
+            limit = self.limits.get(key)
+            rows = self.store.get_rows(symbol, interval, limit) if limit is not None else None
+            # 持有锁完成标记和重放，之后到达的推送不会排在缓存的推送之前
+            with self.lock:
+                events = self.pending.pop(key, None)
+                if rows is None or not self.connected or events is None:
+                    return
+                self.store.set_live(symbol, interval)
+                closes = [
+                    int(row[6]) + 1 for row, closed in events
+                    if self.store.apply(symbol, interval, row, closed) and closed
+                ]
+                # 用补齐和重放后的完整窗口初始化增量指标，之后每条推送 O(1) 更新
+                window = self.store.cached_rows(symbol, interval, limit)
+                if window:
+                    self.indicators[key] = [int(window[-1][0]), IndicatorSet.from_rows(window)]
+            for close_ms in closes:
+                self._record_close(symbol, interval, close_ms)
+
+        with ThreadPoolExecutor(max_workers=API_POOL_SIZE) as executor:
+            list(executor.map(backfill_one, keys))
+        logger.info(f"K线推送补齐完成: {len(keys)} 个数据流")
+
+# 全局推送客户端
+kline_stream = KlineStream()
@@ -0,0 +1,276 @@
+"""
+增量技术指标模块
+
+每个指标对象保存到上一根K线为止的状态，新K线 (push) 或未收盘K线的修正
+(replace_last) 都只需 O(1) 计算，结果与 modules/indicators 中的 pandas 实现一致。
+
+实时推送模式下 KlineStream 为每个实时 (交易对, 周期) 维护一个 IndicatorSet，
+通过 kline_stream.live_indicators(symbol, interval) 读取。
+
+用法:
+    indicators = IndicatorSet.from_frame(df)
+    indicators.replace_last(high, low, close)   # 未收盘K线价格变化
+    indicators.push(high, low, close)           # 新K线开盘
+    values = indicators.snapshot()
+"""
+import math
+from collections import deque
+from config import *
+
+NAN = float("nan")
+
+class RollingWindow:
+    """固定长度滑动窗口的滚动求和（等价于 rolling(window).mean()）"""
+    def __init__(self, period):
+        self.period = period
+        self.values = deque(maxlen=period)
+        self.total = 0.0
+
+    def push(self, x):
+        if len(self.values) == self.period:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+
+    def replace_last(self, x):
+        self.total += x - self.values[-1]
+        self.values[-1] = x
+
+    @property
+    def mean(self):
+        if len(self.values) < self.period:
+            return NAN
+        return self.total / self.period
+
+class EMA:
+    """指数移动平均（等价于 ewm(span=period, adjust=False).mean()）"""
+    def __init__(self, period):
+        self.alpha = 2 / (period + 1)
+        self._prev = None  # 上一根K线的EMA
+        self.value = NAN
+        self.count = 0
+
+    def _calc(self, x):
+        if self._prev is None:
+            return x
+        return self.alpha * x + (1 - self.alpha) * self._prev
+
+    def push(self, x):
+        self._prev = self.value if self.count else None
+        self.count += 1
+        self.value = self._calc(x)
+        return self.value
+
+    def replace_last(self, x):
+        if not self.count:
+            return self.push(x)
+        self.value = self._calc(x)
+        return self.value
+
+class RSI:
+    """RSI（与 calculate_rsi 相同，使用涨跌幅的简单滚动平均）"""
+    def __init__(self, period=RSI_PERIOD):
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+        self._prev_close = None  # 上一根K线收盘价
+        self._last_close = None
+
+    def _delta(self, close):
+        return 0.0 if self._prev_close is None else close - self._prev_close
+
+    def push(self, close):
+        if self._last_close is not None:
+            self._prev_close = self._last_close
+        self._last_close = close
+        delta = self._delta(close)
+        self.gains.push(max(delta, 0.0))
+        self.losses.push(max(-delta, 0.0))
+        return self.value
+
+    def replace_last(self, close):
+        if self._last_close is None:
+            return self.push(close)
+        self._last_close = close
+        delta = self._delta(close)
+        self.gains.replace_last(max(delta, 0.0))
+        self.losses.replace_last(max(-delta, 0.0))
+        return self.value
+
+    @property
+    def value(self):
+        avg_gain, avg_loss = self.gains.mean, self.losses.mean
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return NAN
+        if avg_loss == 0:
+            return NAN if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+class MACD:
+    """MACD（与 calculate_macd 相同）"""
+    def __init__(self, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def push(self, close):
+        macd_line = self.fast.push(close) - self.slow.push(close)
+        self.signal.push(macd_line)
+        return self.value
+
+    def replace_last(self, close):
+        macd_line = self.fast.replace_last(close) - self.slow.replace_last(close)
+        self.signal.replace_last(macd_line)
+        return self.value
+
+    @property
+    def value(self):
+        """返回 (MACD线, 信号线, 柱状图)"""
+        macd_line = self.fast.value - self.slow.value
+        return macd_line, self.signal.value, macd_line - self.signal.value
+
+class Bollinger:
+    """
+    布林带（与 calculate_bollinger_bands 相同）
+
+    使用 Welford 算法的滑动窗口版本维护均值和平方差和，避免每次重新求方差
+    """
+    def __init__(self, period=BOLLINGER_PERIOD, std_dev=BOLLINGER_STD):
+        self.period = period
+        self.std_dev = std_dev
+        self.values = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _add(self, x):
+        n = len(self.values) + 1
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+        self.values.append(x)
+
+    def _swap(self, old, new):
+        """窗口长度不变，用 new 替换 old"""
+        n = len(self.values)
+        old_mean = self.mean
+        self.mean += (new - old) / n
+        self.m2 += (new - old) * (new - self.mean + old - old_mean)
+        if self.m2 < 0:
+            self.m2 = 0.0
+
+    def push(self, close):
+        if len(self.values) < self.period:
+            self._add(close)
+        else:
+            self._swap(self.values[0], close)
+            self.values.append(close)
+        return self.value
+
+    def replace_last(self, close):
+        if not self.values:
+            return self.push(close)
+        self._swap(self.values[-1], close)
+        self.values[-1] = close
+        return self.value
+
+    @property
+    def value(self):
+        """返回 (中轨, 上轨, 下轨)"""
+        if len(self.values) < self.period:
+            return NAN, NAN, NAN
+        std = math.sqrt(self.m2 / (self.period - 1))
+        return self.mean, self.mean + std * self.std_dev, self.mean - std * self.std_dev
+
+class ATR:
+    """ATR（与 calculate_atr 相同，真实波幅的简单滚动平均）"""
+    def __init__(self, period=ATR_PERIOD):
+        self.ranges = RollingWindow(period)
+        self._prev_close = None
+        self._last_close = None
+
+    def _true_range(self, high, low):
+        if self._prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+
+    def push(self, high, low, close):
+        if self._last_close is not None:
+            self._prev_close = self._last_close
+        self._last_close = close
+        self.ranges.push(self._true_range(high, low))
+        return self.value
+
+    def replace_last(self, high, low, close):
+        if self._last_close is None:
+            return self.push(high, low, close)
+        self._last_close = close
+        self.ranges.replace_last(self._true_range(high, low))
+        return self.value
+
+    @property
+    def value(self):
+        return self.ranges.mean
+
+class IndicatorSet:
+    """单个 (交易对, 周期) 的全部增量指标"""
+    def __init__(self):
+        self.rsi = RSI()
+        self.macd = MACD()
+        self.bollinger = Bollinger()
+        self.ema_short = EMA(EMA_SHORT)
+        self.ema_long = EMA(EMA_LONG)
+        self.atr = ATR()
+        self.price = NAN
+
+    @classmethod
+    def from_frame(cls, df):
+        """用已有的K线 DataFrame 初始化"""
+        indicators = cls()
+        for high, low, close in zip(df['high'].values, df['low'].values, df['close'].values):
+            indicators.push(float(high), float(low), float(close))
+        return indicators
+
+    @classmethod
+    def from_rows(cls, rows):
+        """用 K线接口行格式的K线初始化"""
+        indicators = cls()
+        for row in rows:
+            indicators.push(float(row[2]), float(row[3]), float(row[4]))
+        return indicators
+
+    def push(self, high, low, close):
+        """追加一根新K线"""
+        self.rsi.push(close)
+        self.macd.push(close)
+        self.bollinger.push(close)
+        self.ema_short.push(close)
+        self.ema_long.push(close)
+        self.atr.push(high, low, close)
+        self.price = close
+
+    def replace_last(self, high, low, close):
+        """修正最后一根（未收盘）K线"""
+        self.rsi.replace_last(close)
+        self.macd.replace_last(close)
+        self.bollinger.replace_last(close)
+        self.ema_short.replace_last(close)
+        self.ema_long.replace_last(close)
+        self.atr.replace_last(high, low, close)
+        self.price = close
+
+    def snapshot(self):
+        """返回当前各指标的最新值"""
+        macd_line, signal_line, histogram = self.macd.value
+        middle_band, upper_band, lower_band = self.bollinger.value
+        return {
+            "price": self.price,
+            "rsi": self.rsi.value,
+            "macd_line": macd_line,
+            "signal_line": signal_line,
+            "macd_histogram": histogram,
+            "bb_middle": middle_band,
+            "bb_upper": upper_band,
+            "bb_lower": lower_band,
+            "ema_short": self.ema_short.value,
+            "ema_long": self.ema_long.value,
+            "atr": self.atr.value,
+        }
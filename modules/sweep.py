@@ -0,0 +1,142 @@
+"""
+参数扫描模块
+
+在进程池中用 backtest.evaluate 评估大量参数组合。与参数无关的特征
+（指标序列、固定评分项、未来价格路径）由 backtest.prepare_features 只计算一次，
+通过进程池的 initializer 在每个工作进程启动时传入一次，之后每个任务只传参数。
+
+用法:
+    python -m modules.sweep --symbols BTCUSDT ETHUSDT --data data/history
+    python -m modules.sweep --symbols BTCUSDT --grid rsi_weight=0.2,0.3 entry_threshold=70,75,80 --out sweep.csv
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+import logging
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from modules import backtest
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# 默认扫描范围，未列出的参数使用 backtest.DEFAULT_PARAMS
+DEFAULT_GRID = {
+    "rsi_weight": [0.15, 0.25, 0.35],
+    "macd_weight": [0.15, 0.25, 0.35],
+    "bollinger_weight": [0.10, 0.20, 0.30],
+    "ema_weight": [0.10, 0.20, 0.30],
+    "rsi_overbought": [70, 75],
+    "rsi_oversold": [25, 30],
+    "entry_threshold": [65, 70, 75],
+    "atr_multiplier_mid": [1.0, 1.5, 2.0],
+    "fib_medium": [1.618, 2.618],
+}
+
+# 每个任务评估的参数组数，减少进程间通信次数
+CHUNK_SIZE = 32
+
+# 工作进程中共享的回测特征
+_features = None
+
+def _init_worker(features):
+    global _features
+    _features = features
+
+def _evaluate_chunk(chunk):
+    return [backtest.evaluate(_features, params) for params in chunk]
+
+def expand_grid(grid, sample=None, seed=0):
+    """
+    展开参数网格
+
+    参数:
+    - grid: {参数名: 候选值列表}
+    - sample: 只随机抽取的组合数量（None 表示全部）
+    """
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+    if sample is not None and sample < len(combos):
+        combos = random.Random(seed).sample(combos, sample)
+    return combos
+
+def parse_grid(items):
+    """解析命令行的 name=v1,v2,... 参数网格"""
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if name not in backtest.DEFAULT_PARAMS:
+            raise ValueError(f"未知参数: {name}")
+        grid[name] = [float(value) for value in values.split(",") if value]
+    return grid
+
+def run_sweep(features, combos, workers=None, metric="weighted_pnl", min_trades=30):
+    """
+    并行评估参数组合
+
+    参数:
+    - features: backtest.prepare_features 的结果
+    - combos: 参数字典列表
+    - workers: 进程数，默认 CPU 核数
+    - metric: 排序指标
+    - min_trades: 交易次数少于该值的组合排在最后
+
+    返回:
+    - 按 metric 从高到低排序的结果表
+    """
+    chunks = [combos[i:i + CHUNK_SIZE] for i in range(0, len(combos), CHUNK_SIZE)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features,)) as executor:
+        for chunk_results in executor.map(_evaluate_chunk, chunks):
+            results.extend(chunk_results)
+
+    table = pd.DataFrame(results).drop(columns=["seconds", "bars_per_second"])
+    table["enough_trades"] = table["trades"] >= min_trades
+    table = table.sort_values(["enough_trades", metric], ascending=False, na_position="last")
+    return table.drop(columns="enough_trades").reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="策略参数扫描")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--data", default="data/history", help="本地K线目录")
+    parser.add_argument("--horizon", type=int, default=backtest.DEFAULT_HORIZON, help="最长持仓K线数")
+    parser.add_argument("--grid", nargs="*", default=[], metavar="NAME=V1,V2", help="参数网格，默认使用 DEFAULT_GRID")
+    parser.add_argument("--sample", type=int, help="随机抽取的组合数量")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--metric", default="weighted_pnl", help="排序指标")
+    parser.add_argument("--min-trades", type=int, default=30)
+    parser.add_argument("--top", type=int, default=20, help="显示前几名")
+    parser.add_argument("--out", help="完整结果输出的 CSV 路径")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    frames = {}
+    for symbol in args.symbols:
+        symbol_frames = backtest.load_frames(args.data, symbol)
+        if symbol_frames is None:
+            logger.warning(f"{args.data} 中没有 {symbol} 的1小时K线")
+            continue
+        frames[symbol] = symbol_frames
+
+    start = time.perf_counter()
+    features = backtest.prepare_features(frames, args.horizon)
+    combos = expand_grid(parse_grid(args.grid) if args.grid else DEFAULT_GRID, args.sample)
+    logger.info(f"特征计算 {time.perf_counter() - start:.2f}s，{len(features['price'])} 根K线，{len(combos)} 组参数")
+
+    start = time.perf_counter()
+    table = run_sweep(features, combos, args.workers, args.metric, args.min_trades)
+    seconds = time.perf_counter() - start
+    logger.info(f"扫描完成 {seconds:.1f}s（{len(combos) / seconds:.1f} 组/秒，{args.workers} 个进程）")
+
+    columns = list(dict.fromkeys(
+        [key for key in table.columns if table[key].nunique() > 1 and key in backtest.DEFAULT_PARAMS] +
+        ["trades", "hit_rate", "avg_pnl", "weighted_pnl", "profit_factor", args.metric]
+    ))
+    print(table[columns].head(args.top).to_string(float_format=lambda value: f"{value:.3f}"))
+    if args.out:
+        table.to_csv(args.out, index=False)
+
+if __name__ == "__main__":
+    main()
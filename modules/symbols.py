@@ -0,0 +1,139 @@
+"""
+交易对索引模块
+
+从 exchangeInfo 一次加载全部交易中的交易对（之后按 SYMBOL_INDEX_REFRESH 定期刷新），
+命令中的币种名在内存中完成校验、补全计价货币和拼写建议，不再通过拉取K线判断交易对是否存在。
+"""
+import bisect
+import difflib
+import threading
+import time
+import logging
+from modules.api import get_binance_data
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# 拼写建议的最多条数
+MAX_SUGGESTIONS = 5
+# 加载失败后的重试间隔（秒）
+RETRY_SECONDS = 60
+
+class SymbolIndex:
+    """
+    交易对索引
+
+    参数:
+    - fetch: 请求函数，签名同 api.get_binance_data
+    - quote_assets: 只输入币种时优先选择的计价货币
+    - refresh_hours: 索引过期时间（小时）
+    """
+    def __init__(self, fetch=get_binance_data, quote_assets=QUOTE_ASSETS, refresh_hours=SYMBOL_INDEX_REFRESH):
+        self.fetch = fetch
+        self.quote_assets = [quote.upper() for quote in quote_assets]
+        self.refresh_seconds = refresh_hours * 3600
+        self.pairs = {}       # 交易对 -> (币种, 计价货币)
+        self.bases = {}       # 币种 -> {计价货币: 交易对}
+        self.sorted_names = []  # 交易对和币种名排序列表，用于前缀查找
+        self.loaded_at = None
+        self.attempted_at = None
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return bool(self.pairs)
+
+    def refresh(self):
+        """从 exchangeInfo 重新加载，失败时保留旧索引，返回是否成功"""
+        self.attempted_at = time.monotonic()
+        data = self.fetch("exchangeInfo")
+        if not data or "symbols" not in data:
+            logger.error("加载交易对索引失败，继续使用现有索引")
+            return False
+        pairs = {}
+        bases = {}
+        for item in data["symbols"]:
+            if item.get("status") != "TRADING":
+                continue
+            symbol, base, quote = item["symbol"], item["baseAsset"], item["quoteAsset"]
+            pairs[symbol] = (base, quote)
+            bases.setdefault(base, {})[quote] = symbol
+        with self.lock:
+            self.pairs = pairs
+            self.bases = bases
+            self.sorted_names = sorted(set(pairs) | set(bases))
+            self.loaded_at = time.monotonic()
+        logger.info(f"交易对索引已更新: {len(pairs)} 个交易对，{len(bases)} 个币种")
+        return True
+
+    def ensure_loaded(self):
+        """索引为空或已过期时刷新（失败后 RETRY_SECONDS 内不重试），返回索引是否可用"""
+        with self.refresh_lock:
+            now = time.monotonic()
+            stale = self.loaded_at is None or now - self.loaded_at > self.refresh_seconds
+            if stale and (self.attempted_at is None or now - self.attempted_at > RETRY_SECONDS):
+                self.refresh()
+        return self.ready
+
+    def is_valid(self, symbol):
+        return symbol in self.pairs
+
+    def split(self, symbol):
+        """交易对拆分为 (币种, 计价货币)，未知交易对返回 None"""
+        return self.pairs.get(symbol)
+
+    def resolve(self, text):
+        """
+        将用户输入解析为交易对
+
+        支持 BTCUSDT、BTC/USDT、btc-usdt 以及只输入币种（按 quote_assets 顺序选择计价货币）
+
+        返回:
+        - 交易对，无法解析时返回 None
+        """
+        name = normalize(text)
+        if name in self.pairs:
+            return name
+        quotes = self.bases.get(name)
+        if quotes:
+            for quote in self.quote_assets:
+                if quote in quotes:
+                    return quotes[quote]
+            return quotes[sorted(quotes)[0]]
+        return None
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        """拼写建议：先按前缀匹配，不足时用 difflib 模糊匹配"""
+        name = normalize(text)
+        if not name:
+            return []
+        names = self.sorted_names  # refresh() 整体替换列表，这里只读取引用
+        start = bisect.bisect_left(names, name)
+        matches = []
+        for candidate in names[start:]:
+            if not candidate.startswith(name) or len(matches) >= limit:
+                break
+            matches.append(candidate)
+        if len(matches) < limit:
+            for candidate in difflib.get_close_matches(name, names, n=limit, cutoff=0.7):
+                if candidate not in matches:
+                    matches.append(candidate)
+        suggestions = []
+        for candidate in matches:
+            symbol = self.resolve(candidate)
+            if symbol and symbol not in suggestions:
+                suggestions.append(symbol)
+        return suggestions[:limit]
+
+def normalize(text):
+    """去掉空白和 / - _ 分隔符并转为大写"""
+    return "".join(text.split()).upper().replace("/", "").replace("-", "").replace("_", "")
+
+def legacy_symbol(text):
+    """索引不可用时的旧规则：不含 USDT 时补上 USDT 后缀"""
+    name = normalize(text)
+    return name if "USDT" in name else f"{name}USDT"
+
+# 全局交易对索引（首次使用时加载）
+symbol_index = SymbolIndex()
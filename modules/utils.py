@@ -1,5 +1,7 @@
 import json
 import os
+import time
+import threading
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -65,4 +67,100 @@ def save_user_symbols(symbols):
         return True
     except Exception as e:
         logger.error(f"保存用户自定义币种失败: {e}")
-        return False 
\ No newline at end of file
+        return False
+
+# 令牌桶限流器
+class TokenBucket:
+    """
+    线程安全的令牌桶
+
+    参数:
+    - capacity: 桶容量（令牌上限）
+    - period: 令牌从空到满所需的秒数
+    """
+    def __init__(self, capacity, period=60):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def reserve(self, amount=1):
+        """预占令牌，返回调用方需要等待的秒数（0表示可立即执行）"""
+        amount = min(float(amount), self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self, amount=1):
+        """阻塞直到获得令牌"""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def sync(self, used):
+        """根据服务端返回的已用额度校正剩余令牌（只会减少，不会增加）"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            remaining = self.capacity - float(used)
+            if remaining < self.tokens:
+                self.tokens = remaining
+
+    def pause(self, seconds):
+        """清空令牌，使后续请求至少等待指定秒数（用于429/418封禁）"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, -float(seconds) * self.rate)
+
+# K线周期换算为毫秒
+INTERVAL_UNITS_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+def interval_to_ms(interval):
+    """将 '15m'、'1h'、'4h'、'1d' 等周期转换为毫秒"""
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+
+def last_closed_open_time(interval, now_ms=None):
+    """
+    最近一根已收盘K线的开盘时间（毫秒）
+
+    Binance 的分钟/小时/日K线按 UTC 时间对齐，可以直接由当前时间推算
+    """
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    step = interval_to_ms(interval)
+    return (now_ms // step - 1) * step
+
+def pack_messages(header, blocks, limit=4000):
+    """
+    把若干文本块拼成不超过 limit 字符的消息，只在块之间拆分
+
+    第一条消息以 header 开头；单个块超过 limit 时才在块内部截断
+    """
+    messages = []
+    current = header
+    count = 0  # 当前消息中的块数
+    for block in blocks:
+        if count and len(current) + len(block) > limit:
+            messages.append(current)
+            current, count = "", 0
+        current += block
+        count += 1
+        while len(current) > limit:
+            messages.append(current[:limit])
+            current = current[limit:]
+    if current:
+        messages.append(current)
+    return messages
@@ -0,0 +1,154 @@
+"""
+Webhook 模式
+
+内置 HTTP 服务接收 Telegram 推送的更新，校验 X-Telegram-Bot-Api-Secret-Token 后交给
+bot.process_new_updates。命令处理函数信任更新中的 chat.id，因此必须配置 WEBHOOK_SECRET，
+未配置时拒绝启动，缺少或不匹配请求头的请求一律返回 403。
+由 bot_commands 中注册的处理函数照常处理。相比长轮询没有
+轮询间隔带来的延迟，空闲时也不会反复请求 getUpdates。
+
+本地测试可以直接向服务 POST 更新 JSON（见 tools/post_update.py）。
+"""
+import hmac
+import ssl
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from telebot import types
+from modules import metrics
+from modules.bot import bot
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# 单个更新请求体的上限（字节）
+MAX_BODY_SIZE = 1 << 20
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    # 由 WebhookServer 设置
+    path_prefix = WEBHOOK_PATH
+    secret = WEBHOOK_SECRET
+
+    def do_POST(self):
+        if self.path.split("?")[0] != self.path_prefix:
+            return self.reject(404, "path")
+        token = self.headers.get(SECRET_HEADER, "").encode("utf-8", "surrogateescape")
+        if not self.secret or not hmac.compare_digest(token, self.secret.encode("utf-8")):
+            return self.reject(403, "forbidden")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_SIZE:
+            return self.reject(413 if length > 0 else 400, "invalid")
+
+        body = self.rfile.read(length)
+        try:
+            update = types.Update.de_json(body.decode("utf-8"))
+        except Exception as e:
+            logger.warning(f"无法解析 Webhook 更新: {e}")
+            return self.reject(400, "invalid")
+
+        # 先应答 Telegram，再处理更新，避免处理时间过长导致重发
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        self.wfile.flush()
+
+        start = time.perf_counter()
+        try:
+            bot.process_new_updates([update])
+            metrics.webhook_updates_total.inc(result="ok")
+        except Exception as e:
+            metrics.webhook_updates_total.inc(result="error")
+            logger.error(f"处理 Webhook 更新失败: {e}")
+        finally:
+            metrics.webhook_dispatch_seconds.observe(time.perf_counter() - start)
+
+    def do_GET(self):
+        self.reject(405, "method")
+
+    def reject(self, status, result):
+        metrics.webhook_updates_total.inc(result=result)
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+class WebhookServer:
+    """
+    接收 Telegram 更新的 HTTP 服务
+
+    参数:
+    - host/port: 监听地址
+    - path: 接收更新的路径
+    - secret: 校验请求头的密钥（必填）
+    - certfile/keyfile: 提供时直接以 HTTPS 监听
+    """
+    def __init__(self, host=WEBHOOK_LISTEN, port=WEBHOOK_PORT, path=WEBHOOK_PATH, secret=WEBHOOK_SECRET,
+                 certfile=WEBHOOK_SSL_CERT, keyfile=WEBHOOK_SSL_KEY):
+        check_secret(secret)
+        handler = type("Handler", (WebhookHandler,), {"path_prefix": path, "secret": secret})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.path = path
+        self.certfile = certfile
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        scheme = "https" if self.certfile else "http"
+        return f"{scheme}://{host}:{port}{self.path}"
+
+    def start(self):
+        """在后台线程中运行"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="webhook", daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def check_secret(secret=WEBHOOK_SECRET):
+    """没有密钥时任何人都可以伪造所有者的命令，拒绝启动"""
+    if not secret:
+        raise ValueError("USE_WEBHOOK 需要通过环境变量 WEBHOOK_SECRET 配置密钥")
+
+def register_webhook(url=WEBHOOK_URL, secret=WEBHOOK_SECRET, certfile=WEBHOOK_SSL_CERT):
+    """向 Telegram 注册 Webhook 地址"""
+    if not url:
+        raise ValueError("USE_WEBHOOK 需要配置 WEBHOOK_URL")
+    check_secret(secret)
+    certificate = open(certfile, "rb") if certfile else None
+    try:
+        bot.set_webhook(
+            url=url,
+            certificate=certificate,
+            secret_token=secret,
+            allowed_updates=['message', 'callback_query'],
+        )
+    finally:
+        if certificate is not None:
+            certificate.close()
+    logger.info(f"Webhook 已注册: {url}")
+
+def run_webhook():
+    """注册 Webhook 并在当前线程运行 HTTP 服务（代替 run_bot 的轮询）"""
+    server = WebhookServer()
+    register_webhook()
+    logger.info(f"Webhook 服务已启动: {server.url}")
+    try:
+        server.serve_forever()
+    finally:
+        server.httpd.server_close()
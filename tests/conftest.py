@@ -0,0 +1,40 @@
+"""
+测试公共配置
+
+测试不访问 Binance 和 Telegram：K线由 make_rows 生成，与 K线接口的行格式一致。
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+# 占位 Token 会在创建 TeleBot 时校验失败
+if ":" not in config.TELEGRAM_BOT_TOKEN:
+    config.TELEGRAM_BOT_TOKEN = "0:test"
+
+from modules.utils import interval_to_ms  # noqa: E402
+
+def make_rows(interval, count, last_open_ms, seed=0, price=100.0):
+    """
+    生成 count 根K线（REST 行格式），最后一根的开盘时间为 last_open_ms
+
+    价格按固定种子随机游走，保证每次运行结果相同
+    """
+    rng = random.Random(f"{seed}-{interval}")
+    step = interval_to_ms(interval)
+    rows = []
+    for i in range(count):
+        open_time = last_open_ms - (count - 1 - i) * step
+        open_price = price
+        price *= 1 + rng.gauss(0, 0.01)
+        high = max(open_price, price) * (1 + rng.random() * 0.005)
+        low = min(open_price, price) * (1 - rng.random() * 0.005)
+        rows.append([
+            open_time, f"{open_price:.8f}", f"{high:.8f}", f"{low:.8f}", f"{price:.8f}",
+            f"{rng.uniform(100, 10000):.8f}", open_time + step - 1,
+            "0", 100, "0", "0", "0"
+        ])
+    return rows
@@ -0,0 +1,20 @@
+"""
+Binance REST 客户端测试
+"""
+import pytest
+
+from modules.api import BinanceClient
+from modules.utils import TokenBucket
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "5"}, 5),
+    ({}, 60),
+    # 非整数的 Retry-After 按默认值暂停
+    ({"Retry-After": "1.5"}, 60),
+    ({"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}, 60),
+])
+def test_rate_limit_pauses_for_retry_after(headers, expected):
+    client = BinanceClient(base_url="http://127.0.0.1:1", limiter=TokenBucket(60, period=60))
+    client._handle_headers(429, {"X-MBX-USED-WEIGHT-1M": "not-a-number", **headers})
+    # 令牌桶每秒恢复 1 个令牌，需要等待的秒数即暂停时长
+    assert client.limiter.reserve(0) == pytest.approx(expected, abs=0.1)
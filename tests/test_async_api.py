@@ -0,0 +1,52 @@
+"""
+异步K线获取测试（使用本地的假 Binance 服务）
+"""
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+from modules import api, async_api
+from modules.kline_disk import DiskKlineCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from fake_binance import FakeBinanceServer  # noqa: E402
+
+class RecordingDisk(DiskKlineCache):
+    """记录读写磁盘所在的线程"""
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.threads = []
+
+    def load(self, symbol, interval, limit):
+        self.threads.append(threading.current_thread())
+        return super().load(symbol, interval, limit)
+
+    def write(self, symbol, interval, rows):
+        self.threads.append(threading.current_thread())
+        return super().write(symbol, interval, rows)
+
+@pytest.fixture
+def binance():
+    server = FakeBinanceServer(symbols=2).start()
+    yield server
+    server.stop()
+    api.kline_store.clear()
+
+def test_store_disk_access_runs_off_event_loop(binance, monkeypatch, tmp_path):
+    disk = RecordingDisk(str(tmp_path))
+    monkeypatch.setattr(api.kline_store, "disk", disk)
+
+    async def fetch():
+        async with async_api.AsyncBinanceClient(base_url=binance.url) as client:
+            loop_thread = threading.current_thread()
+            rows = await async_api.async_get_store_rows(client, "BTCUSDT", "1h", 50)
+            return loop_thread, rows
+
+    loop_thread, rows = asyncio.run(fetch())
+    assert len(rows) == 50
+    # plan() 读取磁盘、merge() 写入磁盘都不在事件循环线程中执行
+    assert len(disk.threads) == 2
+    assert loop_thread not in disk.threads
@@ -0,0 +1,31 @@
+"""
+回测特征测试
+"""
+import pytest
+
+from conftest import make_rows
+from modules import backtest
+from modules.api import parse_klines
+from modules.indicators import IndicatorContext
+from modules.signals import KLINE_INTERVALS
+
+HOUR_MS = 3_600_000
+
+def test_analysis_window_matches_live_closed_window():
+    # 实时分析去掉未收盘的一根
+    assert backtest.ANALYSIS_WINDOW == KLINE_INTERVALS["1h"] - 1
+
+def test_window_features_match_live_window():
+    last_open = 1_700_000_000_000 // HOUR_MS * HOUR_MS
+    df_1h = parse_klines(make_rows("1h", 300, last_open))
+    df_4h = parse_klines(make_rows("4h", 80, last_open - 3 * HOUR_MS))
+    df_1d = parse_klines(make_rows("1d", 20, last_open - 23 * HOUR_MS))
+    features = backtest.prepare_symbol(df_1h, df_4h, df_1d, horizon=1)
+
+    # 倒数第二根（最后一根保留给 horizon）对应的实时分析窗口
+    window = df_1h.iloc[-1 - backtest.ANALYSIS_WINDOW:-1].reset_index(drop=True)
+    ctx = IndicatorContext(window)
+    close = window["close"]
+    assert features["price"][-1] == close.iloc[-1]
+    assert features["price_change"][-1] == pytest.approx((close.iloc[-1] - close.iloc[0]) / close.iloc[0] * 100)
+    assert features["volatility"][-1] == pytest.approx(ctx.volatility())
@@ -0,0 +1,101 @@
+"""
+结果缓存测试
+"""
+from modules import cache as cache_module
+from modules.cache import ResultCache, cache_result
+from config import RESULT_CACHE_TTL
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2, ttl=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # 访问 a 后 b 成为最久未使用的条目
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+def test_version_change_invalidates():
+    versions = {"BTCUSDT": 1}
+    calls = []
+
+    @cache_result(version=lambda symbol: versions[symbol])
+    def analyze(symbol):
+        calls.append(symbol)
+        return {"symbol": symbol, "version": versions[symbol]}
+
+    first = analyze("BTCUSDT")
+    assert analyze("BTCUSDT") is first
+    versions["BTCUSDT"] = 2
+    assert analyze("BTCUSDT")["version"] == 2
+    assert calls == ["BTCUSDT", "BTCUSDT"]
+
+def test_ttl_only_without_version(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+
+    @cache_result()
+    def timed(x):
+        return object()
+
+    @cache_result(version=lambda x: 1)
+    def versioned(x):
+        return object()
+
+    assert timed.cache.ttl == RESULT_CACHE_TTL
+    assert versioned.cache.ttl is None
+    timed_value, versioned_value = timed(1), versioned(1)
+    clock.now += RESULT_CACHE_TTL - 1
+    assert timed(1) is timed_value
+    clock.now += 2
+    assert timed(1) is not timed_value
+    # 按版本缓存的结果不受时间影响
+    assert versioned(1) is versioned_value
+
+def test_none_is_not_cached():
+    calls = []
+
+    @cache_result(version=lambda x: 1)
+    def maybe(x):
+        calls.append(x)
+        return None
+
+    assert maybe(1) is None
+    assert maybe(1) is None
+    assert calls == [1, 1]
+    assert maybe.cache.stats()["size"] == 0
+
+def test_map_computes_misses_under_version_read_before_compute():
+    versions = {"A": 1, "B": 1, "C": 1}
+
+    @cache_result(version=lambda symbol: versions[symbol])
+    def analyze(symbol):
+        return {"symbol": symbol, "version": versions[symbol]}
+
+    cached = analyze("A")
+    computed = []
+
+    def compute(args_list):
+        computed.append(args_list)
+        # 计算期间 B 有新K线收盘
+        versions["B"] = 2
+        return [None if symbol == "C" else {"symbol": symbol} for symbol, in args_list]
+
+    results = analyze.map([("A",), ("B",), ("C",)], compute)
+    assert computed == [[("B",), ("C",)]]
+    assert results[0] is cached
+    assert results[1] == {"symbol": "B"}
+    assert results[2] is None
+    # B 按计算前读取的版本 1 缓存，新版本查询时重新计算；C 的 None 结果不缓存
+    assert analyze.cache.get(("B",), 1) == (True, {"symbol": "B"})
+    assert analyze.cache.get(("C",), 1) == (False, None)
+    assert analyze.map([("B",)], lambda args_list: [{"symbol": "B", "version": 2}]) == [{"symbol": "B", "version": 2}]
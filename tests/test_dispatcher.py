@@ -0,0 +1,108 @@
+"""
+Telegram 消息发送队列测试（使用假的 bot，不访问 Telegram）
+"""
+import threading
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+from modules.dispatcher import MAX_MESSAGE_LENGTH, ChatQueue, MessageDispatcher, OutgoingMessage
+from modules.utils import TokenBucket
+
+class FakeBot:
+    """记录发送的消息；failures 为 {文本: [依次抛出的异常]}"""
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.sent = []
+        self.attempts = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, **kwargs):
+        with self.lock:
+            self.attempts.append((time.monotonic(), chat_id, text))
+            errors = self.failures.get(text)
+            if errors:
+                raise errors.pop(0)
+            self.sent.append((chat_id, text))
+
+def rate_limited(retry_after):
+    return ApiTelegramException("sendMessage", None, {
+        "ok": False, "error_code": 429, "description": "Too Many Requests",
+        "parameters": {"retry_after": retry_after}
+    })
+
+def make_dispatcher(bot, coalesce_seconds=0.0, max_attempts=5):
+    return MessageDispatcher(bot, global_per_second=1000, chat_per_minute=60000, chat_burst=1000,
+                             coalesce_seconds=coalesce_seconds, max_attempts=max_attempts)
+
+def test_retry_after_requeues_at_head():
+    bot = FakeBot({"first": [rate_limited(0.3)]})
+    dispatcher = make_dispatcher(bot)
+    dispatcher.send(1, "first")
+    dispatcher.send(1, "second")
+    assert dispatcher.flush(5)
+    dispatcher.stop()
+
+    assert [text for _, _, text in bot.attempts] == ["first", "first", "second"]
+    assert bot.sent == [(1, "first"), (1, "second")]
+    # 按 retry_after 暂停后才重试
+    assert bot.attempts[1][0] - bot.attempts[0][0] >= 0.3
+
+def test_retry_delay_is_exponential_and_capped():
+    dispatcher = make_dispatcher(FakeBot({"x": [RuntimeError("network")] * 10}), max_attempts=20)
+    dispatcher.chats[1] = ChatQueue(TokenBucket(1000, 1))
+    item = OutgoingMessage(1, "x", {})
+    delays = []
+    for _ in range(8):
+        dispatcher.chats[1].ready_at = 0.0
+        now = time.monotonic()
+        dispatcher._deliver(1, item)
+        delays.append(round(dispatcher.chats[1].ready_at - now))
+        dispatcher.chats[1].messages.popleft()
+    assert delays == [2, 4, 8, 16, 32, 60, 60, 60]
+
+def test_gives_up_after_max_attempts():
+    bot = FakeBot({"x": [rate_limited(0)] * 10})
+    dispatcher = make_dispatcher(bot, max_attempts=3)
+    dispatcher.send(1, "x")
+    assert dispatcher.flush(5)
+    dispatcher.stop()
+    assert len(bot.attempts) == 3
+    assert bot.sent == []
+
+def test_coalesces_same_kind_within_limit():
+    bot = FakeBot()
+    dispatcher = make_dispatcher(bot, coalesce_seconds=0.3)
+    dispatcher.send(1, "a" * 2000, coalesce="signal")
+    dispatcher.send(1, "b" * 2000, coalesce="signal")
+    # 超过 4096 字符时另起一条
+    dispatcher.send(1, "c" * 100, coalesce="signal")
+    # 不同类的消息不合并
+    dispatcher.send(1, "error", coalesce="error")
+    dispatcher.send(1, "error 2", coalesce="error")
+    dispatcher.send(1, "d", coalesce="signal")
+    assert dispatcher.flush(5)
+    dispatcher.stop()
+
+    texts = [text for _, text in bot.sent]
+    assert texts == ["a" * 2000 + "\n\n" + "b" * 2000, "c" * 100, "error\n\nerror 2", "d"]
+    assert all(len(text) <= MAX_MESSAGE_LENGTH for text in texts)
+
+def test_per_chat_order_is_kept():
+    bot = FakeBot({"1-3": [rate_limited(0.2)], "2-1": [RuntimeError("network")]})
+    dispatcher = make_dispatcher(bot)
+    for i in range(6):
+        dispatcher.send(1, f"1-{i}")
+        dispatcher.send(2, f"2-{i}")
+    assert dispatcher.flush(10)
+    dispatcher.stop()
+
+    for chat_id in (1, 2):
+        assert [text for chat, text in bot.sent if chat == chat_id] == [f"{chat_id}-{i}" for i in range(6)]
+    # 一个聊天暂停时不阻塞其他聊天
+    first_attempt = {}
+    for t, chat, text in bot.attempts:
+        first_attempt.setdefault(text, t)
+    retried = [t for t, chat, text in bot.attempts if text == "1-3"][1]
+    assert first_attempt["2-0"] < retried
+    assert first_attempt["1-4"] < [t for t, chat, text in bot.attempts if text == "2-1"][1]
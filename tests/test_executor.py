@@ -0,0 +1,102 @@
+"""
+命令执行器测试（使用假的 bot，不访问 Telegram）
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modules import executor
+from modules.dispatcher import MessageDispatcher
+from modules.executor import CommandExecutor, percentile
+
+class StubBot:
+    """记录回复的文本"""
+    def __init__(self):
+        self.replies = []
+
+    def reply_to(self, message, text, **kwargs):
+        self.replies.append(text)
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.replies.append(text)
+
+@pytest.fixture
+def bot(monkeypatch):
+    bot = StubBot()
+    dispatcher = MessageDispatcher(bot, global_per_second=1000, chat_per_minute=60000, chat_burst=1000,
+                                   coalesce_seconds=0.0)
+    monkeypatch.setattr(executor, "dispatcher", dispatcher)
+    monkeypatch.setattr(executor, "is_authorized", lambda user_id: True)
+    bot.flush = lambda: dispatcher.flush(5)
+    yield bot
+    dispatcher.stop()
+
+def message(text="/m BTCUSDT"):
+    return SimpleNamespace(text=text, chat=SimpleNamespace(id=1))
+
+def blocking_command(release):
+    def m(message):
+        release.wait(5)
+    return m
+
+def test_rejects_when_queue_is_full(bot):
+    commands = CommandExecutor(workers=1, queue_limit=2, timeout=5)
+    release = threading.Event()
+    handler = commands.heavy()(blocking_command(release))
+    for _ in range(3):
+        handler(message())
+    release.set()
+    commands.pool.shutdown(wait=True)
+    assert bot.flush()
+
+    assert commands.counts["rejected"] == 1
+    assert bot.replies == ["⏳ 已加入队列，前面还有 1 个命令", "⏳ 机器人繁忙，请稍后再试"]
+    assert commands.stats()["m"]["count"] == 2
+
+def test_queued_notice_counts_commands_ahead(bot):
+    commands = CommandExecutor(workers=2, queue_limit=10, timeout=5)
+    release = threading.Event()
+    handler = commands.heavy()(blocking_command(release))
+    for _ in range(5):
+        handler(message())
+    release.set()
+    commands.pool.shutdown(wait=True)
+    assert bot.flush()
+
+    # 前两个命令直接执行，之后的按前面排队的数量提示
+    assert bot.replies == [f"⏳ 已加入队列，前面还有 {n} 个命令" for n in (1, 2, 3)]
+    assert commands.active == 0
+
+def test_timeout_notice(bot):
+    commands = CommandExecutor(workers=2, queue_limit=10, timeout=5)
+    release = threading.Event()
+    slow = commands.heavy(timeout=0.1)(blocking_command(release))
+    quick = commands.heavy(timeout=0.1)(lambda message: None)
+    slow(message("/risk"))
+    quick(message("/list"))
+    time.sleep(0.3)
+    release.set()
+    commands.pool.shutdown(wait=True)
+    assert bot.flush()
+
+    # 按时完成的命令不发送超时通知
+    assert bot.replies == ["⌛ /risk 处理超时，结果稍后发送"]
+    assert commands.counts["timeouts"] == 1
+
+def test_percentiles():
+    assert percentile([], 50) is None
+    assert percentile([1.0], 50) == percentile([1.0], 99) == 1.0
+    assert (percentile([1.0, 2.0], 50), percentile([1.0, 2.0], 99)) == (1.0, 2.0)
+
+    commands = CommandExecutor(workers=1, window=100)
+    # 超出窗口的旧样本被丢弃
+    for i in range(1, 151):
+        commands.record("m", "heavy", i / 100)
+    commands.pool.shutdown()
+    stats = commands.stats()["m"]
+    assert stats["count"] == 100
+    assert stats["p50"] == pytest.approx(1.0)
+    assert stats["p99"] == pytest.approx(1.49)
+    assert stats["max"] == pytest.approx(1.5)
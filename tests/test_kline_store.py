@@ -0,0 +1,59 @@
+"""
+K线增量存储测试
+"""
+import threading
+
+from conftest import make_rows
+from modules.kline_disk import DiskKlineCache
+from modules.kline_store import KlineStore
+
+LAST_OPEN_MS = 1_700_000_000_000 // 3_600_000 * 3_600_000
+
+class SlowDisk(DiskKlineCache):
+    """读取 BTCUSDT 时阻塞，直到测试放行"""
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def load(self, symbol, interval, limit):
+        if symbol == "BTCUSDT":
+            self.reading.set()
+            self.release.wait(5)
+        return super().load(symbol, interval, limit)
+
+def test_disk_read_does_not_hold_store_lock(tmp_path):
+    disk = SlowDisk(str(tmp_path))
+    rows = make_rows("1h", 50, LAST_OPEN_MS)
+    disk.write("BTCUSDT", "1h", rows)
+    store = KlineStore(fetch=lambda endpoint, params: [], disk=disk)
+
+    loader = threading.Thread(target=store.plan, args=("BTCUSDT", "1h", 50))
+    loader.start()
+    assert disk.reading.wait(5)
+    # 磁盘读取期间其他交易对的读写不被阻塞
+    assert store.plan("ETHUSDT", "1h", 50)[1] is True
+    assert store.cached_rows("ETHUSDT", "1h", 50) == []
+    assert loader.is_alive()
+    disk.release.set()
+    loader.join(5)
+
+    assert store.stats["disk_loads"] == 1
+    assert [int(row[0]) for row in store.cached_rows("BTCUSDT", "1h", 50)] == [int(row[0]) for row in rows]
+
+def test_disk_rows_are_dropped_when_buffer_filled_during_read(tmp_path):
+    disk = SlowDisk(str(tmp_path))
+    disk.write("BTCUSDT", "1h", make_rows("1h", 50, LAST_OPEN_MS - 3_600_000))
+    fresh = make_rows("1h", 50, LAST_OPEN_MS, seed=1)
+    store = KlineStore(fetch=lambda endpoint, params: fresh, disk=disk)
+
+    loader = threading.Thread(target=store.plan, args=("BTCUSDT", "1h", 50))
+    loader.start()
+    assert disk.reading.wait(5)
+    store.merge("BTCUSDT", "1h", 50, {"symbol": "BTCUSDT", "interval": "1h", "limit": 50}, True, fresh)
+    disk.release.set()
+    loader.join(5)
+
+    # 读取完成前缓冲区已经由请求结果填充，磁盘中较旧的K线不会覆盖它
+    assert store.stats["disk_loads"] == 0
+    assert store.cached_rows("BTCUSDT", "1h", 50) == fresh
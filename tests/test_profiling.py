@@ -0,0 +1,77 @@
+"""
+性能分析测试
+"""
+import os
+import pstats
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from modules import api, async_api, profiling, signals
+from modules.profiling import profile_call
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from fake_binance import FakeBinanceServer  # noqa: E402
+
+def pooled_work(n):
+    return sum(range(n))
+
+def test_profile_call_only_profiles_worker_pool():
+    other_profiled = []
+    stop = threading.Event()
+
+    def other_thread():
+        # 分析期间启动的无关线程不应被记录
+        other_profiled.append(sys.getprofile() is not None)
+        stop.wait(5)
+        other_profiled.append(sys.getprofile() is not None)
+
+    def cycle():
+        other = threading.Thread(target=other_thread, daemon=True)
+        other.start()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="bench-pool") as executor:
+            return other, list(executor.map(pooled_work, [1000, 2000]))
+
+    (other, result), stats, _, _, _ = profile_call(cycle, thread_prefix="bench-pool")
+    stop.set()
+    other.join(5)
+
+    assert result == [sum(range(1000)), sum(range(2000))]
+    assert other_profiled == [False, False]
+    assert any(name == "pooled_work" for _, _, name in stats.stats)
+
+@pytest.fixture
+def binance(monkeypatch, tmp_path):
+    server = FakeBinanceServer(symbols=8).start()
+    monkeypatch.setattr(api.binance_client, "base_url", server.url)
+    monkeypatch.setattr(async_api.AsyncBinanceClient.__init__, "__defaults__", (server.url, None, 100))
+    monkeypatch.setattr(api.kline_store, "disk", None)
+    monkeypatch.setattr(signals, "load_user_symbols", lambda: ["BTCUSDT", "ETHUSDT", "SOLUSDT"])
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    yield server
+    server.stop()
+    api.kline_store.clear()
+    signals.calculate_probability.cache.invalidate()
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_profile_cycle_uses_configured_pipeline_without_publishing(binance, monkeypatch, use_async):
+    alerts = []
+    monkeypatch.setattr(signals, "USE_ASYNC_PIPELINE", use_async)
+    monkeypatch.setattr(profiling, "USE_ASYNC_PIPELINE", use_async)
+    monkeypatch.setattr(signals, "send_critical_signals", alerts.append)
+    snapshot = signals.market_snapshots.latest
+    states = dict(signals.signal_states.states)
+
+    report_path, stats_path = profiling.profile_monitor_cycle()
+
+    with open(report_path, encoding="utf-8") as f:
+        report = f.read()
+    pipeline = "async_monitor_symbols" if use_async else "monitor_symbols"
+    assert report.startswith(f"{pipeline} (3 个交易对)")
+    # 异步流水线在工作线程中执行的批量分析也被记录
+    assert any(name == "analyze_batch" for _, _, name in pstats.Stats(stats_path).stats)
+    assert alerts == []
+    assert signals.market_snapshots.latest is snapshot
+    assert signals.signal_states.states == states
@@ -0,0 +1,64 @@
+"""
+信号状态表测试
+"""
+from modules.signal_state import BEARISH, BULLISH, NEUTRAL, SignalStateTable
+
+def result(symbol, up_probability, risk_level="medium"):
+    return {"symbol": symbol, "up_probability": up_probability, "risk_level": risk_level}
+
+def test_first_strong_signal_alerts_and_neutral_does_not():
+    table = SignalStateTable(change_threshold=15, strong_threshold=75)
+    transitions = table.update([result("BTCUSDT", 80), result("ETHUSDT", 50), result("SOLUSDT", 20)])
+    assert [(t["result"]["symbol"], t["direction"], t["previous_direction"]) for t in transitions] == [
+        ("BTCUSDT", BULLISH, None),
+        ("SOLUSDT", BEARISH, None),
+    ]
+    # 中性的交易对也会记录状态，之后的变化以它为基准
+    assert table.states["ETHUSDT"].direction == NEUTRAL
+
+def test_bullish_to_bearish_flip():
+    table = SignalStateTable(change_threshold=15, strong_threshold=75)
+    first = result("BTCUSDT", 80)
+    table.update([first])
+    transitions = table.update([result("BTCUSDT", 20)])
+    assert len(transitions) == 1
+    transition = transitions[0]
+    assert transition["previous"] is first
+    assert (transition["previous_direction"], transition["direction"]) == (BULLISH, BEARISH)
+    assert transition["reasons"][0] == f"{BULLISH} → {BEARISH}"
+
+def test_probability_change_threshold():
+    table = SignalStateTable(change_threshold=15, strong_threshold=75)
+    table.update([result("BTCUSDT", 50)])
+    # 变化小于阈值不提醒，基准保持为上次提醒时的结果
+    assert table.update([result("BTCUSDT", 60)]) == []
+    transitions = table.update([result("BTCUSDT", 65)])
+    assert len(transitions) == 1
+    assert transitions[0]["direction"] == NEUTRAL
+    assert transitions[0]["reasons"] == ["上涨概率 50.0% → 65.0% (+15.0)"]
+    # 提醒后以新结果为基准
+    assert table.update([result("BTCUSDT", 70)]) == []
+
+def test_risk_level_change_only_alerts_on_strong_signal():
+    table = SignalStateTable(change_threshold=15, strong_threshold=75)
+    table.update([result("BTCUSDT", 80, "low"), result("ETHUSDT", 50, "low")])
+    transitions = table.update([result("BTCUSDT", 82, "high"), result("ETHUSDT", 52, "high")])
+    assert [t["result"]["symbol"] for t in transitions] == ["BTCUSDT"]
+    assert transitions[0]["reasons"] == ["风险等级 low → high"]
+
+def test_same_result_object_is_skipped():
+    table = SignalStateTable(change_threshold=15, strong_threshold=75)
+    cached = result("BTCUSDT", 80)
+    assert len(table.update([cached])) == 1
+    assert table.update([cached]) == []
+    assert table.stats["unchanged"] == 1
+    assert table.stats["checked"] == 1
+
+def test_removed_symbols_are_pruned():
+    table = SignalStateTable(change_threshold=15, strong_threshold=75)
+    table.update([result("BTCUSDT", 80), result("ETHUSDT", 80)])
+    table.update([result("BTCUSDT", 81)], symbols=["BTCUSDT"])
+    assert set(table.states) == {"BTCUSDT"}
+    # 重新加入后按首次观察处理
+    transitions = table.update([result("ETHUSDT", 80)], symbols=["BTCUSDT", "ETHUSDT"])
+    assert [t["previous"] for t in transitions] == [None]
@@ -0,0 +1,96 @@
+"""
+signals 分析流程测试
+"""
+import pytest
+
+from conftest import make_rows
+from modules.api import parse_klines
+from modules.kline_store import KlineStore
+from modules.signals import KLINE_INTERVALS, analyze_batch, analyze_frames, closed_candles
+from modules.utils import interval_to_ms
+
+# 2023-11-15 00:00:00 UTC，1h/4h/1d 同时收盘
+CLOSE_MS = 1_700_006_400_000
+SETTLE_MS = 3_000
+
+def make_frames(seed, last_open):
+    """各分析周期的K线，最后一根在 last_open[interval] 开盘"""
+    return {
+        interval: parse_klines(make_rows(interval, limit, last_open[interval], seed))
+        for interval, limit in KLINE_INTERVALS.items()
+    }
+
+def open_times(now_ms):
+    """now_ms 时刻各周期正在形成的K线的开盘时间"""
+    return {interval: now_ms // interval_to_ms(interval) * interval_to_ms(interval) for interval in KLINE_INTERVALS}
+
+def test_closed_candles_drops_open_candle():
+    df = parse_klines(make_rows("1h", 5, CLOSE_MS))
+    closed = closed_candles(df, CLOSE_MS + SETTLE_MS)
+    assert len(closed) == 4
+    assert closed['close_time'].iloc[-1] == CLOSE_MS - 1
+    # 恰好在收盘时刻，刚收盘的K线保留
+    assert len(closed_candles(df.iloc[:4], CLOSE_MS)) == 4
+
+def test_run_after_close_scores_closed_candle():
+    now_ms = CLOSE_MS + SETTLE_MS
+    frames = make_frames(1, open_times(now_ms))
+    # 刚开盘的K线价格大幅跳动，不应影响分析结果
+    spiked = {interval: df.copy() for interval, df in frames.items()}
+    for df in spiked.values():
+        df.loc[df.index[-1], ['high', 'close']] = df['close'].iloc[-2] * 3
+
+    result = analyze_frames("TESTUSDT", spiked["1h"], spiked["4h"], spiked["1d"], now_ms=now_ms)
+    closed = {interval: df.iloc[:-1] for interval, df in frames.items()}
+    expected = analyze_frames("TESTUSDT", closed["1h"], closed["4h"], closed["1d"], now_ms=now_ms)
+
+    assert result["price"] == frames["1h"]['close'].iloc[-2]
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert result[key] == pytest.approx(value, nan_ok=True), key
+        else:
+            assert result[key] == value, key
+
+def test_store_refetches_candle_that_closed_since_fetch(monkeypatch):
+    requests = []
+    rows = make_rows("4h", 60, CLOSE_MS)  # 最后一根 00:00 开盘，03:59:59.999 收盘
+
+    def fetch(endpoint, params):
+        requests.append(params)
+        return rows if "startTime" not in params else [row for row in rows if row[0] >= params["startTime"]]
+
+    store = KlineStore(fetch=fetch)
+    monkeypatch.setattr("modules.kline_store.time.time", lambda: (CLOSE_MS + SETTLE_MS) / 1000)
+    assert len(store.get_rows("TESTUSDT", "4h", 50, refresh=False)) == 50
+    assert len(store.get_rows("TESTUSDT", "4h", 50, refresh=False)) == 50
+    assert len(requests) == 1  # 最后一根仍未收盘，直接使用缓存
+
+    # 4h K线收盘后，即使 refresh=False 也从最后一根开始重新拉取
+    monkeypatch.setattr("modules.kline_store.time.time", lambda: (CLOSE_MS + 4 * 3_600_000 + SETTLE_MS) / 1000)
+    store.get_rows("TESTUSDT", "4h", 50, refresh=False)
+    assert len(requests) == 2
+    assert requests[-1]["startTime"] == rows[-1][0]
+
+def test_batch_matches_analyze_frames():
+    now_ms = CLOSE_MS + SETTLE_MS
+    symbols = [f"S{i}USDT" for i in range(6)]
+    frames = {symbol: make_frames(i, open_times(now_ms)) for i, symbol in enumerate(symbols)}
+    # 较短的K线窗口（新上线的交易对）在批量计算中前部补 NaN
+    frames[symbols[1]] = {interval: df.iloc[-40:] for interval, df in frames[symbols[1]].items()}
+    frames[symbols[2]] = None
+
+    batch = analyze_batch(symbols, frames, now_ms=now_ms)
+    assert batch[2] is None
+    for symbol, result in zip(symbols, batch):
+        if frames[symbol] is None:
+            continue
+        f = frames[symbol]
+        expected = analyze_frames(symbol, f["1h"], f["4h"], f["1d"], now_ms=now_ms)
+        assert result.keys() == expected.keys()
+        for key, value in expected.items():
+            if key == "rr_info":
+                assert result[key] == pytest.approx(value), symbol
+            elif isinstance(value, str):
+                assert result[key] == value, (symbol, key)
+            else:
+                assert result[key] == pytest.approx(value, rel=1e-9, abs=1e-9), (symbol, key)
@@ -0,0 +1,70 @@
+"""
+市场快照测试
+"""
+import threading
+import time
+
+from modules.snapshot import SnapshotStore
+
+def results(*probabilities):
+    return [{"symbol": f"S{i}USDT", "up_probability": p} for i, p in enumerate(probabilities)]
+
+def test_concurrent_get_on_stale_snapshot_computes_once():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(threading.current_thread())
+        started.set()
+        release.wait(5)
+        return results(40, 80)
+
+    store = SnapshotStore(compute, max_age=60)
+    store.publish(results(50))
+    # 让已有快照过期
+    store.max_age = 0
+
+    snapshots = []
+    def get():
+        snapshots.append(store.get())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # 等其他请求都加入正在进行的计算
+    deadline = time.monotonic() + 5
+    while store.stats["joined"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert store.stats == {"computed": 1, "joined": 7, "reused": 0}
+    assert len(snapshots) == 8 and all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert snapshots[0].version == 2
+    assert [r["up_probability"] for r in snapshots[0].results] == [80, 40]
+
+def test_render_is_cached_per_version():
+    store = SnapshotStore(lambda: None, max_age=60)
+    renders = []
+
+    def renderer(snapshot):
+        renders.append(snapshot.version)
+        return f"v{snapshot.version}"
+
+    first = store.publish(results(50))
+    assert store.render(first, renderer) == "v1"
+    assert store.render(first, renderer) == "v1"
+    assert renders == [1]
+
+    # 新快照发布后重新渲染，旧版本的结果不再缓存
+    second = store.publish(results(60))
+    assert store.render(second, renderer) == "v2"
+    assert store.render(first, renderer) == "v1"
+    assert store.render(first, renderer) == "v1"
+    assert renders == [1, 2, 1, 1]
+    assert list(store.rendered) == [2]
@@ -0,0 +1,156 @@
+"""
+K线推送测试（使用 tools/fake_stream.py 模拟组合流）
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import make_rows
+from modules.api import parse_klines
+from modules.indicators import calculate_macd, calculate_rsi
+from modules.kline_store import KlineStore
+from modules.scheduler import CandleScheduler
+from modules.stream import KlineStream
+from modules.utils import interval_to_ms
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from fake_stream import FakeStreamServer  # noqa: E402
+
+pytest.importorskip("websocket")
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+INTERVAL = "1h"
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+@pytest.fixture
+def server():
+    server = FakeStreamServer().start()
+    yield server
+    server.stop()
+
+def test_pushes_during_backfill_are_replayed(server):
+    step = interval_to_ms(INTERVAL)
+    last_open = int(time.time() * 1000) // step * step
+    history = {symbol: make_rows(INTERVAL, 10, last_open, seed=i) for i, symbol in enumerate(SYMBOLS)}
+    release = threading.Event()
+
+    def fetch(endpoint, params):
+        # 补齐请求阻塞到推送到达之后
+        release.wait(5)
+        return history[params["symbol"]]
+
+    store = KlineStore(fetch=fetch)
+    closes = []
+    stream = KlineStream(store=store, url=server.url, on_interval_closed=lambda *args: closes.append(args))
+    stream.set_symbols(SYMBOLS, {INTERVAL: 10})
+    stream.start()
+    try:
+        wait_until(lambda: len(server.subscriptions()) == len(SYMBOLS))
+        # 补齐期间当前K线先更新再收盘，随后下一根K线开盘
+        pushed = {}
+        for symbol in SYMBOLS:
+            update = list(history[symbol][-1])
+            update[4] = "123.0"
+            final = list(update)
+            final[4] = "124.0"
+            following = make_rows(INTERVAL, 1, last_open + step, price=124.0)[0]
+            server.push_kline(symbol, INTERVAL, update)
+            server.push_kline(symbol, INTERVAL, final, closed=True)
+            server.push_kline(symbol, INTERVAL, following)
+            pushed[symbol] = (final, following)
+        wait_until(lambda: all(len(stream.pending.get((symbol, INTERVAL), [])) == 3 for symbol in SYMBOLS))
+        assert store.live == set()
+
+        release.set()
+        wait_until(lambda: len(store.live) == len(SYMBOLS))
+        for symbol, (final, following) in pushed.items():
+            rows = store.cached_rows(symbol, INTERVAL, 10)
+            assert rows[-2] == final
+            assert rows[-1] == following
+        # 两个交易对都收盘后回调一次
+        assert closes == [(INTERVAL, last_open + step)]
+    finally:
+        stream.stop()
+
+def test_close_callback_waits_for_all_symbols(server):
+    step = interval_to_ms(INTERVAL)
+    last_open = int(time.time() * 1000) // step * step
+    history = {symbol: make_rows(INTERVAL, 10, last_open, seed=i) for i, symbol in enumerate(SYMBOLS)}
+    store = KlineStore(fetch=lambda endpoint, params: history[params["symbol"]])
+    closes = []
+    stream = KlineStream(store=store, url=server.url, on_interval_closed=lambda *args: closes.append(args))
+    stream.set_symbols(SYMBOLS, {INTERVAL: 10})
+    stream.start()
+    try:
+        wait_until(lambda: len(store.live) == len(SYMBOLS))
+        first, second = SYMBOLS
+        server.push_kline(first, INTERVAL, history[first][-1], closed=True)
+        wait_until(lambda: store.buffers[(first, INTERVAL)].is_final())
+        assert closes == []
+        # 收盘后新K线的推送不影响计数
+        server.push_kline(first, INTERVAL, make_rows(INTERVAL, 1, last_open + step)[0])
+        server.push_kline(second, INTERVAL, history[second][-1], closed=True)
+        wait_until(lambda: closes)
+        assert closes == [(INTERVAL, last_open + step)]
+        # 收盘确认后缓存视为最新，收盘任务不再请求
+        assert store.plan(second, INTERVAL, 10)[0] is None
+    finally:
+        stream.stop()
+
+def test_live_indicators_follow_pushes(server):
+    step = interval_to_ms(INTERVAL)
+    last_open = int(time.time() * 1000) // step * step
+    rows = make_rows(INTERVAL, 60, last_open + step)
+    history = rows[:-1]
+    store = KlineStore(fetch=lambda endpoint, params: history)
+    stream = KlineStream(store=store, url=server.url)
+    stream.set_symbols(SYMBOLS[:1], {INTERVAL: 59})
+    stream.start()
+    try:
+        symbol = SYMBOLS[0]
+        wait_until(lambda: stream.live_indicators(symbol, INTERVAL) is not None)
+        # 未收盘K线修正后收盘，随后新K线开盘
+        update = list(history[-1])
+        update[4] = f"{float(update[4]) * 1.01:.8f}"
+        server.push_kline(symbol, INTERVAL, update)
+        server.push_kline(symbol, INTERVAL, history[-1], closed=True)
+        server.push_kline(symbol, INTERVAL, rows[-1])
+        wait_until(lambda: stream.live_indicators(symbol, INTERVAL)["open_time"] == last_open + step)
+
+        live = stream.live_indicators(symbol, INTERVAL)
+        df = parse_klines(rows)
+        assert live["price"] == pytest.approx(float(df['close'].iloc[-1]))
+        assert live["rsi"] == pytest.approx(float(calculate_rsi(df).iloc[-1]))
+        assert live["macd_histogram"] == pytest.approx(float(calculate_macd(df)[2].iloc[-1]))
+    finally:
+        stream.stop()
+
+def test_scheduler_trigger_runs_close_once():
+    ran = []
+    done = threading.Event()
+
+    def job(closed):
+        ran.append(closed)
+        done.set()
+
+    scheduler = CandleScheduler(job, intervals=["15m", "1h", "4h"])
+    close_ms = 1_700_006_400_000  # 1h/4h 同时收盘
+    scheduler.trigger("1h", close_ms)
+    assert done.wait(5)
+    wait_until(lambda: not scheduler.running.locked())
+    # 同一收盘时刻的其他周期推送和定时唤醒都不再执行
+    scheduler.trigger("4h", close_ms)
+    assert not scheduler._claim(close_ms)
+    # 没有关注的周期不触发
+    scheduler.trigger("1d", close_ms + interval_to_ms("1d"))
+    time.sleep(0.1)
+    assert ran == [["15m", "1h", "4h"]]
@@ -0,0 +1,74 @@
+"""
+增量指标与 modules/indicators 的 pandas 实现对比
+"""
+import pytest
+
+from conftest import make_rows
+from modules.api import parse_klines
+from modules.indicators import (
+    calculate_atr, calculate_bollinger_bands, calculate_ema, calculate_macd, calculate_rsi
+)
+from modules.streaming_indicators import IndicatorSet
+from config import EMA_LONG, EMA_SHORT
+
+LAST_OPEN = 1_700_002_800_000
+
+def expected(df):
+    """pandas 实现在最后一根K线上的值"""
+    macd_line, signal_line, histogram = calculate_macd(df)
+    middle_band, upper_band, lower_band = calculate_bollinger_bands(df)
+    values = {
+        "price": df['close'],
+        "rsi": calculate_rsi(df),
+        "macd_line": macd_line,
+        "signal_line": signal_line,
+        "macd_histogram": histogram,
+        "bb_middle": middle_band,
+        "bb_upper": upper_band,
+        "bb_lower": lower_band,
+        "ema_short": calculate_ema(df, EMA_SHORT),
+        "ema_long": calculate_ema(df, EMA_LONG),
+        "atr": calculate_atr(df),
+    }
+    return {name: float(series.iloc[-1]) for name, series in values.items()}
+
+def assert_matches(indicators, df):
+    snapshot = indicators.snapshot()
+    for name, value in expected(df).items():
+        assert snapshot[name] == pytest.approx(value, rel=1e-9, abs=1e-9, nan_ok=True), name
+
+def candle(df, i):
+    return float(df['high'].iloc[i]), float(df['low'].iloc[i]), float(df['close'].iloc[i])
+
+@pytest.mark.parametrize("seed", range(5))
+def test_from_frame_matches_pandas(seed):
+    df = parse_klines(make_rows("1h", 100, LAST_OPEN, seed))
+    assert_matches(IndicatorSet.from_frame(df), df)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_push_matches_pandas(seed):
+    df = parse_klines(make_rows("1h", 120, LAST_OPEN, seed))
+    indicators = IndicatorSet.from_frame(df.iloc[:100])
+    for i in range(100, len(df)):
+        indicators.push(*candle(df, i))
+        assert_matches(indicators, df.iloc[:i + 1])
+
+@pytest.mark.parametrize("seed", range(5))
+def test_replace_last_matches_pandas(seed):
+    df = parse_klines(make_rows("1h", 120, LAST_OPEN, seed))
+    indicators = IndicatorSet.from_frame(df.iloc[:100])
+    for i in range(100, len(df)):
+        high, low, close = candle(df, i)
+        # 未收盘K线先以开盘价推入，再多次修正到最终价格
+        open_price = float(df['open'].iloc[i])
+        indicators.push(open_price, open_price, open_price)
+        indicators.replace_last(high * 1.01, low * 0.99, close * 1.005)
+        indicators.replace_last(high, low, close)
+        assert_matches(indicators, df.iloc[:i + 1])
+
+def test_short_history_matches_pandas():
+    # 窗口不足时与 pandas 一样返回 NaN
+    df = parse_klines(make_rows("1h", 10, LAST_OPEN))
+    indicators = IndicatorSet.from_frame(df.iloc[:9])
+    indicators.push(*candle(df, 9))
+    assert_matches(indicators, df)
@@ -0,0 +1,76 @@
+"""
+交易对索引测试（使用固定的 exchangeInfo，不访问 Binance）
+"""
+import pytest
+
+from conftest import make_rows
+from modules import bot_commands
+from modules.api import parse_klines
+from modules.symbols import SymbolIndex
+
+def pair(symbol, base, quote, status="TRADING"):
+    return {"symbol": symbol, "baseAsset": base, "quoteAsset": quote, "status": status}
+
+EXCHANGE_INFO = {"symbols": [
+    pair("BTCUSDT", "BTC", "USDT"),
+    pair("BTCFDUSD", "BTC", "FDUSD"),
+    pair("BTCUSDC", "BTC", "USDC"),
+    pair("ETHBTC", "ETH", "BTC"),
+    pair("ETHUSDC", "ETH", "USDC"),
+    pair("DOGEUSDT", "DOGE", "USDT"),
+    pair("DOGEBTC", "DOGE", "BTC"),
+    pair("DOTUSDT", "DOT", "USDT"),
+    pair("XYZTRY", "XYZ", "TRY"),
+    pair("XYZEUR", "XYZ", "EUR"),
+    pair("LUNAUSDT", "LUNA", "USDT", status="BREAK"),
+]}
+
+@pytest.fixture
+def index():
+    index = SymbolIndex(fetch=lambda endpoint, params=None: EXCHANGE_INFO)
+    assert index.ensure_loaded()
+    return index
+
+def test_resolve_follows_quote_asset_order(index):
+    assert index.resolve("btc") == "BTCUSDT"
+    assert index.resolve("BTC/FDUSD") == "BTCFDUSD"
+    assert index.resolve(" eth-btc ") == "ETHBTC"
+    # 没有 USDT、FDUSD 交易对时选择下一个计价货币
+    assert index.resolve("ETH") == "ETHUSDC"
+    # 计价货币都不在列表中时按字母顺序选择
+    assert index.resolve("XYZ") == "XYZEUR"
+    # 非交易状态的交易对不在索引中
+    assert index.resolve("LUNA") is None
+
+def test_suggest_prefix_matches(index):
+    assert index.suggest("do") == ["DOGEUSDT", "DOGEBTC", "DOTUSDT"]
+    # 前缀匹配排在前面，不足 limit 条时再补充模糊匹配（BTC → BTCUSDT）
+    assert index.suggest("btcf") == ["BTCFDUSD", "BTCUSDT"]
+    assert index.suggest("do", limit=2) == ["DOGEUSDT", "DOGEBTC"]
+
+def test_suggest_falls_back_to_difflib(index):
+    assert index.resolve("BTCUSTD") is None
+    assert index.suggest("BTCUSTD")[0] == "BTCUSDT"
+    assert index.suggest("DOGGE") == ["DOGEUSDT"]
+    assert index.suggest("QQQQ") == []
+
+def test_resolve_symbol_uses_index(index, monkeypatch):
+    monkeypatch.setattr(bot_commands, "symbol_index", index)
+    assert bot_commands.resolve_symbol("eth") == ("ETHUSDC", None)
+    symbol, error = bot_commands.resolve_symbol("dogge")
+    assert symbol is None
+    assert error == "❌ 找不到交易对 DOGGE\n你是不是要找: DOGEUSDT"
+
+def test_resolve_symbol_falls_back_to_legacy_rule(monkeypatch):
+    # exchangeInfo 加载失败时按旧规则补 USDT 后缀，并通过K线验证
+    monkeypatch.setattr(bot_commands, "symbol_index", SymbolIndex(fetch=lambda endpoint, params=None: None))
+    requested = []
+
+    def get_klines(symbol, interval="15m", limit=100, refresh=True):
+        requested.append(symbol)
+        return parse_klines(make_rows(interval, limit, 1_700_000_000_000)) if symbol == "ETHUSDT" else None
+
+    monkeypatch.setattr(bot_commands, "get_klines", get_klines)
+    assert bot_commands.resolve_symbol("eth") == ("ETHUSDT", None)
+    assert bot_commands.resolve_symbol("foo/usdt") == (None, "❌ 交易对 FOOUSDT 不存在或无法获取数据")
+    assert requested == ["ETHUSDT", "FOOUSDT"]
@@ -0,0 +1,57 @@
+"""
+Webhook 密钥校验测试
+"""
+import os
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from modules import webhook
+
+UPDATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "updates", "market.json")
+SECRET = "test-secret"
+
+@pytest.fixture
+def server(monkeypatch):
+    processed = []
+    monkeypatch.setattr(webhook.bot, "process_new_updates", processed.extend)
+    server = webhook.WebhookServer(host="127.0.0.1", port=0, path="/telegram", secret=SECRET).start()
+    server.processed = processed
+    yield server
+    server.stop()
+
+def post(url, secret=None):
+    with open(UPDATE_PATH, "rb") as f:
+        body = f.read()
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    if secret is not None:
+        request.add_header(webhook.SECRET_HEADER, secret)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_wrong_secret_is_rejected(server):
+    assert post(server.url, "wrong-secret") == 403
+    assert server.processed == []
+
+def test_missing_secret_is_rejected(server):
+    assert post(server.url) == 403
+    assert server.processed == []
+
+def test_matching_secret_is_processed(server):
+    assert post(server.url, SECRET) == 200
+    # 先应答再处理更新
+    deadline = time.monotonic() + 5
+    while not server.processed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [update.message.text for update in server.processed] == ["/m"]
+
+def test_refuses_to_start_without_secret():
+    with pytest.raises(ValueError):
+        webhook.WebhookServer(host="127.0.0.1", port=0, secret="")
+    with pytest.raises(ValueError):
+        webhook.register_webhook(url="https://example.com/telegram", secret="")
@@ -0,0 +1,386 @@
+"""
+本地模拟 Binance REST 服务器（仅用于本地测试和压测）
+
+支持 /api/v3/klines、/api/v3/ticker/price、/api/v3/ticker/24hr 和 /api/v3/exchangeInfo。
+K线由 (交易对, 周期, 开盘时间) 确定性生成，也可以回放本地K线文件；
+可以配置响应延迟分布、429/5xx 错误注入，每个响应都带 X-MBX-USED-WEIGHT-1M 头，
+超过每分钟权重上限时返回 429 和 Retry-After。
+
+独立运行:
+    python tools/fake_binance.py --port 8081 --symbols 500 --latency lognormal:80,0.5 --error-429 0.01 --error-5xx 0.02
+    然后设置环境变量 BINANCE_API_URL=http://127.0.0.1:8081/api/v3 启动机器人
+
+压测一次监控周期（启动服务器并对全部交易对运行 monitor_symbols）:
+    python tools/fake_binance.py --symbols 500 --latency uniform:20,200 --monitor
+
+在代码中使用:
+    server = FakeBinanceServer(symbols=500, latency="fixed:50").start()
+    url = server.url
+    server.stats
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "1w": 604_800_000,
+}
+
+# 与 modules/api.estimate_weight 相同的权重
+def request_weight(path, params):
+    if path == "ticker/price":
+        return 2 if "symbol" in params else 4
+    if path == "ticker/24hr":
+        return 2 if "symbol" in params else 80
+    return {"klines": 2, "exchangeInfo": 20}.get(path, 1)
+
+def parse_latency(spec):
+    """
+    解析延迟分布（毫秒），返回采样函数
+
+    - fixed:50
+    - uniform:20,200
+    - lognormal:80,0.5  （中位数, sigma）
+    - exp:100           （均值）
+    """
+    if not spec:
+        return lambda: 0.0
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0])
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+def _noise(*key):
+    """由 key 确定的 [-1, 1) 伪随机数"""
+    return zlib.crc32(repr(key).encode()) / 2 ** 31 - 1
+
+def synthetic_price(symbol, t_ms):
+    """交易对在某一时刻的确定性模拟价格（多个周期正弦叠加噪声）"""
+    base = 10 ** (1 + 3 * (zlib.crc32(symbol.encode()) % 1000) / 1000)
+    hours = t_ms / 3_600_000
+    phase = zlib.crc32(symbol.encode()) % 360
+    return base * math.exp(
+        0.15 * math.sin((hours + phase) / 240) +
+        0.05 * math.sin((hours + phase) / 31) +
+        0.01 * math.sin(hours * 1.3 + phase)
+    )
+
+def synthetic_kline(symbol, interval, open_time, now_ms):
+    step = INTERVAL_MS[interval]
+    close_time = open_time + step - 1
+    open_price = synthetic_price(symbol, open_time)
+    close_price = synthetic_price(symbol, min(close_time, now_ms))
+    spread = abs(_noise(symbol, interval, open_time)) * 0.01
+    high = max(open_price, close_price) * (1 + spread)
+    low = min(open_price, close_price) * (1 - spread)
+    volume = 1000 * (1 + _noise(symbol, open_time, "v"))
+    return [
+        open_time, f"{open_price:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close_price:.8f}",
+        f"{volume:.8f}", close_time, f"{volume * close_price:.8f}", 100,
+        f"{volume / 2:.8f}", f"{volume * close_price / 2:.8f}", "0"
+    ]
+
+def load_replay(directory):
+    """读取 {symbol}_{interval}.json 回放文件"""
+    replay = {}
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            symbol, _, interval = name[:-5].rpartition("_")
+            with open(os.path.join(directory, name)) as f:
+                replay[(symbol, interval)] = json.load(f)
+    return replay
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.owner
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path.removeprefix("/api/v3/")
+
+        if url.path == "/stats":
+            return self._send(200, server.stats)
+
+        delay = server.latency()
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        status, payload, headers = server.handle(path, params)
+        self._send(status, payload, headers)
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # 异步并发请求较多时避免连接被拒绝
+
+class FakeBinanceServer:
+    """
+    模拟 Binance REST 服务器
+
+    参数:
+    - symbols: 交易对数量（在常见交易对之后生成 SYM0000USDT 等）或交易对列表
+    - latency: 延迟分布，格式见 parse_latency
+    - error_429 / error_5xx: 随机返回 429 / 5xx 的概率
+    - weight_limit: 每分钟权重上限，超过后返回 429
+    - replay: 回放K线文件目录（{symbol}_{interval}.json）
+    """
+    COMMON_SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "DOGEUSDT", "KAITOUSDT", "XRPUSDT", "ADAUSDT"]
+
+    def __init__(self, host="127.0.0.1", port=0, symbols=50, latency=None,
+                 error_429=0.0, error_5xx=0.0, weight_limit=1200, replay=None, seed=None):
+        if isinstance(symbols, int):
+            generated = [f"SYM{i:04d}USDT" for i in range(max(0, symbols - len(self.COMMON_SYMBOLS)))]
+            symbols = self.COMMON_SYMBOLS[:symbols] + generated
+        self.symbols = list(symbols)
+        self.latency = parse_latency(latency)
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.weight_limit = weight_limit
+        self.replay = load_replay(replay) if replay else {}
+        self.symbols += sorted({symbol for symbol, _ in self.replay} - set(self.symbols))
+        self.symbol_set = set(self.symbols)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = 0
+        self.used_weight = 0
+        self.counters = {"requests": 0, "ok": 0, "injected_429": 0, "rate_limited_429": 0, "injected_5xx": 0, "bad_request": 0}
+        self.httpd = Server((host, port), Handler)
+        self.httpd.owner = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v3"
+
+    @property
+    def stats(self):
+        with self.lock:
+            return {**self.counters, "used_weight_1m": self.used_weight}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, key):
+        with self.lock:
+            self.counters[key] += 1
+
+    def _use_weight(self, weight):
+        """按自然分钟累计权重，返回 (累计权重, 是否超限, 距下一分钟的秒数)"""
+        now = time.time()
+        with self.lock:
+            self.counters["requests"] += 1
+            window = int(now // 60)
+            if window != self.window:
+                self.window = window
+                self.used_weight = 0
+            self.used_weight += weight
+            return self.used_weight, self.used_weight > self.weight_limit, 60 - int(now % 60)
+
+    def handle(self, path, params):
+        """返回 (状态码, JSON 内容, 额外响应头)"""
+        used, limited, retry_after = self._use_weight(request_weight(path, params))
+        headers = {"X-MBX-USED-WEIGHT-1M": used}
+
+        if limited:
+            self._count("rate_limited_429")
+            headers["Retry-After"] = retry_after
+            return 429, {"code": -1003, "msg": "Too many requests."}, headers
+        roll = self.random.random()
+        if roll < self.error_429:
+            self._count("injected_429")
+            headers["Retry-After"] = 1
+            return 429, {"code": -1003, "msg": "Too many requests."}, headers
+        if roll < self.error_429 + self.error_5xx:
+            self._count("injected_5xx")
+            return self.random.choice([500, 502, 503, 504]), {"code": -1000, "msg": "Internal error."}, headers
+
+        handler = {
+            "klines": self.klines,
+            "ticker/price": self.ticker_price,
+            "ticker/24hr": self.ticker_24hr,
+            "exchangeInfo": self.exchange_info,
+        }.get(path)
+        if handler is None:
+            self._count("bad_request")
+            return 404, {"code": -1, "msg": f"Unknown endpoint {path}"}, headers
+        try:
+            payload = handler(params)
+        except ValueError as e:
+            self._count("bad_request")
+            code, _, msg = str(e).partition(":")
+            return 400, {"code": int(code), "msg": msg}, headers
+        self._count("ok")
+        return 200, payload, headers
+
+    def _symbol(self, params):
+        symbol = params.get("symbol")
+        if symbol not in self.symbol_set:
+            raise ValueError("-1121:Invalid symbol.")
+        return symbol
+
+    def klines(self, params):
+        symbol = self._symbol(params)
+        interval = params.get("interval")
+        if interval not in INTERVAL_MS:
+            raise ValueError("-1120:Invalid interval.")
+        limit = min(int(params.get("limit", 500)), 1000)
+        start_time = params.get("startTime")
+        end_time = params.get("endTime")
+
+        if (symbol, interval) in self.replay:
+            rows = self.replay[(symbol, interval)]
+            if start_time is not None:
+                rows = [row for row in rows if row[0] >= int(start_time)]
+                return rows[:limit]
+            if end_time is not None:
+                rows = [row for row in rows if row[0] <= int(end_time)]
+            return rows[-limit:]
+
+        step = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        last_open = min(now_ms, int(end_time) if end_time else now_ms) // step * step
+        if start_time is not None:
+            first_open = -(-int(start_time) // step) * step
+            last_open = min(last_open, first_open + (limit - 1) * step)
+        else:
+            first_open = last_open - (limit - 1) * step
+        return [synthetic_kline(symbol, interval, t, now_ms) for t in range(first_open, last_open + 1, step)]
+
+    def ticker_price(self, params):
+        now_ms = int(time.time() * 1000)
+        if "symbol" in params:
+            symbol = self._symbol(params)
+            return {"symbol": symbol, "price": f"{synthetic_price(symbol, now_ms):.8f}"}
+        return [{"symbol": symbol, "price": f"{synthetic_price(symbol, now_ms):.8f}"} for symbol in self.symbols]
+
+    def ticker_24hr(self, params):
+        now_ms = int(time.time() * 1000)
+        def ticker(symbol):
+            price = synthetic_price(symbol, now_ms)
+            open_price = synthetic_price(symbol, now_ms - 86_400_000)
+            return {
+                "symbol": symbol,
+                "lastPrice": f"{price:.8f}",
+                "openPrice": f"{open_price:.8f}",
+                "priceChangePercent": f"{(price / open_price - 1) * 100:.3f}",
+            }
+        if "symbol" in params:
+            return ticker(self._symbol(params))
+        return [ticker(symbol) for symbol in self.symbols]
+
+    def exchange_info(self, params):
+        return {
+            "timezone": "UTC",
+            "serverTime": int(time.time() * 1000),
+            "symbols": [
+                {
+                    "symbol": symbol,
+                    "status": "TRADING",
+                    "baseAsset": symbol[:-4],
+                    "quoteAsset": "USDT",
+                }
+                for symbol in self.symbols
+            ],
+        }
+
+def run_monitor(server, cycles=1):
+    """将机器人指向模拟服务器，对全部交易对运行 monitor_symbols 并输出耗时"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, root)
+    import config
+    # 压测不连接 Telegram，占位 Token 会在创建 TeleBot 时校验失败
+    if ":" not in config.TELEGRAM_BOT_TOKEN:
+        config.TELEGRAM_BOT_TOKEN = "0:loadtest"
+    from modules import api, signals
+
+    api.binance_client.base_url = server.url
+    api.kline_store.disk = None
+    signals.load_user_symbols = lambda: server.symbols
+    signals.bot.send_message = lambda *args, **kwargs: None
+
+    for cycle in range(cycles):
+        # 每个周期都重新分析（之后的周期只增量拉取K线）
+        signals.calculate_probability.cache.invalidate()
+        before = server.stats
+        start = time.perf_counter()
+        results = signals.monitor_symbols()
+        elapsed = time.perf_counter() - start
+        after = server.stats
+        requests = after["requests"] - before["requests"]
+        errors = sum(after[key] - before[key] for key in ("injected_429", "rate_limited_429", "injected_5xx"))
+        print(
+            f"周期 {cycle + 1}: {len(results)}/{len(server.symbols)} 个交易对, {elapsed:.2f}s, "
+            f"{requests} 次请求, {errors} 次错误, 已用权重 {after['used_weight_1m']}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 Binance REST 服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--symbols", type=int, default=50, help="交易对数量")
+    parser.add_argument("--latency", help="延迟分布（毫秒）: fixed:50 / uniform:20,200 / lognormal:80,0.5 / exp:100")
+    parser.add_argument("--error-429", type=float, default=0.0, help="随机返回 429 的概率")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="随机返回 5xx 的概率")
+    parser.add_argument("--weight-limit", type=int, default=1200, help="每分钟权重上限")
+    parser.add_argument("--replay", help="回放 {symbol}_{interval}.json K线文件的目录")
+    parser.add_argument("--monitor", type=int, nargs="?", const=1, metavar="CYCLES", help="运行监控周期压测后退出")
+    args = parser.parse_args()
+
+    server = FakeBinanceServer(
+        args.host, args.port, args.symbols, args.latency,
+        args.error_429, args.error_5xx, args.weight_limit, args.replay
+    ).start()
+    print(f"模拟 Binance REST 服务器: {server.url}")
+
+    if args.monitor:
+        run_monitor(server, args.monitor)
+        print(json.dumps(server.stats, ensure_ascii=False))
+        server.stop()
+        return
+
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(server.stats, ensure_ascii=False))
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+本地模拟 Binance 组合流服务器（仅用于本地测试）
+
+实现了最小化的 WebSocket 协议，支持 SUBSCRIBE / UNSUBSCRIBE，
+可以手动推送K线或断开所有连接来验证重连、重新订阅和补齐逻辑。
+
+独立运行（按随机游走每秒推送一次K线）:
+    python tools/fake_stream.py --port 9443
+    然后在 config.py 中设置 BINANCE_WS_URL = "ws://127.0.0.1:9443/stream"
+
+在代码中使用:
+    server = FakeStreamServer(port=0).start()
+    url = server.url
+    server.push_kline("ETHUSDT", "1h", row, closed=False)
+    server.drop_connections()
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+INTERVAL_MS = {
+    "1m": 60_000, "5m": 300_000, "15m": 900_000,
+    "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000,
+}
+
+def encode_frame(payload, opcode=0x1):
+    """编码服务端发往客户端的帧（不加掩码）"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+def read_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        data += chunk
+    return data
+
+def read_frame(sock):
+    """读取客户端发来的一帧，返回 (opcode, payload)"""
+    first, second = read_exact(sock, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", read_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", read_exact(sock, 8))[0]
+    mask = read_exact(sock, 4) if second & 0x80 else None
+    payload = read_exact(sock, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+class StreamHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server.owner
+        sock = self.request
+        if not self._handshake(sock):
+            return
+        client = {"sock": sock, "streams": set(), "lock": threading.Lock()}
+        server.register(client)
+        try:
+            while True:
+                opcode, payload = read_frame(sock)
+                if opcode == 0x8:  # close
+                    break
+                if opcode == 0x9:  # ping
+                    server.send(client, payload, opcode=0xA)
+                elif opcode == 0x1:
+                    server.handle_request(client, json.loads(payload))
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            server.unregister(client)
+
+    def _handshake(self, sock):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return False
+            request += chunk
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if not key:
+            return False
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return True
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class FakeStreamServer:
+    """模拟 Binance 组合流服务器"""
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = _ThreadingServer((host, port), StreamHandler)
+        self.server.owner = self
+        self.clients = []
+        self.requests = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"ws://{host}:{port}/stream"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.drop_connections()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def register(self, client):
+        with self.lock:
+            self.clients.append(client)
+
+    def unregister(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def subscriptions(self):
+        """所有连接当前订阅的数据流"""
+        with self.lock:
+            return set().union(*[client["streams"] for client in self.clients]) if self.clients else set()
+
+    def handle_request(self, client, message):
+        self.requests.append(message)
+        method = message.get("method")
+        params = message.get("params", [])
+        if method == "SUBSCRIBE":
+            client["streams"].update(params)
+        elif method == "UNSUBSCRIBE":
+            client["streams"].difference_update(params)
+        self.send(client, json.dumps({"result": None, "id": message.get("id")}).encode())
+
+    def send(self, client, payload, opcode=0x1):
+        try:
+            with client["lock"]:
+                client["sock"].sendall(encode_frame(payload, opcode))
+        except OSError:
+            self.unregister(client)
+
+    def push_kline(self, symbol, interval, row, closed=False):
+        """向订阅了该数据流的连接推送一根K线（row 为 REST K线行格式）"""
+        stream = f"{symbol.lower()}@kline_{interval}"
+        payload = json.dumps({
+            "stream": stream,
+            "data": {
+                "e": "kline",
+                "E": int(time.time() * 1000),
+                "s": symbol,
+                "k": {
+                    "t": row[0], "T": row[6], "s": symbol, "i": interval,
+                    "o": row[1], "h": row[2], "l": row[3], "c": row[4], "v": row[5],
+                    "n": row[8], "x": closed, "q": row[7], "V": row[9], "Q": row[10], "B": "0"
+                }
+            }
+        }).encode()
+        with self.lock:
+            targets = [client for client in self.clients if stream in client["streams"]]
+        for client in targets:
+            self.send(client, payload)
+        return len(targets)
+
+    def drop_connections(self):
+        """强制断开所有连接（模拟网络故障）"""
+        with self.lock:
+            clients = list(self.clients)
+            self.clients.clear()
+        for client in clients:
+            try:
+                client["sock"].shutdown(socket.SHUT_RDWR)
+                client["sock"].close()
+            except OSError:
+                pass
+
+def run_random_walk(server, period=1.0):
+    """对所有已订阅的数据流按随机游走推送K线"""
+    prices = {}
+    while True:
+        now = int(time.time() * 1000)
+        for stream in server.subscriptions():
+            name, interval = stream.split("@kline_")
+            symbol = name.upper()
+            step = INTERVAL_MS.get(interval, 60_000)
+            open_time = now // step * step
+            price = prices.get(stream, 100.0) * (1 + random.gauss(0, 0.001))
+            prices[stream] = price
+            row = [
+                open_time, f"{price:.4f}", f"{price * 1.001:.4f}", f"{price * 0.999:.4f}",
+                f"{price:.4f}", "1.0", open_time + step - 1, "100.0", 1, "0.5", "50.0", "0"
+            ]
+            server.push_kline(symbol, interval, row, closed=now + period * 1000 > open_time + step)
+        time.sleep(period)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟 Binance K线组合流")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9443)
+    parser.add_argument("--period", type=float, default=1.0, help="推送间隔（秒）")
+    args = parser.parse_args()
+
+    server = FakeStreamServer(args.host, args.port).start()
+    print(f"模拟推送服务已启动: {server.url}")
+    try:
+        run_random_walk(server, args.period)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,100 @@
+"""
+向本地 Webhook 服务发送 Telegram 更新（用于测试 Webhook 模式）
+
+发送录制的更新 JSON:
+    python tools/post_update.py tools/updates/market.json --url http://127.0.0.1:8443/telegram --secret xxx
+
+按命令文本生成更新:
+    python tools/post_update.py --text "/risk BTC" --chat-id 694209327 --secret xxx
+
+--count 可重复发送多次并统计响应耗时；每次发送的 update_id 和 message_id 会递增。
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+DEFAULT_URL = f"http://127.0.0.1:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}"
+
+def make_update(text, chat_id, update_id=1):
+    """构造与 Telegram 格式相同的文本消息更新"""
+    entities = []
+    if text.startswith("/"):
+        entities.append({"type": "bot_command", "offset": 0, "length": len(text.split()[0])})
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "Test"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+            "entities": entities,
+        },
+    }
+
+def post(url, update, secret=None, timeout=10):
+    """
+    发送一个更新
+
+    返回:
+    - (HTTP 状态码, 耗时秒数)
+    """
+    request = urllib.request.Request(url, data=json.dumps(update).encode(), method="POST")
+    request.add_header("Content-Type", "application/json")
+    if secret:
+        request.add_header("X-Telegram-Bot-Api-Secret-Token", secret)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="向本地 Webhook 发送 Telegram 更新")
+    parser.add_argument("files", nargs="*", help="更新 JSON 文件")
+    parser.add_argument("--text", help="按命令文本生成更新，例如 /m")
+    parser.add_argument("--chat-id", type=int, default=int(config.OWNER_ID) if config.OWNER_ID.isdigit() else 1)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--secret", default=config.WEBHOOK_SECRET)
+    parser.add_argument("--count", type=int, default=1, help="每个更新发送的次数")
+    args = parser.parse_args()
+
+    updates = []
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            updates.append(json.load(f))
+    if args.text:
+        updates.append(make_update(args.text, args.chat_id))
+    if not updates:
+        parser.error("需要更新 JSON 文件或 --text")
+
+    update_id = int(time.time())
+    latencies = []
+    for update in updates:
+        for _ in range(args.count):
+            update = copy.deepcopy(update)
+            update_id += 1
+            update["update_id"] = update_id
+            if "message" in update:
+                update["message"]["message_id"] = update_id
+            status, seconds = post(args.url, update, args.secret)
+            latencies.append(seconds)
+            print(f"{status}  {seconds * 1000:.1f}ms  {update.get('message', {}).get('text', '')}")
+
+    latencies.sort()
+    print(f"共 {len(latencies)} 次，中位数 {latencies[len(latencies) // 2] * 1000:.1f}ms，最长 {latencies[-1] * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()